@@ -2,6 +2,8 @@
 # App principal do LipidGenesis / LipidPalma com abas modularizadas
 
 import os
+from collections import OrderedDict
+
 import streamlit as st
 
 # ---- Config de página ----
@@ -30,6 +32,7 @@ for k, v in _defaults.items():
 from home import render_home
 from proposta_cosmetica import render_proposta_cosmetica
 from blend_enzimatico import render_blend_enzimatico
+import blend_profiler as profiler
 
 # ---- Placeholders para as demais abas (mantém a ordem original) ----
 def render_assistente_formulacao(st):
@@ -79,41 +82,96 @@ def render_exportacao_pdf(st):
     st.caption("Gere o dossiê do blend com perfil FA, KPIs, narrativa ESG e anexos.")
     st.info("Placeholder para o MVP. Cole aqui sua lógica original quando quiser.")
 
-# ---- Tabs (ordem original) ----
-tabs = st.tabs([
-    "Home",
-    "Proposta Cosmética",
-    "Blend Enzimático",
-    "Assistente de Formulação",
-    "Protocolo de Produção",
-    "Sustentabilidade / ESG",
-    "Rastreabilidade",
-    "Exportação PDF",
+# ---- Navegação (ordem original) ----
+# LIPIDPALMA_NAV=lazy (padrão): só a aba selecionada executa seu render a cada rerun.
+# LIPIDPALMA_NAV=tabs: st.tabs clássico (todas as abas executam em todo rerun).
+NAV_MODE = os.environ.get("LIPIDPALMA_NAV", "lazy").strip().lower()
+
+PAGES = OrderedDict([
+    ("Home", lambda: render_home(st)),
+    ("Proposta Cosmética", lambda: render_proposta_cosmetica(st)),
+    ("Blend Enzimático", render_blend_enzimatico),
+    ("Assistente de Formulação", lambda: render_assistente_formulacao(st)),
+    ("Protocolo de Produção", lambda: render_protocolo_producao(st)),
+    ("Sustentabilidade / ESG", lambda: render_esg(st)),
+    ("Rastreabilidade", lambda: render_rastreabilidade(st)),
+    ("Exportação PDF", lambda: render_exportacao_pdf(st)),
 ])
 
-with tabs[0]:
-    render_home(st)
-
-with tabs[1]:
-    render_proposta_cosmetica(st)
-
-with tabs[2]:
-    render_blend_enzimatico()
-
-with tabs[3]:
-    render_assistente_formulacao(st)
-
-with tabs[4]:
-    render_protocolo_producao(st)
-
-with tabs[5]:
-    render_esg(st)
-
-with tabs[6]:
-    render_rastreabilidade(st)
+# Widgets de abas não renderizadas têm o estado descartado pelo Streamlit no fim do rerun.
+# Guardamos uma cópia (sombra) dos valores e a devolvemos quando a aba volta a ser exibida.
+# (botões, uploaders e data_editor não aceitam atribuição e ficam de fora)
+_PERSIST_PREFIXES = ("slider_", "tradeoff_step_", "solver_", "mc_", "pareto_", "library_", "pc_soc_")
+_PERSIST_KEYS = {"consider_var", "var_scenario", "blend_mode_radio", "ajuste_method_heur",
+                 "ajuste_method_upload", "formato_planilha", "cmp_delta_mode",
+                 "edit_lote_A", "edit_lote_B", "edit_lote_C"}
+_PERSIST_SKIP = {"solver_limites", "solver_result", "mc_result", "pareto_result", "mc_job", "pareto_job"}
+
+def _persist_widget_state():
+    shadow = st.session_state.setdefault("_widget_shadow", {})
+    for k, v in shadow.items():
+        if k not in st.session_state:
+            st.session_state[k] = v
+    for k in list(st.session_state.keys()):
+        if k not in _PERSIST_SKIP and (k in _PERSIST_KEYS or k.startswith(_PERSIST_PREFIXES)):
+            shadow[k] = st.session_state[k]
+
+# ---- Painel do desenvolvedor (oculto): ?dev=1 na URL ou LIPIDPALMA_PROFILE=1 ----
+DEV_PANEL = profiler.ENABLED or st.query_params.get("dev") == "1"
+
+def _render_dev_panel():
+    from blend_charts import CHART_BACKEND, waterfall_png, waterfall_spec
+    with st.sidebar:
+        st.markdown("### 🛠️ Perfilador")
+        on = st.toggle("Ativo (todas as sessões do processo)", value=profiler.ENABLED, key="dev_profiler_on")
+        if on != profiler.ENABLED:
+            profiler.enable(on)
+            st.rerun()
+        traces = profiler.history()
+        if not traces:
+            st.caption("Sem traces ainda: interaja com uma aba com o perfilador ativo.")
+            return
+        last = traces[-1]
+        st.caption(f"Último rerun — **{last.label}**: {last.total_ms:.0f} ms")
+        spans = sorted(last.spans, key=lambda x: (x[1], x[3]))
+        names = [("· " * lvl) + n for n, _, _, lvl in spans]
+        args = ("Cascata do último rerun", names, [s for _, s, _, _ in spans], [d for _, _, d, _ in spans])
+        if CHART_BACKEND == "plotly":
+            st.plotly_chart(waterfall_spec(*args), use_container_width=True, key="dev_waterfall")
+        else:
+            st.image(waterfall_png(*args), use_container_width=True)
+        if last.counters:
+            st.write({k: v for k, v in sorted(last.counters.items())})
+        same = profiler.history(last.label)
+        st.caption(f"p50/p95 em {len(same)} rerun(s) de {last.label} (histórico de {profiler.HISTORY_SIZE}):")
+        st.dataframe([{k: (round(v, 1) if isinstance(v, float) else v) for k, v in r.items()}
+                      for r in profiler.stage_stats(same)], use_container_width=True, hide_index=True)
+        st.download_button("📥 Exportar traces (JSONL)", data=profiler.to_jsonl(traces).encode("utf-8"),
+                           file_name="traces.jsonl", mime="application/x-ndjson", key="dev_traces_dl")
+        c1, c2 = st.columns(2)
+        if profiler.TRACE_FILE:
+            c1.caption(f"Gravando em `{profiler.TRACE_FILE}`")
+        if c2.button("Limpar", key="dev_traces_clear"):
+            profiler.clear_history()
+            st.rerun()
+
+if NAV_MODE == "tabs":
+    for (name, render), tab in zip(PAGES.items(), st.tabs(list(PAGES))):
+        with tab, profiler.trace(name):
+            render()
+else:
+    _persist_widget_state()
+    if st.session_state.get("go_to_assistente"):
+        st.session_state["nav_page"] = "Assistente de Formulação"
+        st.session_state["go_to_assistente"] = False
+    page = st.radio("Navegação", list(PAGES), horizontal=True, key="nav_page",
+                    label_visibility="collapsed")
+    st.markdown("---")
+    with profiler.trace(page):
+        PAGES[page]()
 
-with tabs[7]:
-    render_exportacao_pdf(st)
+if DEV_PANEL:
+    _render_dev_panel()
 
 # ---- Rodapé ----
 st.markdown("---")
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+# blend_batch.py
+# Pontuação em lote (headless, sem Streamlit/matplotlib) de planilhas com um blend por linha.
+"""
+Uso:
+    python blend_batch.py entrada.csv -o saida.csv [--cenario mean] [--chunksize 50000]
+    python blend_batch.py entrada.parquet -o saida.parquet      (requer pyarrow)
+
+Colunas reconhecidas (uma linha = um blend):
+  - Classe A: chave do ingrediente (ex.: "rbd_palma"), rótulo da aba (ex.: "🌿 PFAD")
+    ou prefixo "A_"/"A:" (ex.: "A_pfad");
+  - Classe B: prefixo "B_"/"B:" + código FA (ex.: "B_C18:1");
+  - Classe C: prefixo "C_"/"C:" + chave do ingrediente (ex.: "C_soapstock");
+  - Perfil FA direto: códigos de FA_ORDER (ex.: "C16:0", "C18:1").
+Uma planilha usa OU ingredientes (A/B/C) OU perfil FA. Demais colunas (ID, lote, ...)
+são copiadas para a saída. A saída é escrita bloco a bloco (memória limitada ao chunk)
+e registra, na coluna "calibracao", a versão do artefato de calibração usada.
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from blend_engine import (
+    CATALOG, SCORE_KEYS, RADAR_KEYS, SCENARIOS,
+    score_ingredient_blends, score_fa_profiles, calibration_version,
+)
+
+DEFAULT_CHUNKSIZE = 50_000
+DEFAULT_DECIMALS = 4  # KPIs são estimativas; arredondar também acelera bastante a escrita CSV
+
+
+# ----------------- Layout das colunas -----------------
+def _norm_col(name) -> str:
+    return str(name).strip()
+
+def detect_layout(columns) -> dict:
+    """
+    Classifica as colunas da planilha.
+    Retorna {"A": [(col, i)], "B": [(col, j)], "C": [(col, i)], "FA": [(col, j)], "extra": [col]}.
+    """
+    label_to_key = {lbl.strip().casefold(): k for k, lbl in zip(CATALOG.ing_keys, CATALOG.labels)}
+    key_lookup = {k.casefold(): k for k in CATALOG.ing_keys}
+    fa_lookup = {fa.casefold(): fa for fa in CATALOG.fa_order}
+
+    def ing_index(name):
+        k = key_lookup.get(name.casefold()) or label_to_key.get(name.casefold())
+        return CATALOG.ing_index[k] if k else None
+
+    layout = {"A": [], "B": [], "C": [], "FA": [], "extra": []}
+    for col in columns:
+        name = _norm_col(col)
+        prefix, rest = (name[0].upper(), name[2:].strip()) if len(name) > 2 and name[1] in "_:" else (None, None)
+        if prefix == "A" and ing_index(rest) is not None:
+            layout["A"].append((col, ing_index(rest)))
+        elif prefix == "C" and ing_index(rest) is not None:
+            layout["C"].append((col, ing_index(rest)))
+        elif prefix == "B" and rest.casefold() in fa_lookup:
+            layout["B"].append((col, CATALOG.fa_index[fa_lookup[rest.casefold()]]))
+        elif name.casefold() in fa_lookup:
+            layout["FA"].append((col, CATALOG.fa_index[fa_lookup[name.casefold()]]))
+        elif ing_index(name) is not None:
+            layout["A"].append((col, ing_index(name)))
+        else:
+            layout["extra"].append(col)
+
+    if layout["FA"] and (layout["A"] or layout["B"] or layout["C"]):
+        raise ValueError("Planilha mistura colunas de perfil FA e de ingredientes (A/B/C); use um formato por arquivo.")
+    if not (layout["FA"] or layout["A"] or layout["B"] or layout["C"]):
+        raise ValueError("Nenhuma coluna de ingrediente (Classe A/B/C) ou ácido graxo (FA_ORDER) reconhecida.")
+    return layout
+
+def _matrix(df: pd.DataFrame, cols, width: int) -> np.ndarray:
+    """Monta (N, width) somando colunas que caem no mesmo índice; vazios/não numéricos → 0."""
+    M = np.zeros((len(df), width))
+    for col, idx in cols:
+        M[:, idx] += pd.to_numeric(df[col], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    return M
+
+
+# ----------------- Pontuação -----------------
+def score_frame(df: pd.DataFrame, scenario: str = "mean", layout: dict = None,
+                include_profile: bool = False, decimals: int = None) -> pd.DataFrame:
+    """Pontua todas as linhas de df em uma passada vetorizada e devolve um DataFrame de resultados."""
+    layout = layout or detect_layout(df.columns)
+    n_ing, n_fa = CATALOG.n_ingredients, len(CATALOG.fa_order)
+    out = df[layout["extra"]].reset_index(drop=True).copy()
+
+    if layout["FA"]:
+        res = score_fa_profiles(_matrix(df, layout["FA"], n_fa))
+    else:
+        res = score_ingredient_blends(
+            _matrix(df, layout["A"], n_ing),
+            B=_matrix(df, layout["B"], n_fa) if layout["B"] else None,
+            C=_matrix(df, layout["C"], n_ing) if layout["C"] else None,
+            scenario=scenario,
+        )
+
+    out["II"] = res["II"]
+    out["ISap"] = res["ISap"]
+    out["PF_C"] = res["PF_C"]
+    out["PF_idx"] = res["PF_idx"]
+    if "II_base" in res:
+        out["II_base"] = res["II_base"]
+        out["ISap_base"] = res["ISap_base"]
+        out["PF_base_C"] = res["PF_base_C"]
+        out["ajuste"] = res["has_adjust"]
+    for j, k in enumerate(SCORE_KEYS):
+        out[k] = res["scores"][:, j]
+    # radar inteiro com NA (Int64) em todo bloco, tenha ele linhas vazias ou não
+    for j, k in enumerate(RADAR_KEYS):
+        out[f"radar_{k}"] = pd.array(res["radar"][:, j], dtype="Int64")
+    if include_profile:
+        for j, fa in enumerate(CATALOG.fa_order):
+            out[f"fa_{fa}"] = res["fa"][:, j]
+    if decimals is not None:
+        out = out.round(decimals)
+    out["calibracao"] = calibration_version()   # versão do artefato que gerou II/ISap/PF
+    return out
+
+
+# ----------------- Entrada/saída em blocos -----------------
+def _is_parquet(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in (".parquet", ".pq")
+
+def _require_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        sys.exit("Leitura/escrita Parquet requer 'pyarrow' (pip install pyarrow).")
+    return pa, pq
+
+def iter_chunks(path: str, chunksize: int = DEFAULT_CHUNKSIZE):
+    """Lê CSV/Parquet em blocos de até `chunksize` linhas."""
+    if _is_parquet(path):
+        _, pq = _require_pyarrow()
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+class _ChunkWriter:
+    """
+    Escreve blocos de resultados em CSV (append) ou Parquet (ParquetWriter). Os tipos das colunas
+    são os do primeiro bloco; os seguintes são convertidos para eles (um bloco só de NaN numa
+    coluna, por exemplo, não muda o esquema no meio do arquivo).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._pq_writer = None
+        self._dtypes = None
+        self._schema = None
+        self._started = False
+
+    def _conform(self, df: pd.DataFrame) -> pd.DataFrame:
+        # colunas copiadas da entrada podem não converter (ex.: int no 1º bloco, NaN depois):
+        # essas ficam como vieram (no Parquet, o pyarrow acusa a incompatibilidade)
+        for col, dtype in self._dtypes.items():
+            if col in df and df[col].dtype != dtype:
+                try:
+                    df[col] = df[col].astype(dtype)
+                except (TypeError, ValueError):
+                    pass
+        return df
+
+    def write(self, df: pd.DataFrame):
+        if self._dtypes is None:
+            self._dtypes = df.dtypes
+        else:
+            df = self._conform(df)
+        if _is_parquet(self.path):
+            pa, pq = _require_pyarrow()
+            if self._pq_writer is None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                self._schema = table.schema
+                self._pq_writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+            self._pq_writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode="a" if self._started else "w", header=not self._started, index=False)
+        self._started = True
+
+    def close(self):
+        if self._pq_writer is not None:
+            self._pq_writer.close()
+
+def score_file(src: str, dst: str, scenario: str = "mean", chunksize: int = DEFAULT_CHUNKSIZE,
+               include_profile: bool = False, decimals: int = DEFAULT_DECIMALS, progress=None) -> int:
+    """Pontua `src` → `dst` bloco a bloco. Retorna o número de linhas processadas."""
+    writer = _ChunkWriter(dst)
+    layout = None
+    total = 0
+    try:
+        for chunk in iter_chunks(src, chunksize):
+            layout = layout or detect_layout(chunk.columns)
+            writer.write(score_frame(chunk, scenario, layout, include_profile, decimals))
+            total += len(chunk)
+            if progress:
+                progress(total)
+    finally:
+        writer.close()
+    return total
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(
+        description="Pontua blends (II, ISap, PF °C, notas por finalidade) de um CSV/Parquet, sem Streamlit.")
+    ap.add_argument("entrada", help="CSV ou Parquet com um blend por linha")
+    ap.add_argument("-o", "--saida", required=True, help="arquivo de saída (.csv ou .parquet)")
+    ap.add_argument("--cenario", choices=SCENARIOS, default="mean",
+                    help="cenário de variabilidade de lote para perfis/KPIs (padrão: mean)")
+    ap.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="linhas por bloco")
+    ap.add_argument("--com-perfil", action="store_true", help="inclui o perfil FA normalizado (fa_*) na saída")
+    ap.add_argument("--decimais", type=int, default=DEFAULT_DECIMALS, help="casas decimais dos resultados")
+    ap.add_argument("-q", "--quiet", action="store_true")
+    args = ap.parse_args(argv)
+
+    progress = None if args.quiet else (lambda n: print(f"\r{n} blends pontuados", end="", file=sys.stderr))
+    try:
+        total = score_file(args.entrada, args.saida, args.cenario, args.chunksize,
+                           args.com_perfil, args.decimais, progress)
+    except ValueError as e:
+        print(f"\nErro: {e}", file=sys.stderr)
+        return 2
+    if not args.quiet:
+        print(f"\r{total} blends pontuados → {args.saida} (calibração {calibration_version()})", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,470 @@
+# -*- coding: utf-8 -*-
+# blend_bench.py
+# Benchmarks reprodutíveis (sem navegador) dos caminhos quentes do motor de blends.
+"""
+Uso:
+    python blend_bench.py                          # perfil rápido, compara com bench_baseline.json
+    python blend_bench.py --perfil completo        # 1 → 10^6 blends, catálogos de 8 → 1000 ingredientes
+    python blend_bench.py -k melt -k upload        # só casos cujo nome contém "melt" ou "upload"
+    python blend_bench.py --atualizar-baseline     # grava os tempos desta execução como baseline
+
+Cada caso roda numa grade de escalas: N = número de blends e I = tamanho do catálogo
+("real" = catálogo da aba, 8 ingredientes; demais são catálogos sintéticos com perfis FA
+aleatórios e semente fixa). Funções da API por dicionário (melt_index, _scores_finais, ...) processam
+N blends em laço, como a aba faz; as versões vetorizadas recebem a matriz (N, ·) inteira.
+Combinações com N·I acima do limite do perfil são puladas (memória).
+
+Resultados vão para um JSON (--saida) com o tempo por chamada (melhor e mediana das
+repetições), vazão em blends/s e os metadados da máquina. Com uma baseline presente,
+o processo sai com código 1 se algum caso ficar mais lento que baseline·(1+limiar)
+e a diferença absoluta passar do piso (ruído de relógio em casos de microssegundos).
+Casos suspeitos são remontados e medidos de novo (--remedir) antes de reprovar.
+Baselines só são comparáveis na mesma máquina e perfil: o cabeçalho avisa se ela mudou;
+em máquina dedicada o limiar pode descer (ex.: --limiar 0.1).
+"""
+
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from blend_engine import (
+    CATALOG, FA_CONST, FA_ORDER, SCENARIOS, KPI_KEYS, compile_catalog, calibration_version,
+    fa_dict, mix_fa, melt_index, iodine_index, saponification_index, melt_index_v,
+    iodine_index_v, saponification_index_v, kpi_means_mix, kpis_calibrados_por_medias,
+    _scores_finais, scores_finais_v, score_ingredient_blends,
+    tradeoff_sensitivity_blend, tradeoff_sensitivity_profile, evaluate_heuristic, IncrementalBlend,
+)
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+DEFAULT_OUTPUT = "bench_resultados.json"
+DEFAULT_THRESHOLD = 0.50      # +50% no melhor tempo por chamada = regressão (VMs compartilhadas variam ±30%)
+DEFAULT_FLOOR_S = 5e-6        # diferenças abaixo de 5 µs por chamada são ruído
+SEED = 20240611
+
+PROFILES = {
+    "rapido": {
+        "N": (1, 100, 10_000),
+        "N_loop": (1, 100),
+        "I": ("real", 128),
+        "N_upload": (100, 10_000),
+        "N_xlsx": (100,),
+        "max_cells": 2_000_000,
+        "repeat": 5, "min_time": 0.2,
+    },
+    "completo": {
+        "N": (1, 100, 10_000, 1_000_000),
+        "N_loop": (1, 100, 10_000),
+        "I": ("real", 32, 128, 1000),
+        "N_upload": (100, 10_000, 1_000_000),
+        "N_xlsx": (100, 10_000),
+        "max_cells": 20_000_000,
+        "repeat": 5, "min_time": 0.2,
+    },
+}
+TRADEOFF_STEPS = (-10.0, -5.0, -1.0, 1.0, 5.0, 10.0)
+
+
+# ----------------- Dados sintéticos (semente fixa) -----------------
+_CATALOGS = {}
+
+def synthetic_catalog(n_ingredients: int):
+    """Catálogo com `n_ingredients` ingredientes e perfis FA aleatórios (min/mean/max) sobre FA_ORDER."""
+    if n_ingredients not in _CATALOGS:
+        rng = np.random.default_rng(SEED + n_ingredients)
+        profiles, ranges = {}, {}
+        for i in range(n_ingredients):
+            mean = rng.dirichlet(np.full(len(FA_ORDER), 0.6)) * 100.0
+            jitter = rng.uniform(0.85, 1.15, size=(2, len(FA_ORDER)))
+            key = f"sint_{i:04d}"
+            profiles[key] = {scen: dict(zip(FA_ORDER, vec)) for scen, vec in
+                             zip(SCENARIOS, (mean * jitter[0], mean, mean * jitter[1]))}
+            base = {"II": rng.uniform(5, 150), "ISap": rng.uniform(180, 260), "PF": rng.uniform(-10, 60)}
+            ranges[key] = {m: {"min": 0.95 * base[m], "mean": base[m], "max": 1.05 * base[m]} for m in KPI_KEYS}
+        _CATALOGS[n_ingredients] = compile_catalog(
+            fa_profiles=profiles, fa_const=FA_CONST, kpi_ranges=ranges, kpi_means={},
+            ingredients=[(k, k) for k in profiles])
+    return _CATALOGS[n_ingredients]
+
+def _catalog(size):
+    return CATALOG if size == "real" else synthetic_catalog(size)
+
+def _weights(n: int, cat, seed: int = 0) -> np.ndarray:
+    """(n, I) proporções de Classe A somando 100 por linha (esparsas: ~4 ingredientes por blend)."""
+    rng = np.random.default_rng(SEED + seed)
+    I = cat.n_ingredients
+    W = rng.random((n, I)) * (rng.random((n, I)) < min(1.0, 4.0 / I))
+    W[np.arange(n), rng.integers(0, I, size=n)] += 1.0       # nenhum blend vazio
+    return W * (100.0 / W.sum(axis=1, keepdims=True))
+
+def _blend_dicts(n: int):
+    """n blends da aba: (A_vals, C_vals) por ingrediente do catálogo real."""
+    W = _weights(n, CATALOG)
+    C = _weights(n, CATALOG, seed=1) * 0.05
+    keys = CATALOG.ing_keys
+    return [({k: float(v) for k, v in zip(keys, a)}, {k: float(v) for k, v in zip(keys, c)})
+            for a, c in zip(W, C)]
+
+def _wide_csv(n: int, xlsx: bool = False) -> bytes:
+    """Planilha larga (um blend por linha, colunas de ingrediente) com n linhas, em CSV ou XLSX."""
+    df = pd.DataFrame(_weights(n, CATALOG).round(3), columns=list(CATALOG.ing_keys))
+    df.insert(0, "ID", [f"B{i:07d}" for i in range(n)])
+    buf = io.BytesIO()
+    if xlsx:
+        df.to_excel(buf, index=False)
+    else:
+        df.to_csv(buf, index=False)
+    return buf.getvalue()
+
+
+# ----------------- Casos -----------------
+# Cada caso: nome → (eixos, montagem). A montagem recebe (N, catálogo) e devolve a função
+# cronometrada (sem argumentos); eixos diz quais escalas do perfil variam ("N", "N_loop",
+# "N_upload", "N_xlsx" e/ou "I"). Os dados são gerados fora da medição.
+def _case_scalar_fa(fn):
+    def build(n, cat):
+        fas = [fa_dict(v) for v in mix_fa(A=_weights(n, CATALOG))]
+        return lambda: [fn(fa) for fa in fas]
+    return build
+
+def _case_scores_dict(n, cat):
+    fas = [fa_dict(v) for v in mix_fa(A=_weights(n, CATALOG))]
+    items = [(fa, melt_index(fa), iodine_index(fa)) for fa in fas]
+    return lambda: [_scores_finais(fa, pf, ii) for fa, pf, ii in items]
+
+def _case_kpis_medias(n, cat):
+    blends = _blend_dicts(n)
+    return lambda: [kpis_calibrados_por_medias(A, C, "mean") for A, C in blends]
+
+def _case_tradeoffs_ui(kind):
+    def build(n, cat):
+        # wrappers da aba (importam Streamlit; só carregados quando o caso roda)
+        from blend_enzimatico import _compute_tradeoffs_heuristico, _compute_tradeoffs_upload
+        blends = _blend_dicts(n)
+        if kind == "heuristico":
+            return lambda: [_compute_tradeoffs_heuristico(A, "Classe C (ingredientes)", {}, C, True, "mean")
+                            for A, C in blends]
+        fas = [fa_dict(v) for v in mix_fa(A=_weights(n, CATALOG))]
+        return lambda: [_compute_tradeoffs_upload(fa, "Classe C (ingredientes)", {}, C, True, "mean")
+                        for fa, (_, C) in zip(fas, blends)]
+    return build
+
+def _slider_walk(n: int):
+    """n reruns da aba em sequência, cada um movendo um único slider (Classe A ou C) do anterior."""
+    rng = np.random.default_rng(SEED + 2)
+    A, C = _blend_dicts(1)[0]
+    keys = CATALOG.ing_keys
+    walk = []
+    for _ in range(n):
+        key = keys[rng.integers(len(keys))]
+        if rng.random() < 0.8:
+            A = {**A, key: float(rng.integers(0, 101))}
+        else:
+            C = {**C, key: float(rng.integers(0, 31))}
+        walk.append((A, C))
+    return walk
+
+def _case_heuristic_rerun(incremental: bool):
+    def build(n, cat):
+        walk = _slider_walk(n)
+        if not incremental:
+            return lambda: [evaluate_heuristic(A, None, C, "mean") for A, C in walk]
+        state = IncrementalBlend()
+
+        def run():
+            for A, C in walk:
+                state.update(A, None, C, "mean")
+        return run
+    return build
+
+def _case_incremental_set(n, cat):
+    rng = np.random.default_rng(SEED + 3)
+    state = IncrementalBlend(cat)
+    state.update({k: float(v) for k, v in zip(cat.ing_keys, _weights(1, cat)[0])}, scenario="mean")
+    moves = [("A" if rng.random() < 0.8 else "C", cat.ing_keys[rng.integers(cat.n_ingredients)],
+              float(rng.integers(0, 101))) for _ in range(n)]
+    return lambda: [state.set(layer, key, value) for layer, key, value in moves]
+
+def _case_vector_fa(fn):
+    def build(n, cat):
+        FA = mix_fa(A=_weights(n, CATALOG))
+        return lambda: fn(FA)
+    return build
+
+def _case_mix_fa(n, cat):
+    A, C = _weights(n, cat), _weights(n, cat, seed=1) * 0.05
+    return lambda: mix_fa(A, None, C, "mean", cat)
+
+def _case_kpi_means_mix(n, cat):
+    W = _weights(n, cat)
+    return lambda: kpi_means_mix(W, "mean", catalog=cat)
+
+def _case_scores_v(n, cat):
+    FA = mix_fa(A=_weights(n, CATALOG))
+    PF, II = melt_index_v(FA), iodine_index_v(FA)
+    return lambda: scores_finais_v(FA, PF, II)
+
+def _case_score_blends(n, cat):
+    A, C = _weights(n, cat), _weights(n, cat, seed=1) * 0.05
+    return lambda: score_ingredient_blends(A, None, C, "mean", cat)
+
+def _case_tradeoff_blend(n, cat):
+    A, C = _weights(n, cat), _weights(n, cat, seed=1) * 0.05
+    return lambda: [tradeoff_sensitivity_blend(a, None, c, TRADEOFF_STEPS, "mean", catalog=cat)
+                    for a, c in zip(A, C)]
+
+def _case_tradeoff_profile(n, cat):
+    FA = mix_fa(A=_weights(n, cat), catalog=cat)
+    return lambda: [tradeoff_sensitivity_profile(fa, None, TRADEOFF_STEPS, "mean", catalog=cat) for fa in FA]
+
+def _case_upload(xlsx: bool):
+    def build(n, cat):
+        from blend_upload import parse_upload, clear_upload_cache
+        data = _wide_csv(n, xlsx)
+        name = "bench.xlsx" if xlsx else "bench.csv"
+
+        def run():
+            clear_upload_cache()            # mede o parse, não o acerto de cache
+            res = parse_upload(data, name, "Ingredientes (%)")
+            if res["error"] or res["wide"] is None or res["wide"]["error"]:
+                raise RuntimeError(res["error"] or "planilha larga não reconhecida")
+            return res
+        return run
+    return build
+
+CASES = {
+    # API por dicionário (a aba chama uma vez por blend)
+    "melt_index":                   (("N_loop",), _case_scalar_fa(melt_index)),
+    "iodine_index":                 (("N_loop",), _case_scalar_fa(iodine_index)),
+    "saponification_index":         (("N_loop",), _case_scalar_fa(saponification_index)),
+    "_scores_finais":               (("N_loop",), _case_scores_dict),
+    "kpis_calibrados_por_medias":   (("N_loop",), _case_kpis_medias),
+    "_compute_tradeoffs_heuristico": (("N_loop",), _case_tradeoffs_ui("heuristico")),
+    "_compute_tradeoffs_upload":    (("N_loop",), _case_tradeoffs_ui("upload")),
+    # rerun do modo heurístico com um slider alterado: avaliação completa x estado incremental
+    "evaluate_heuristic":           (("N_loop",), _case_heuristic_rerun(False)),
+    "IncrementalBlend.update":      (("N_loop",), _case_heuristic_rerun(True)),
+    "IncrementalBlend.set":         (("N_loop", "I"), _case_incremental_set),
+    # núcleo vetorizado
+    "melt_index_v":                 (("N",), _case_vector_fa(melt_index_v)),
+    "iodine_index_v":               (("N",), _case_vector_fa(iodine_index_v)),
+    "saponification_index_v":       (("N",), _case_vector_fa(saponification_index_v)),
+    "scores_finais_v":              (("N",), _case_scores_v),
+    "mix_fa":                       (("N", "I"), _case_mix_fa),
+    "kpi_means_mix":                (("N", "I"), _case_kpi_means_mix),
+    "score_ingredient_blends":      (("N", "I"), _case_score_blends),
+    "tradeoff_sensitivity_blend":   (("N_loop", "I"), _case_tradeoff_blend),
+    "tradeoff_sensitivity_profile": (("N_loop", "I"), _case_tradeoff_profile),
+    # leitura de planilhas (cache frio)
+    "parse_upload_csv":             (("N_upload",), _case_upload(False)),
+    "parse_upload_xlsx":            (("N_xlsx",), _case_upload(True)),
+}
+
+
+# ----------------- Medição -----------------
+def measure(fn, repeat: int = 5, min_time: float = 0.05) -> dict:
+    """Tempo por chamada: calibra o nº de chamadas por repetição até `min_time` e repete `repeat` vezes."""
+    gc_was_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()                     # como timeit: coleta de lixo fora da medição
+    try:
+        return _measure(fn, repeat, min_time)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+def _measure(fn, repeat, min_time):
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        dt = time.perf_counter() - t0
+        if dt >= min_time or number >= 1_000_000:
+            break
+        number = max(number * 2, int(number * min_time / max(dt, 1e-9) * 1.2))
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - t0) / number)
+    return {"best_s": min(times), "median_s": float(np.median(times)), "number": number, "repeat": repeat}
+
+def _grid(axes, prof):
+    ns = next((prof[a] for a in axes if a.startswith("N")), (1,))
+    sizes = prof["I"] if "I" in axes else ("real",)
+    return [(n, size) for size in sizes for n in ns]
+
+def case_id(name: str, n: int, size) -> str:
+    return f"{name}[N={n},I={size}]"
+
+def run(profile: str = "rapido", select=None, progress=None, check=None, retries: int = 0) -> list:
+    """
+    Roda os casos do perfil; devolve registros {"id", "caso", "N", "I", best_s, median_s, ...}.
+    check(rec) → True marca suspeita de regressão: o caso é remontado (dados novos, outro
+    alinhamento de memória) e medido de novo até `retries` vezes; fica o melhor tempo.
+    """
+    prof = PROFILES[profile]
+    records = []
+    for name, (axes, build) in CASES.items():
+        if select and not any(s in name for s in select):
+            continue
+        for n, size in _grid(axes, prof):
+            cat = _catalog(size)
+            rec = {"id": case_id(name, n, size), "caso": name, "N": n, "I": cat.n_ingredients,
+                   "catalogo": "real" if size == "real" else "sintetico"}
+            if "I" in axes and n * cat.n_ingredients > prof["max_cells"]:
+                rec["pulado"] = f"N·I > {prof['max_cells']:,}"
+            else:
+                fn = build(n, cat)
+                rec.update(measure(fn, prof["repeat"], prof["min_time"]))
+                for attempt in range(retries):
+                    if check is None or not check(rec):
+                        break
+                    again = measure(build(n, cat), prof["repeat"], prof["min_time"])
+                    if again["best_s"] < rec["best_s"]:
+                        rec.update(again)
+                    rec["remedicoes"] = attempt + 1
+                rec["blends_por_s"] = n / rec["best_s"] if rec["best_s"] > 0 else None
+            records.append(rec)
+            if progress:
+                progress(rec)
+    return records
+
+
+# ----------------- Metadados / baseline -----------------
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             timeout=5, cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def machine_info() -> dict:
+    return {"maquina": platform.node(), "plataforma": platform.platform(), "processador": platform.machine(),
+            "cpus": os.cpu_count(), "python": platform.python_version(),
+            "numpy": np.__version__, "pandas": pd.__version__}
+
+def report(records, profile: str) -> dict:
+    return {"criado": datetime.now(timezone.utc).isoformat(timespec="seconds"), "perfil": profile,
+            "commit": _git_commit(), "calibracao": calibration_version(), "ambiente": machine_info(),
+            "resultados": records}
+
+def load_report(path: str):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def write_report(path: str, rep: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(rep, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+def merge_baseline(old: dict, new: dict) -> dict:
+    """Casos desta execução substituem os da baseline; os demais (outro perfil/filtro) ficam."""
+    if old is None:
+        return new
+    by_id = {r["id"]: r for r in old.get("resultados", [])}
+    by_id.update({r["id"]: r for r in new["resultados"] if "pulado" not in r})
+    return dict(new, resultados=list(by_id.values()))
+
+def compare(records, baseline: dict, threshold: float = DEFAULT_THRESHOLD,
+            floor_s: float = DEFAULT_FLOOR_S) -> list:
+    """Anota cada registro com a razão vs baseline; devolve os que regrediram."""
+    base = {r["id"]: r for r in (baseline or {}).get("resultados", []) if "best_s" in r}
+    regressions = []
+    for rec in records:
+        ref = base.get(rec["id"])
+        if ref is None or "best_s" not in rec:
+            continue
+        rec["baseline_s"] = ref["best_s"]
+        rec["razao"] = rec["best_s"] / ref["best_s"] if ref["best_s"] > 0 else None
+        if rec["best_s"] > ref["best_s"] * (1 + threshold) and rec["best_s"] - ref["best_s"] > floor_s:
+            rec["regressao"] = True
+            regressions.append(rec)
+    return regressions
+
+
+# ----------------- CLI -----------------
+def _fmt_time(s: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("µs", 1e-6)):
+        if s >= scale:
+            return f"{s / scale:7.2f} {unit}"
+    return f"{s / 1e-9:7.0f} ns"
+
+def _print_record(rec):
+    cat = f"{rec['I']}" + ("" if rec["catalogo"] == "real" else "*")
+    head = f"{rec['caso']:30s} N={rec['N']:<9,d} I={cat:<5s}"
+    if "pulado" in rec:
+        print(f"{head} pulado ({rec['pulado']})", file=sys.stderr)
+        return
+    tail = f"  {rec['blends_por_s']:14,.0f} blends/s"
+    if "razao" in rec:
+        tail += f"  {rec['razao']:5.2f}× baseline" + ("  ← REGRESSÃO" if rec.get("regressao") else "")
+    print(f"{head} {_fmt_time(rec['best_s'])}{tail}", file=sys.stderr)
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmarks do motor de blends (sem navegador), com baseline.",
+                                 epilog="I marcado com * = catálogo sintético.")
+    ap.add_argument("--perfil", choices=tuple(PROFILES), default="rapido",
+                    help="grade de escalas (rapido: até 10^4 blends; completo: até 10^6 e 1000 ingredientes)")
+    ap.add_argument("-k", dest="filtro", action="append", help="roda só casos cujo nome contém o texto (repetível)")
+    ap.add_argument("-o", "--saida", default=DEFAULT_OUTPUT, help=f"JSON de resultados (padrão: {DEFAULT_OUTPUT})")
+    ap.add_argument("--baseline", default=BASELINE_PATH, help="JSON de referência para comparar")
+    ap.add_argument("--limiar", type=float, default=DEFAULT_THRESHOLD,
+                    help="regressão = tempo > baseline·(1+limiar) (padrão: 0.5)")
+    ap.add_argument("--piso-us", type=float, default=DEFAULT_FLOOR_S * 1e6,
+                    help="ignora diferenças menores que isso por chamada, em µs (padrão: 5)")
+    ap.add_argument("--remedir", type=int, default=3,
+                    help="remedições de um caso suspeito de regressão antes de reprovar (padrão: 3)")
+    ap.add_argument("--atualizar-baseline", action="store_true", help="grava esta execução na baseline")
+    args = ap.parse_args(argv)
+
+    baseline = load_report(args.baseline)
+    if baseline and baseline.get("ambiente", {}).get("maquina") != platform.node():
+        print(f"Aviso: baseline medida em outra máquina ({baseline['ambiente'].get('maquina')}); "
+              "compare com cautela ou regrave com --atualizar-baseline.", file=sys.stderr)
+
+    check = None
+    if baseline and not args.atualizar_baseline:
+        check = lambda rec: bool(compare([dict(rec)], baseline, args.limiar, args.piso_us * 1e-6))
+
+    def progress(rec):
+        if check:
+            compare([rec], baseline, args.limiar, args.piso_us * 1e-6)
+        _print_record(rec)
+
+    records = run(args.perfil, args.filtro, progress, check, args.remedir)
+    rep = report(records, args.perfil)
+    write_report(args.saida, rep)
+    print(f"{len(records)} casos → {args.saida}", file=sys.stderr)
+
+    if args.atualizar_baseline:
+        write_report(args.baseline, merge_baseline(baseline, rep))
+        print(f"baseline atualizada: {args.baseline}", file=sys.stderr)
+        return 0
+    regressions = [r for r in records if r.get("regressao")]
+    if regressions:
+        print(f"{len(regressions)} regressão(ões) acima de {args.limiar:.0%}:", file=sys.stderr)
+        for r in regressions:
+            print(f"  {r['id']}: {_fmt_time(r['baseline_s']).strip()} → {_fmt_time(r['best_s']).strip()}",
+                  file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+# blend_charts.py
+# Gráficos da aba de blend em dois backends, escolhidos por implantação via a variável de
+# ambiente LIPIDPALMA_CHARTS:
+#   - "png" (padrão): matplotlib renderizado no servidor, com cache LRU compartilhado entre
+#     reruns e sessões;
+#   - "plotly": specs declarativas (dict no formato de figura do Plotly, poucos KB de JSON)
+#     desenhadas no navegador, sem custo de rasterização no servidor.
+# No backend PNG, as figuras são criadas fora do pyplot (sem registro global, seguro
+# entre threads do Streamlit) e liberadas no finally de cada render. As entradas são
+# quantizadas antes de virar chave: variações abaixo da resolução do gráfico
+# reaproveitam o mesmo PNG.
+
+import io
+import math
+import os
+from functools import lru_cache
+
+import numpy as np
+from matplotlib.figure import Figure
+
+import blend_profiler as profiler
+from blend_engine import FA_ORDER, RADAR_KEYS
+
+CHART_BACKENDS = ("png", "plotly")
+CHART_BACKEND = os.environ.get("LIPIDPALMA_CHARTS", "png").strip().lower()
+if CHART_BACKEND not in CHART_BACKENDS:
+    CHART_BACKEND = "png"
+
+CHART_CACHE_SIZE = 256     # PNGs em memória (≈ 30–80 KB cada)
+_DPI = 200                 # mesmo padrão do st.pyplot
+
+FRIENDLY_FA_LABELS = {
+    "C12:0": "C12:0 (Láurico)",
+    "C14:0": "C14:0 (Mirístico)",
+    "C16:0": "C16:0 (Palmítico)",
+    "C18:0": "C18:0 (Esteárico)",
+    "C18:1": "C18:1 (Oleico)",
+    "C18:2": "C18:2 (Linoleico)",
+    "C18:3": "C18:3 (Linolênico)",
+}
+
+
+def _q(values, nd: int) -> tuple:
+    """Quantiza uma sequência numérica em tupla hashable (chave de cache)."""
+    return tuple(round(float(v), nd) for v in values)
+
+def _render(draw, subplot_kw=None) -> bytes:
+    profiler.count("figuras renderizadas")
+    with profiler.span("render PNG"):
+        return _render_figure(draw, subplot_kw)
+
+def _render_figure(draw, subplot_kw=None) -> bytes:
+    fig = Figure()
+    try:
+        ax = fig.add_subplot(111, **(subplot_kw or {}))
+        draw(ax)
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=_DPI, bbox_inches="tight")
+        return buf.getvalue()
+    finally:
+        fig.clear()
+
+
+# ----------------- Gráficos (chaves já quantizadas) -----------------
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def _fa_bars_png(values: tuple) -> bytes:
+    def draw(ax):
+        ax.bar(range(len(FA_ORDER)), values)
+        ax.set_xticks(range(len(FA_ORDER)))
+        ax.set_xticklabels([FRIENDLY_FA_LABELS.get(k, k) for k in FA_ORDER], rotation=45, ha='right')
+        ax.set_ylabel('%')
+        ax.set_title('Composição por Ácido Graxo (%)')
+    return _render(draw)
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def _radar_png(labels: tuple, values) -> bytes:
+    def draw(ax):
+        N = len(labels)
+        angles = [n / float(N) * 2 * math.pi for n in range(N)]
+        if values is not None:
+            ax.plot(angles + angles[:1], list(values) + list(values[:1]))
+            ax.fill(angles + angles[:1], list(values) + list(values[:1]), alpha=0.25)
+        ax.set_xticks(angles)
+        ax.set_xticklabels(labels)
+        ax.set_yticklabels([])
+        ax.set_title("Radar Sensorial (0–100)")
+    return _render(draw, subplot_kw=dict(polar=True))
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def _bars_png(title: str, labels: tuple, deltas: tuple, ylabel: str) -> bytes:
+    def draw(ax):
+        ax.bar(range(len(labels)), deltas)
+        ax.set_xticks(range(len(labels)))
+        ax.set_xticklabels(labels, rotation=45, ha='right')
+        ax.set_ylabel(ylabel)
+        ax.set_title(title)
+    return _render(draw)
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def _hist_png(title: str, counts: tuple, edges: tuple, spec: tuple, xlabel: str) -> bytes:
+    def draw(ax):
+        ax.stairs(counts, edges, fill=True)
+        for lim in spec:
+            if lim is not None:
+                ax.axvline(lim, color="red", linestyle="--", linewidth=1)
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel("Amostras")
+        ax.set_title(title)
+    return _render(draw)
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def _scatter_png(x: tuple, y: tuple, xlabel: str, ylabel: str, title: str) -> bytes:
+    def draw(ax):
+        ax.scatter(x, y, s=14)
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel(ylabel)
+        ax.set_title(title)
+    return _render(draw)
+
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def _heatmap_png(title: str, rows: tuple, cols: tuple, values: tuple) -> bytes:
+    def draw(ax):
+        M = np.array(values, dtype=float).reshape(len(rows), len(cols))
+        lim = float(np.nanmax(np.abs(M))) or 1.0
+        im = ax.imshow(M, cmap="RdBu", vmin=-lim, vmax=lim, aspect="auto")
+        ax.set_xticks(range(len(cols)))
+        ax.set_xticklabels(cols, rotation=45, ha="right")
+        ax.set_yticks(range(len(rows)))
+        ax.set_yticklabels(rows, fontsize=8 if len(rows) > 15 else 10)
+        if M.size <= 200:
+            for i in range(M.shape[0]):
+                for j in range(M.shape[1]):
+                    ax.text(j, i, f"{M[i, j]:+.1f}", ha="center", va="center", fontsize=7)
+        ax.figure.colorbar(im, ax=ax)
+        ax.set_title(title)
+    return _render(draw)
+
+
+# ----------------- API (quantiza e delega ao cache) -----------------
+def fa_bars_png(fa_norm: dict) -> bytes:
+    """Barras do perfil FA (%, resolução 0,1 pp)."""
+    return _fa_bars_png(_q((fa_norm.get(k, 0.0) for k in FA_ORDER), 1))
+
+def radar_png(rad_dict: dict = None) -> bytes:
+    """Radar sensorial; vazio/None → só o frame (eixos e rótulos)."""
+    if not rad_dict:
+        return _radar_png(tuple(RADAR_KEYS), None)
+    return _radar_png(tuple(rad_dict.keys()), _q(rad_dict.values(), 0))
+
+def tradeoff_bars_png(title: str, labels, deltas, ylabel: str) -> bytes:
+    return _bars_png(title, tuple(labels), _q(deltas, 2), ylabel)
+
+def hist_png(title: str, values, spec, xlabel: str, bins: int = 60) -> bytes:
+    """Histograma; a chave é a contagem por faixa (não as amostras)."""
+    counts, edges = np.histogram(np.asarray(values, dtype=float), bins=bins)
+    return _hist_png(title, tuple(counts.tolist()), _q(edges, 4),
+                     tuple(None if v is None else float(v) for v in (spec or ())), xlabel)
+
+def scatter_png(x, y, xlabel: str, ylabel: str, title: str) -> bytes:
+    return _scatter_png(_q(x, 2), _q(y, 2), xlabel, ylabel, title)
+
+def delta_heatmap_png(title: str, rows, cols, deltas) -> bytes:
+    """Mapa de calor (linhas × colunas) de deltas, centrado em zero."""
+    return _heatmap_png(title, tuple(rows), tuple(cols), _q(np.asarray(deltas, dtype=float).ravel(), 1))
+
+def waterfall_png(title: str, names, starts, durations) -> bytes:
+    """Cascata de etapas (barras horizontais de início + duração, em ms); sem cache (muda a cada rerun)."""
+    def draw(ax):
+        y = range(len(names))
+        ax.barh(y, durations, left=starts, height=0.6)
+        ax.set_yticks(list(y))
+        ax.set_yticklabels(names, fontsize=8)
+        ax.invert_yaxis()
+        ax.set_xlabel("ms")
+        ax.set_title(title)
+    return _render_figure(draw)
+
+def chart_cache_info() -> dict:
+    """Estatísticas (hits/misses/tamanho) de cada cache, para diagnóstico."""
+    return {f.__name__.strip("_"): f.cache_info()._asdict()
+            for f in (_fa_bars_png, _radar_png, _bars_png, _hist_png, _scatter_png, _heatmap_png)}
+
+def clear_chart_cache():
+    for f in (_fa_bars_png, _radar_png, _bars_png, _hist_png, _scatter_png, _heatmap_png):
+        f.cache_clear()
+
+
+# ----------------- Specs declarativas (backend "plotly") -----------------
+# Dicts simples (sem importar plotly aqui): st.plotly_chart aceita o formato de figura.
+_SPEC_LAYOUT = {"margin": {"l": 40, "r": 20, "t": 50, "b": 40}, "height": 360}
+
+def _layout(title: str, **extra) -> dict:
+    return {**_SPEC_LAYOUT, "title": {"text": title}, **extra}
+
+def fa_bars_spec(fa_norm: dict) -> dict:
+    return {
+        "data": [{"type": "bar", "x": [FRIENDLY_FA_LABELS.get(k, k) for k in FA_ORDER],
+                  "y": [round(float(fa_norm.get(k, 0.0)), 2) for k in FA_ORDER]}],
+        "layout": _layout("Composição por Ácido Graxo (%)", yaxis={"title": {"text": "%"}}),
+    }
+
+def radar_spec(rad_dict: dict = None) -> dict:
+    labels = list(rad_dict.keys()) if rad_dict else list(RADAR_KEYS)
+    values = [float(rad_dict[k]) for k in labels] if rad_dict else []
+    trace = {"type": "scatterpolar", "theta": labels + labels[:1], "r": values + values[:1], "fill": "toself"}
+    return {
+        "data": [trace] if rad_dict else [{**trace, "r": [None] * (len(labels) + 1), "fill": "none"}],
+        "layout": _layout("Radar Sensorial (0–100)", showlegend=False,
+                          polar={"radialaxis": {"range": [0, 100], "showticklabels": False}}),
+    }
+
+def tradeoff_bars_spec(title: str, labels, deltas, ylabel: str) -> dict:
+    return {
+        "data": [{"type": "bar", "x": list(labels), "y": [round(float(d), 2) for d in deltas]}],
+        "layout": _layout(title, yaxis={"title": {"text": ylabel}}),
+    }
+
+def hist_spec(title: str, values, spec, xlabel: str, bins: int = 60) -> dict:
+    """Histograma pré-agregado: envia só as contagens por faixa (não as amostras)."""
+    counts, edges = np.histogram(np.asarray(values, dtype=float), bins=bins)
+    centers = ((edges[:-1] + edges[1:]) / 2).round(4).tolist()
+    lines = [{"type": "line", "x0": float(v), "x1": float(v), "yref": "paper", "y0": 0, "y1": 1,
+              "line": {"color": "red", "dash": "dash", "width": 1}} for v in (spec or ()) if v is not None]
+    return {
+        "data": [{"type": "bar", "x": centers, "y": counts.tolist(), "width": float(edges[1] - edges[0])}],
+        "layout": _layout(title, bargap=0, shapes=lines,
+                          xaxis={"title": {"text": xlabel}}, yaxis={"title": {"text": "Amostras"}}),
+    }
+
+def scatter_spec(x, y, xlabel: str, ylabel: str, title: str) -> dict:
+    return {
+        "data": [{"type": "scatter", "mode": "markers", "x": [round(float(v), 2) for v in x],
+                  "y": [round(float(v), 2) for v in y], "marker": {"size": 6}}],
+        "layout": _layout(title, xaxis={"title": {"text": xlabel}}, yaxis={"title": {"text": ylabel}}),
+    }
+
+def delta_heatmap_spec(title: str, rows, cols, deltas) -> dict:
+    M = np.round(np.asarray(deltas, dtype=float), 1)
+    lim = float(np.nanmax(np.abs(M))) if M.size else 1.0
+    return {
+        "data": [{"type": "heatmap", "z": M.tolist(), "x": list(cols), "y": list(rows),
+                  "colorscale": "RdBu", "zmid": 0, "zmin": -lim, "zmax": lim,
+                  "texttemplate": "%{z:+.1f}" if M.size <= 200 else None}],
+        "layout": _layout(title, height=max(360, 28 * len(rows) + 120), yaxis={"autorange": "reversed"}),
+    }
+
+def waterfall_spec(title: str, names, starts, durations) -> dict:
+    return {
+        "data": [{"type": "bar", "orientation": "h", "y": list(names), "x": [round(float(d), 2) for d in durations],
+                  "base": [round(float(v), 2) for v in starts]}],
+        "layout": _layout(title, height=max(300, 22 * len(names) + 100),
+                          xaxis={"title": {"text": "ms"}}, yaxis={"autorange": "reversed"}),
+    }
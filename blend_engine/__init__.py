@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# blend_engine/__init__.py
+# Motor numérico do Blend Enzimático (sem Streamlit, matplotlib ou pandas): o catálogo de
+# ingredientes, perfis FA e faixas de KPI é compilado uma única vez em arrays NumPy
+# (cenário × ingrediente × ácido graxo) e todas as misturas/KPIs rodam como operações
+# matriciais, inclusive para lotes de N blends em uma única chamada.
+#
+# Submódulos:
+#   catalog      catálogo (dicts de literatura + CompiledCatalog) e conversões dict ↔ vetor
+#   mixing       perfis FA de misturas A/B/C (lote e dict) e ajuste fino sobre perfil real
+#   kpis         II, ISap e índice de fusão técnicos; médias de literatura ponderadas
+#   calibration  artefato de calibração, KPIs calibrados / PF em °C, KPIs do baseline
+#   sensory      notas por finalidade e radar (dict e lote)
+#   tradeoffs    sensibilidade em forma fechada e barras dos gráficos
+#   evaluation   avaliação de um blend com as regras das telas (heurístico / perfil real)
+#   incremental  estado do modo heurístico entre reruns (atualização de posto 1 por slider)
+#   validation   checagem de chaves, faixas, ajuste e total; normalização para 100%;
+#                camadas efetivas de um blend salvo; percentuais digitados/colados por camada
+#   schema       tipos do API (KPIs, TradeoffBars, HeuristicResult, ...)
+#
+# `import blend_engine` é praticamente instantâneo: os nomes abaixo são resolvidos na
+# primeira leitura (PEP 562), carregando só o submódulo necessário — um worker que usa
+# apenas `blend_engine.schema` nem importa NumPy. `from blend_engine import X` continua
+# valendo para todos os nomes do antigo módulo único.
+
+import importlib
+
+_EXPORTS = {
+    "catalog": (
+        "INGREDIENTS", "KPI_MEANS", "KPI_RANGES", "FA_CONST", "FA_ORDER", "FA_PROFILES_RANGED",
+        "ISAP_DELTA_CLAMP", "SCENARIOS", "KPI_KEYS", "CompiledCatalog", "compile_catalog", "CATALOG",
+        "fa_vector", "fa_dict", "ingredient_vector", "ingredient_matrix",
+        "_clamp", "_normalize_percentages", "_get_profile",
+    ),
+    "mixing": ("normalize_rows", "mix_raw", "mix_fa", "blend_profile", "combine_profile",
+               "_as_2d", "_fa_from_mix"),
+    "kpis": (
+        "iodine_index_v", "saponification_index_v", "melt_index_v", "kpi_means_mix", "evaluate_blends",
+        "melt_index", "iodine_index", "saponification_index",
+        "_MELT_W_LS", "_MELT_W_MS", "_MELT_W_MONO", "_MELT_W_POLY", "_MELT_CURV",
+    ),
+    "calibration": (
+        "PF_SENSITIVITY", "pf_index_to_celsius", "pf_index_to_celsius_v", "CALIBRATION_SCHEMA",
+        "CALIBRATION_PATH", "calibration_source_hash", "fit_calibration", "write_calibration",
+        "load_calibration", "calibration_version", "calibration_coefficients", "ii_calibrated_from_fa",
+        "isap_calibrated_from_fa", "ii_calibrated_v", "isap_calibrated_v", "kpis_calibrados_por_medias",
+        "kpis_tecnicos_do_baseline",
+        "_fit_pf_index_to_celsius", "_fit_linear_map_x_to_y", "_ingredient_means_fa",
+        "_prepare_kpi_calibration", "_fit_diagnostics", "_set_calibration", "_pf_fallback_c",
+    ),
+    "sensory": (
+        "SCORE_KEYS", "RADAR_KEYS", "scores_finais_v", "score_ingredient_blends", "score_fa_profiles",
+        "_spread", "_hidr", "_ocl", "_toque_seco", "_brilho", "_scores_finais", "_mask_empty",
+    ),
+    "tradeoffs": (
+        "TRADEOFF_STEPS", "tradeoff_sensitivity_blend", "tradeoff_sensitivity_profile",
+        "tradeoff_bars", "tradeoffs_blend", "tradeoffs_profile",
+        "_BASIS_COLS", "_kpi_basis", "_kpis_from_projection", "_deltas",
+    ),
+    "evaluation": ("evaluate_heuristic", "evaluate_profile"),
+    "incremental": ("IncrementalBlend",),
+    "validation": ("TOTAL_TOL", "ADJUST_WARN_PCT", "total_status", "check_adjust", "validate_blend",
+                   "normalize_blend", "active_layers", "heur_blend_layers", "parse_layer_text"),
+    "schema": ("FAProfile", "Mix", "Scores", "Radar", "KPIs", "BaselineKPIs", "TradeoffBars",
+               "HeuristicResult", "ProfileResult", "Issue"),
+}
+# lidos a cada acesso (mudam quando a calibração é recarregada): não entram no cache do pacote
+_DYNAMIC = {"_PF_A": "calibration", "_PF_B": "calibration", "_II_A": "calibration", "_II_B": "calibration",
+            "_IS_A": "calibration", "_IS_B": "calibration", "_PF_FALLBACK_C": "calibration"}
+
+_LOCATION = {name: mod for mod, names in _EXPORTS.items() for name in names}
+__all__ = sorted(name for name in _LOCATION if not name.startswith("_"))
+
+
+def __getattr__(name):
+    mod = _LOCATION.get(name) or _DYNAMIC.get(name)
+    if mod is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{mod}"), name)
+    if name not in _DYNAMIC:
+        globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+# blend_engine/__main__.py
+# python -m blend_engine [--recalibrar]  → mostra (ou regera) o artefato de calibração
+
+import sys
+
+from .calibration import CALIBRATION_PATH, load_calibration, write_calibration
+
+cal = write_calibration() if "--recalibrar" in sys.argv[1:] else load_calibration()
+print(f"calibração {cal['version']} ({CALIBRATION_PATH})")
+for key, diag in cal["diagnostics"].items():
+    a, b = cal["coefficients"][key]
+    print(f"  {key:5s} a={a:.6g} b={b:.6g}  " + "  ".join(f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}"
+                                                    for k, v in diag.items()))
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+# blend_engine/calibration.py
+# Calibração: mapeamentos lineares índice técnico → KPI de literatura (II, ISap, PF °C),
+# guardados num artefato versionado (calibration.json) e carregados sob demanda, mais os
+# KPIs do baseline (médias de literatura e técnico do perfil FA).
+
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .catalog import (
+    CATALOG, FA_CONST, FA_ORDER, FA_PROFILES_RANGED, KPI_MEANS, _get_profile, fa_dict, ingredient_vector,
+)
+from .kpis import (
+    _MELT_CURV, _MELT_W_LS, _MELT_W_MONO, _MELT_W_MS, _MELT_W_POLY,
+    iodine_index, iodine_index_v, kpi_means_mix, melt_index, melt_index_v,
+    saponification_index, saponification_index_v,
+)
+from .mixing import mix_fa
+from .schema import BaselineKPIs, KPIs, Mix
+
+
+# -------------- Conversão PF índice -> °C (calibrada) --------------
+def _fit_pf_index_to_celsius():
+    """Ajusta uma regressão linear °C = a*(PF_idx) + b a partir dos ingredientes com PF calibrado."""
+    xs, ys = [], []
+    for ing_key, means in KPI_MEANS.items():
+        if "PF" in means:
+            prof = _get_profile(ing_key, "mean")
+            x = melt_index(prof)      # índice calculado do perfil 'mean'
+            y = means["PF"]          # °C calibrado de literatura
+            xs.append(float(x)); ys.append(float(y))
+    if len(xs) >= 2:
+        n = len(xs)
+        sumx = sum(xs); sumy = sum(ys)
+        sumx2 = sum(x*x for x in xs); sumxy = sum(x*y for x, y in zip(xs, ys))
+        denom = (n*sumx2 - sumx*sumx)
+        if abs(denom) > 1e-9:
+            a = (n*sumxy - sumx*sumy) / denom
+            b = (sumy - a*sumx) / n
+            return a, b
+    # fallback seguro (mapeamento razoável)
+    return 0.6, 5.0
+
+# ⛳ ANCHOR: pf_sensitivity_tune
+PF_SENSITIVITY = 1.15  # antes 1.6; reduz ganho para deltas mais realistas
+
+def pf_index_to_celsius(pf_idx: float) -> float:
+    """
+    Converte índice de PF (0–100) em °C.
+    Leve ganho de sensibilidade aplicado em 'a' (declive), preservando intercepto 'b'.
+    """
+    a, b = calibration_coefficients()["PF"]
+    return max(0.0, a * float(pf_idx) + b)
+
+def pf_index_to_celsius_v(pf_idx) -> np.ndarray:
+    """Versão vetorizada de pf_index_to_celsius (array de índices → array em °C)."""
+    a, b = calibration_coefficients()["PF"]
+    return np.maximum(0.0, a * np.asarray(pf_idx, dtype=float) + b)
+
+# ⛳ ANCHOR: kpi_linear_calibration
+def _fit_linear_map_x_to_y(x_list, y_list, default_a=1.0, default_b=0.0):
+    if len(x_list) >= 2:
+        n = len(x_list)
+        sx = sum(x_list); sy = sum(y_list)
+        sxx = sum(x*x for x in x_list); sxy = sum(x*y for x, y in zip(x_list, y_list))
+        denom = n*sxx - sx*sx
+        if abs(denom) > 1e-9:
+            a = (n*sxy - sx*sy) / denom
+            b = (sy - a*sx) / n
+            return a, b
+    return default_a, default_b
+
+def _ingredient_means_fa(ing_key: str) -> dict:
+    return _get_profile(ing_key, "mean")
+
+def _prepare_kpi_calibration():
+    xs_ii, ys_ii = [], []
+    xs_is, ys_is = [], []
+    for ing_key, means in KPI_MEANS.items():
+        fa_mean = _ingredient_means_fa(ing_key)
+        ii_raw = iodine_index(fa_mean)
+        is_raw = saponification_index(fa_mean)
+        ii_tgt = float(means.get("II", ii_raw))
+        is_tgt = float(means.get("ISap", is_raw))
+        xs_ii.append(ii_raw); ys_ii.append(ii_tgt)
+        xs_is.append(is_raw); ys_is.append(is_tgt)
+    a_ii, b_ii = _fit_linear_map_x_to_y(xs_ii, ys_ii, default_a=1.0, default_b=0.0)
+    a_is, b_is = _fit_linear_map_x_to_y(xs_is, ys_is, default_a=1.0, default_b=0.0)
+    return (a_ii, b_ii), (a_is, b_is)
+
+# ----------------- Artefato de calibração (versionado, carregado sob demanda) -----------------
+# Os coeficientes (II, ISap, PF) são ajustados a partir de KPI_MEANS/FA_PROFILES_RANGED e
+# gravados em calibration.json com o hash dos dados de origem e diagnósticos do ajuste.
+# Workers e jobs em lote só leem o arquivo; o reajuste acontece apenas quando o hash
+# dos dados muda (ou o arquivo não existe). LIPIDPALMA_CALIBRATION aponta outro caminho.
+CALIBRATION_SCHEMA = 1
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CALIBRATION_PATH = os.environ.get("LIPIDPALMA_CALIBRATION", os.path.join(_APP_DIR, "calibration.json"))
+_CALIBRATION = None
+
+def calibration_source_hash() -> str:
+    """SHA-256 dos dados que determinam o ajuste (médias, perfis, constantes FA e pesos do índice de fusão)."""
+    src = {
+        "schema": CALIBRATION_SCHEMA,
+        "KPI_MEANS": KPI_MEANS,
+        "FA_PROFILES_RANGED": FA_PROFILES_RANGED,
+        "FA_CONST": FA_CONST,
+        "melt": [_MELT_W_LS, _MELT_W_MS, _MELT_W_MONO, _MELT_W_POLY, _MELT_CURV],
+    }
+    return hashlib.sha256(json.dumps(src, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+def _fit_diagnostics(xs, ys, a, b) -> dict:
+    x = np.asarray(xs, dtype=float); y = np.asarray(ys, dtype=float)
+    if len(x) == 0:
+        return {"n": 0}
+    res = y - (a * x + b)
+    ss_tot = float(np.sum((y - y.mean()) ** 2))
+    return {
+        "n": int(len(x)),
+        "r2": (1.0 - float(np.sum(res ** 2)) / ss_tot) if ss_tot > 0 else None,
+        "rmse": float(np.sqrt(np.mean(res ** 2))),
+        "max_abs_residual": float(np.max(np.abs(res))),
+    }
+
+def fit_calibration() -> dict:
+    """Ajusta os três mapeamentos lineares e devolve o artefato completo (sem gravar)."""
+    (a_ii, b_ii), (a_is, b_is) = _prepare_kpi_calibration()
+    a_pf, b_pf = _fit_pf_index_to_celsius()
+
+    xs_ii, ys_ii, xs_is, ys_is, xs_pf, ys_pf = [], [], [], [], [], []
+    for ing_key, means in KPI_MEANS.items():
+        fa_mean = _ingredient_means_fa(ing_key)
+        xs_ii.append(iodine_index(fa_mean)); ys_ii.append(float(means.get("II", xs_ii[-1])))
+        xs_is.append(saponification_index(fa_mean)); ys_is.append(float(means.get("ISap", xs_is[-1])))
+        if "PF" in means:
+            xs_pf.append(melt_index(fa_mean)); ys_pf.append(float(means["PF"]))
+
+    source_hash = calibration_source_hash()
+    return {
+        "schema": CALIBRATION_SCHEMA,
+        "version": source_hash[:12],
+        "source_hash": source_hash,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        # PF: °C = a·PF_idx + b, sem PF_SENSITIVITY (aplicado na conversão)
+        "coefficients": {"II": [a_ii, b_ii], "ISap": [a_is, b_is], "PF": [a_pf, b_pf]},
+        "diagnostics": {
+            "II": _fit_diagnostics(xs_ii, ys_ii, a_ii, b_ii),
+            "ISap": _fit_diagnostics(xs_is, ys_is, a_is, b_is),
+            "PF": _fit_diagnostics(xs_pf, ys_pf, a_pf, b_pf),
+        },
+    }
+
+def write_calibration(path: str = None) -> dict:
+    """Reajusta e grava o artefato (escrita atômica). Retorna o artefato."""
+    path = path or CALIBRATION_PATH
+    cal = fit_calibration()
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(cal, fh, ensure_ascii=False, indent=2)
+        fh.write("\n")
+    os.replace(tmp, path)
+    _set_calibration(cal)
+    return cal
+
+def _set_calibration(cal: dict):
+    global _CALIBRATION, _PF_FALLBACK
+    _CALIBRATION = cal
+    _PF_FALLBACK = None   # depende dos coeficientes de PF
+
+def load_calibration(path: str = None) -> dict:
+    """
+    Artefato de calibração em uso (lido uma vez por processo).
+    Arquivo ausente, ilegível ou com hash diferente dos dados atuais → reajuste; a gravação
+    é tentada, mas um diretório somente leitura não impede o uso do ajuste em memória.
+    """
+    if _CALIBRATION is not None and path is None:
+        return _CALIBRATION
+    path = path or CALIBRATION_PATH
+    cal = None
+    try:
+        with open(path, encoding="utf-8") as fh:
+            cal = json.load(fh)
+        if cal.get("schema") != CALIBRATION_SCHEMA or cal.get("source_hash") != calibration_source_hash():
+            cal = None
+    except (OSError, ValueError):
+        cal = None
+    if cal is None:
+        try:
+            cal = write_calibration(path)
+        except OSError:
+            cal = fit_calibration()
+    _set_calibration(cal)
+    return cal
+
+def calibration_version() -> str:
+    return load_calibration()["version"]
+
+def calibration_coefficients() -> dict:
+    """Coeficientes lineares em uso: {"II": (a, b), "ISap": (a, b), "PF": (a, b)} (PF já com PF_SENSITIVITY)."""
+    c = load_calibration()["coefficients"]
+    (a_pf, b_pf) = c["PF"]
+    return {"II": tuple(c["II"]), "ISap": tuple(c["ISap"]), "PF": (a_pf * PF_SENSITIVITY, b_pf)}
+
+def ii_calibrated_from_fa(fa_pct: dict) -> float:
+    a, b = calibration_coefficients()["II"]
+    return a * iodine_index(fa_pct) + b
+
+def isap_calibrated_from_fa(fa_pct: dict) -> float:
+    a, b = calibration_coefficients()["ISap"]
+    return a * saponification_index(fa_pct) + b
+
+_CALIBRATION_ATTRS = {"_PF_A": ("PF", 0), "_PF_B": ("PF", 1), "_II_A": ("II", 0),
+                      "_II_B": ("II", 1), "_IS_A": ("ISap", 0), "_IS_B": ("ISap", 1)}
+
+def __getattr__(name):
+    # compatibilidade: os antigos globais calculados na importação agora vêm do artefato
+    if name in _CALIBRATION_ATTRS:
+        key, j = _CALIBRATION_ATTRS[name]
+        return load_calibration()["coefficients"][key][j]
+    if name == "_PF_FALLBACK_C":
+        return _pf_fallback_c()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# último recurso para ingredientes sem PF de literatura: PF estimado via perfil 'mean'
+_PF_FALLBACK = None
+
+def _pf_fallback_c() -> np.ndarray:
+    global _PF_FALLBACK
+    if _PF_FALLBACK is None:
+        _PF_FALLBACK = pf_index_to_celsius_v(melt_index_v(CATALOG.scenario_profiles("mean")))
+    return _PF_FALLBACK
+
+# >>> REPLACE: baseline usa KPI_RANGES por cenário (min/mean/max)
+def kpis_calibrados_por_medias(A_vals: Mix, C_vals: Mix, scenario: str) -> KPIs:
+    """
+    Baseline (sem ajuste): usa diretamente as faixas de literatura (KPI_RANGES) de acordo com o cenário
+    'min' | 'mean' | 'max'. Se algum ingrediente não estiver em KPI_RANGES, cai no KPI_MEANS.
+    Retorna II (estim.), ISap (mgKOH/g, estim.), PF (°C, estim.).
+    """
+    total_ref = sum(A_vals.values()) + sum(C_vals.values())
+    if total_ref <= 0:
+        return KPIs(0.0, 0.0, 0.0)
+
+    W = ingredient_vector(A_vals) + ingredient_vector(C_vals)
+    II, IS, PFc = kpi_means_mix(W, scenario, pf_fallback=_pf_fallback_c())[0]
+    return KPIs(float(II), float(IS), float(PFc))
+
+# ⛳ ANCHOR: kpis_tecnicos_do_baseline
+def kpis_tecnicos_do_baseline(A_vals: Mix, scenario: str = "mean", C_vals: Mix = None) -> BaselineKPIs:
+    """
+    KPIs do *baseline A* de forma **técnica**, a partir do perfil FA da Classe A (mais C_vals,
+    se informado) no cenário ('min'|'mean'|'max'; outro → 'mean'), sem ajuste B.
+    II/ISap não calibrados; PF convertido para °C. Retorna (II, ISap, PF_C, fa normalizado).
+    """
+    C_vals = C_vals or {}
+    if sum(A_vals.values()) + sum(C_vals.values()) <= 0:
+        return BaselineKPIs(0.0, 0.0, 0.0, {k: 0.0 for k in FA_ORDER})
+
+    fa_vec = mix_fa(A=ingredient_vector(A_vals), C=ingredient_vector(C_vals) if C_vals else None,
+                    scenario=scenario)
+    return BaselineKPIs(float(iodine_index_v(fa_vec)[0]), float(saponification_index_v(fa_vec)[0]),
+                        pf_index_to_celsius(float(melt_index_v(fa_vec)[0])), fa_dict(fa_vec[0]))
+
+def ii_calibrated_v(FA) -> np.ndarray:
+    a, b = calibration_coefficients()["II"]
+    return a * iodine_index_v(FA) + b
+
+def isap_calibrated_v(FA) -> np.ndarray:
+    a, b = calibration_coefficients()["ISap"]
+    return a * saponification_index_v(FA) + b
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+# blend_engine/catalog.py
+# Catálogo de ingredientes (Classe A/C), faixas de KPI de literatura e constantes FA,
+# compilados uma única vez em arrays NumPy (cenário × ingrediente × ácido graxo), e as
+# conversões dict ↔ vetor usadas pela API por dicionário.
+
+import numpy as np
+
+# ----------------- Catálogo de ingredientes (Classe A/C) -----------------
+INGREDIENTS = [
+    ("rbd_palma",            "🟠 RBD (Óleo de Palma)"),
+    ("estearina_palma",      "🧴 Estearina de Palma"),
+    ("oleina_palma",         "✨ Oleína de Palma"),
+    ("rpko_palmiste",        "🌰 RPKO (Óleo de Palmiste)"),
+    ("estearina_palmiste",   "🧼 Estearina de Palmiste"),
+    ("oleina_palmiste",      "💧 Oleína de Palmiste"),
+    ("pfad",                 "🌿 PFAD"),
+    ("soapstock",            "♻️ Soapstock"),
+]
+
+# ----------------- Médias calibradas (faixas típicas) -----------------
+# II/ISap = médias das faixas mostradas nos expanders;
+# PF (°C) = média calibrada quando disponível; usado como baseline de comunicação.
+KPI_MEANS = {
+    "rbd_palma":          {"II": 52.5, "ISap": 197.5, "PF": 36},  # 34–38 → 36
+    "estearina_palma":    {"II": 37.0, "ISap": 192.5, "PF": 54},  # ~50–58 → 54
+    "oleina_palma":       {"II": 60.0, "ISap": 200.0, "PF": 22},  # ~19–24 → 22
+    "rpko_palmiste":      {"II": 18.0, "ISap": 247.5, "PF": 26},  # ~24–28 → 26
+    "estearina_palmiste": {"II": 11.0, "ISap": 242.5, "PF": 35},  # ~33–37 → 35
+    "oleina_palmiste":    {"II": 23.0, "ISap": 247.5, "PF": 20},  # ~18–22 → 20
+    "pfad":               {"II": 50.0, "ISap": 195.0, "PF": 50},  # ~45–55 → 50
+    "soapstock":          {"II": 57.5, "ISap": 197.5, "PF": 40},  # ~35–45 → 40
+}
+
+# >>> ADD: KPI_RANGES (min/mean/max) – coerente com os expanders
+KPI_RANGES = {
+    "rbd_palma": {
+        "II":   {"min": 50.0, "mean": 52.5, "max": 55.0},
+        "ISap": {"min": 190.0, "mean": 197.5, "max": 205.0},
+        "PF":   {"min": 34.0, "mean": 36.0, "max": 38.0},
+    },
+    "estearina_palma": {
+        "II":   {"min": 32.0, "mean": 37.0, "max": 42.0},
+        "ISap": {"min": 185.0, "mean": 192.5, "max": 200.0},
+        "PF":   {"min": 50.0, "mean": 54.0, "max": 58.0},
+    },
+    "oleina_palma": {
+        "II":   {"min": 55.0, "mean": 60.0, "max": 65.0},
+        "ISap": {"min": 195.0, "mean": 200.0, "max": 205.0},
+        "PF":   {"min": 19.0, "mean": 22.0, "max": 24.0},
+    },
+    "rpko_palmiste": {
+        "II":   {"min": 14.0, "mean": 18.0, "max": 22.0},
+        "ISap": {"min": 240.0, "mean": 247.5, "max": 255.0},
+        "PF":   {"min": 24.0, "mean": 26.0, "max": 28.0},
+    },
+    "estearina_palmiste": {
+        "II":   {"min":  8.0, "mean": 11.0, "max": 14.0},
+        "ISap": {"min": 235.0, "mean": 242.5, "max": 250.0},
+        "PF":   {"min": 33.0, "mean": 35.0, "max": 37.0},
+    },
+    "oleina_palmiste": {
+        "II":   {"min": 18.0, "mean": 23.0, "max": 28.0},
+        "ISap": {"min": 240.0, "mean": 247.5, "max": 255.0},
+        "PF":   {"min": 18.0, "mean": 20.0, "max": 22.0},
+    },
+    "pfad": {
+        "II":   {"min": 45.0, "mean": 50.0, "max": 55.0},
+        "ISap": {"min": 185.0, "mean": 195.0, "max": 205.0},
+        "PF":   {"min": 45.0, "mean": 50.0, "max": 55.0},
+    },
+    "soapstock": {
+        "II":   {"min": 50.0, "mean": 57.5, "max": 65.0},
+        "ISap": {"min": 185.0, "mean": 197.5, "max": 210.0},
+        "PF":   {"min": 35.0, "mean": 40.0, "max": 45.0},
+    },
+}
+
+# ----------------- Constantes FA -----------------
+FA_CONST = {
+    "C12:0": {"IV": 0.0,   "MW": 200.32},
+    "C14:0": {"IV": 0.0,   "MW": 228.37},
+    "C16:0": {"IV": 0.0,   "MW": 256.42},
+    "C18:0": {"IV": 0.0,   "MW": 284.48},
+    "C18:1": {"IV": 90.0,  "MW": 282.47},
+    "C18:2": {"IV": 181.0, "MW": 280.45},
+    "C18:3": {"IV": 273.0, "MW": 278.43},
+}
+FA_ORDER = list(FA_CONST.keys())
+
+# ----------------- Perfis FA por ingrediente (Min/Mean/Max) -----------------
+FA_PROFILES_RANGED = {
+    "rbd_palma": {
+        "mean": {"C16:0": 44, "C18:1": 39, "C18:2": 10, "C18:0": 4, "C14:0": 1, "C12:0": 0},
+        "min":  {"C16:0": 41, "C18:1": 36, "C18:2": 8,  "C18:0": 3, "C14:0": 1, "C12:0": 0},
+        "max":  {"C16:0": 47, "C18:1": 42, "C18:2": 12, "C18:0": 5, "C14:0": 2, "C12:0": 1},
+    },
+    "oleina_palma": {
+        "mean": {"C16:0": 39, "C18:1": 42, "C18:2": 13, "C18:0": 4, "C14:0": 1, "C12:0": 0},
+        "min":  {"C16:0": 36, "C18:1": 39, "C18:2": 11, "C18:0": 3, "C14:0": 1, "C12:0": 0},
+        "max":  {"C16:0": 42, "C18:1": 45, "C18:2": 15, "C18:0": 5, "C14:0": 2, "C12:0": 1},
+    },
+    "estearina_palma": {
+        "mean": {"C16:0": 55, "C18:1": 33, "C18:2": 7,  "C18:0": 4, "C14:0": 1, "C12:0": 0},
+        "min":  {"C16:0": 52, "C18:1": 30, "C18:2": 6,  "C18:0": 3, "C14:0": 1, "C12:0": 0},
+        "max":  {"C16:0": 58, "C18:1": 36, "C18:2": 9,  "C18:0": 5, "C14:0": 2, "C12:0": 1},
+    },
+    "rpko_palmiste": {
+        "mean": {"C12:0": 48, "C14:0": 16, "C16:0": 8,  "C18:1": 15, "C18:2": 2, "C18:0": 2},
+        "min":  {"C12:0": 45, "C14:0": 14, "C16:0": 7,  "C18:1": 13, "C18:2": 2, "C18:0": 1},
+        "max":  {"C12:0": 51, "C14:0": 18, "C16:0": 9,  "C18:1": 17, "C18:2": 3, "C18:0": 3},
+    },
+    "oleina_palmiste": {
+        "mean": {"C12:0": 42, "C14:0": 15, "C16:0": 10, "C18:1": 20, "C18:2": 4, "C18:0": 2},
+        "min":  {"C12:0": 39, "C14:0": 14, "C16:0": 9,  "C18:1": 18, "C18:2": 3, "C18:0": 1},
+        "max":  {"C12:0": 45, "C14:0": 17, "C16:0": 11, "C18:1": 22, "C18:2": 5, "C18:0": 3},
+    },
+    "estearina_palmiste": {
+        "mean": {"C12:0": 50, "C14:0": 17, "C16:0": 7,  "C18:1": 12, "C18:2": 3, "C18:0": 3},
+        "min":  {"C12:0": 47, "C14:0": 15, "C16:0": 6,  "C18:1": 10, "C18:2": 2, "C18:0": 2},
+        "max":  {"C12:0": 53, "C14:0": 19, "C16:0": 8,  "C18:1": 14, "C18:2": 4, "C18:0": 4},
+    },
+    "pfad": {
+        "mean": {"C16:0": 50, "C18:1": 35, "C18:2": 10, "C18:0": 5},
+        "min":  {"C16:0": 47, "C18:1": 33, "C18:2": 8,  "C18:0": 4},
+        "max":  {"C16:0": 53, "C18:1": 37, "C18:2": 12, "C18:0": 6},
+    },
+    # ⛳ MICRO4: soapstock_variabilidade_mais_larga
+    "soapstock": {
+        "mean": {"C16:0": 40, "C18:1": 40, "C18:2": 15, "C18:0": 5},
+        # aumentamos a amplitude min/max para refletir maior variabilidade típica do subproduto
+        "min":  {"C16:0": 35, "C18:1": 36, "C18:2": 12, "C18:0": 4},
+        "max":  {"C16:0": 45, "C18:1": 44, "C18:2": 20, "C18:0": 7},
+    },
+}
+
+# --- MICRO3A: parâmetros para suavizar ΔISap ---
+ISAP_DELTA_CLAMP = 6.0  # mgKOH/g (limite |ΔISap|); ajuste fino se quiser
+def _clamp(x, lo, hi):
+    return max(lo, min(hi, x))
+
+SCENARIOS = ("min", "mean", "max")
+KPI_KEYS = ("II", "ISap", "PF")
+
+
+# ----------------- Catálogo compilado -----------------
+class CompiledCatalog:
+    """
+    Catálogo em forma matricial.
+      - profiles: (S, I, F) % de cada ácido graxo por cenário/ingrediente
+      - iv, sap:  (F,) índice de iodo por FA e fator 560/MW (saponificação)
+      - kpi:      (S, I, 3) II/ISap/PF(°C) de literatura por cenário (NaN = sem PF)
+    Ingredientes sem um cenário caem no perfil 'mean' (mesma regra de _get_profile).
+    """
+    __slots__ = ("ing_keys", "ing_index", "labels", "fa_order", "fa_index",
+                 "scenario_index", "profiles", "iv", "sap", "kpi", "kpi_in_ranges")
+
+    def __init__(self, ing_keys, labels, fa_order, profiles, iv, sap, kpi, kpi_in_ranges):
+        self.ing_keys = tuple(ing_keys)
+        self.ing_index = {k: i for i, k in enumerate(self.ing_keys)}
+        self.labels = tuple(labels)
+        self.fa_order = tuple(fa_order)
+        self.fa_index = {k: j for j, k in enumerate(self.fa_order)}
+        self.scenario_index = {s: n for n, s in enumerate(SCENARIOS)}
+        self.profiles = profiles
+        self.iv = iv
+        self.sap = sap
+        self.kpi = kpi
+        self.kpi_in_ranges = kpi_in_ranges
+
+    @property
+    def n_ingredients(self) -> int:
+        return len(self.ing_keys)
+
+    def scenario_profiles(self, scenario: str) -> np.ndarray:
+        """Matriz (I, F) de perfis FA no cenário ('min'|'mean'|'max'; outro → 'mean')."""
+        return self.profiles[self.scenario_index.get(scenario, 1)]
+
+
+def compile_catalog(fa_profiles=None, fa_const=None, kpi_ranges=None, kpi_means=None,
+                    ingredients=None) -> CompiledCatalog:
+    """Compila os dicionários do catálogo em arrays NumPy (chamado uma vez na importação)."""
+    fa_profiles = FA_PROFILES_RANGED if fa_profiles is None else fa_profiles
+    fa_const = FA_CONST if fa_const is None else fa_const
+    kpi_ranges = KPI_RANGES if kpi_ranges is None else kpi_ranges
+    kpi_means = KPI_MEANS if kpi_means is None else kpi_means
+    ingredients = INGREDIENTS if ingredients is None else ingredients
+
+    labels_by_key = dict(ingredients)
+    keys = [k for k, _ in ingredients]
+    for k in list(fa_profiles) + list(kpi_means) + list(kpi_ranges):
+        if k not in labels_by_key:
+            labels_by_key[k] = k
+            keys.append(k)
+    fa_order = list(fa_const.keys())
+    fa_idx = {k: j for j, k in enumerate(fa_order)}
+
+    S, I, F = len(SCENARIOS), len(keys), len(fa_order)
+    profiles = np.zeros((S, I, F), dtype=float)
+    kpi = np.zeros((S, I, len(KPI_KEYS)), dtype=float)
+    kpi_in_ranges = np.zeros(I, dtype=bool)
+    for i, ing_key in enumerate(keys):
+        profs = fa_profiles.get(ing_key, {})
+        kr = kpi_ranges.get(ing_key)
+        km = kpi_means.get(ing_key, {})
+        kpi_in_ranges[i] = bool(kr)
+        for s, scen in enumerate(SCENARIOS):
+            for fa_key, pct in profs.get(scen, profs.get("mean", {})).items():
+                if fa_key in fa_idx:
+                    profiles[s, i, fa_idx[fa_key]] = float(pct)
+            if kr:
+                kpi[s, i] = [float(kr[m][scen]) for m in KPI_KEYS]
+            else:
+                # fallback: médias calibradas; PF ausente fica NaN (estimado via perfil depois)
+                kpi[s, i] = [float(km.get("II", 0.0)), float(km.get("ISap", 0.0)),
+                             float(km["PF"]) if "PF" in km else np.nan]
+
+    iv = np.array([float(fa_const[k]["IV"]) for k in fa_order])
+    sap = np.array([560.0 / float(fa_const[k]["MW"]) for k in fa_order])
+    return CompiledCatalog(keys, [labels_by_key[k] for k in keys], fa_order,
+                           profiles, iv, sap, kpi, kpi_in_ranges)
+
+
+CATALOG = compile_catalog()
+
+
+# ----------------- Conversões dict <-> vetor -----------------
+def fa_vector(fa_pct: dict, catalog: CompiledCatalog = None) -> np.ndarray:
+    """Dict {FA: %} → vetor (F,) na ordem de FA_ORDER (chaves desconhecidas são ignoradas)."""
+    cat = catalog or CATALOG
+    vec = np.zeros(len(cat.fa_order))
+    for k, v in fa_pct.items():
+        j = cat.fa_index.get(k)
+        if j is not None:
+            vec[j] += float(v or 0.0)
+    return vec
+
+def fa_dict(vec, catalog: CompiledCatalog = None) -> dict:
+    cat = catalog or CATALOG
+    return {k: float(v) for k, v in zip(cat.fa_order, vec)}
+
+def ingredient_vector(mix: dict, catalog: CompiledCatalog = None) -> np.ndarray:
+    """Dict {ingrediente: %} → vetor (I,) na ordem do catálogo (desconhecidos ignorados; negativos → 0)."""
+    cat = catalog or CATALOG
+    vec = np.zeros(cat.n_ingredients)
+    for k, v in mix.items():
+        i = cat.ing_index.get(k)
+        if i is not None and v and v > 0:
+            vec[i] += float(v)
+    return vec
+
+def ingredient_matrix(mixes, catalog: CompiledCatalog = None) -> np.ndarray:
+    """Lista de dicts {ingrediente: %} → matriz (N, I)."""
+    cat = catalog or CATALOG
+    if not mixes:
+        return np.zeros((0, cat.n_ingredients))
+    return np.vstack([ingredient_vector(m, cat) for m in mixes])
+
+
+# ----------------- Helpers (API por dicionário) -----------------
+def _normalize_percentages(d: dict) -> dict:
+    total = sum(float(v or 0) for v in d.values())
+    if total <= 0:
+        return {k: 0.0 for k in d}
+    return {k: (float(v or 0) * 100.0 / total) for k, v in d.items()}
+
+def _get_profile(ing_key: str, scenario: str) -> dict:
+    profs = FA_PROFILES_RANGED.get(ing_key, {})
+    return profs.get(scenario, profs.get("mean", {}))
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# blend_engine/evaluation.py
+# Avaliação de um blend por dicionário, com as mesmas regras das duas telas da aba:
+# heurístico (Classe A + ajuste B ou C) e perfil FA real (Upload). A aba só desenha o
+# que sai daqui; jobs e serviços obtêm os mesmos números sem Streamlit.
+
+from .calibration import (
+    ii_calibrated_from_fa, isap_calibrated_from_fa, kpis_calibrados_por_medias, pf_index_to_celsius,
+)
+from .kpis import iodine_index, melt_index
+from .mixing import blend_profile
+from .schema import FAProfile, HeuristicResult, KPIs, Mix, ProfileResult
+from .sensory import _scores_finais
+
+
+def evaluate_heuristic(A_vals: Mix, B_vals: Mix = None, C_vals: Mix = None,
+                       scenario: str = "mean") -> HeuristicResult:
+    """
+    Modo heurístico. Sem ajuste, os KPIs são as médias de literatura calibradas da Classe A;
+    com ajuste (B ou C > 0), passam a ser técnicos calibrados do perfil FA (PF em °C).
+    Notas/radar usam o II técnico (não calibrado) do perfil. Passe só a camada de ajuste em uso.
+    """
+    B_vals, C_vals = B_vals or {}, C_vals or {}
+    total_adj = sum(B_vals.values()) + sum(C_vals.values())
+    total = sum(A_vals.values()) + total_adj
+    fa = blend_profile(A_vals, B_vals, C_vals, scenario)
+    PF_idx = melt_index(fa)
+    base = kpis_calibrados_por_medias(A_vals, {}, scenario)
+    has_adjust = total_adj > 0
+    # ⛳ ANCHOR: apply_calibrated_kpis_heur_now
+    if has_adjust:
+        now = KPIs(ii_calibrated_from_fa(fa), isap_calibrated_from_fa(fa), pf_index_to_celsius(PF_idx))
+    else:
+        now = base
+    scores, radar = _scores_finais(fa, PF_idx, iodine_index(fa)) if total > 0 else (None, None)
+    return {"fa": fa, "fa_base": blend_profile(A_vals, scenario=scenario), "total": float(total),
+            "has_adjust": has_adjust, "base": base, "now": now, "PF_idx": PF_idx,
+            "scores": scores, "radar": radar}
+
+def evaluate_profile(fa: FAProfile) -> ProfileResult:
+    """Perfil FA real (já combinado com o ajuste): KPIs técnicos calibrados; notas com o II calibrado."""
+    PF_idx = melt_index(fa)
+    II = ii_calibrated_from_fa(fa)
+    # ⛳ ANCHOR: apply_calibrated_kpis_upload
+    kpis = KPIs(II, isap_calibrated_from_fa(fa), pf_index_to_celsius(PF_idx))
+    scores, radar = _scores_finais(fa, PF_idx, II) if sum(fa.values()) > 0 else (None, None)
+    return {"fa": fa, "kpis": kpis, "PF_idx": PF_idx, "scores": scores, "radar": radar}
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+# blend_engine/incremental.py
+# Estado incremental do modo heurístico entre reruns. Guarda as proporções do rerun anterior
+# e, para cada slider que mudou, aplica uma atualização de posto 1 ao perfil FA bruto
+# (r += Δ·P[i] para A/C, r[j] += 100·Δ para B) e às somas das médias de literatura
+# (n += Δ·K[i]) — O(F) por slider, independente do tamanho do catálogo. O resto do
+# resultado (normalização, índice de fusão, KPIs calibrados, notas/radar) também é O(F)
+# e só é refeito se a camada de que depende mudou: ajuste B/C não mexe no baseline da
+# Classe A, e um rerun sem mudança devolve o resultado anterior como está.
+# Recalcula tudo do zero ao trocar cenário/calibração, quando muitos sliders mudam juntos,
+# quando uma camada zera (zeros exatos) e a cada REBUILD_EVERY atualizações (deriva numérica).
+
+import numpy as np
+
+from .calibration import _pf_fallback_c, calibration_coefficients, calibration_version, pf_index_to_celsius
+from .catalog import CATALOG, CompiledCatalog
+from .kpis import iodine_index_v, melt_index_v, saponification_index_v
+from .schema import HeuristicResult, KPIs, Mix, TradeoffBars
+from .sensory import _scores_finais
+from .tradeoffs import tradeoff_bars, tradeoff_sensitivity_blend
+
+REBUILD_EVERY = 64          # atualizações de posto 1 entre recálculos completos
+REBUILD_CHANGES = 4         # mais sliders que isso mudando no mesmo rerun → recálculo completo
+_ZERO_TOL = 1e-9
+_LAYERS = ("A", "B", "C")
+
+
+class IncrementalBlend:
+    """
+    Blend heurístico (Classe A + ajuste B ou C) mantido entre reruns. update() recebe os
+    mesmos dicts de evaluate_heuristic e devolve o mesmo HeuristicResult; set() aplica uma
+    única mudança conhecida. `last_mode` diz o que o último update fez: "reuso",
+    "posto 1" ou "completo"; `version` muda sempre que o blend muda.
+    """
+
+    def __init__(self, catalog: CompiledCatalog = None):
+        self.cat = catalog or CATALOG
+        I, F = self.cat.n_ingredients, len(self.cat.fa_order)
+        self._vec = {"A": np.zeros(I), "B": np.zeros(F), "C": np.zeros(I)}
+        self._index = {"A": self.cat.ing_index, "B": self.cat.fa_index, "C": self.cat.ing_index}
+        self.scenario = None
+        self._calibration = None
+        self._P = self._K = None
+        self._raw = np.zeros(F)             # perfil bruto de A + B + C
+        self._raw_A = np.zeros(F)           # perfil bruto só da Classe A (baseline)
+        self._kpi_sum = np.zeros(3)         # Σ A[i]·K[i] (II, ISap, PF °C de literatura)
+        self._total = dict.fromkeys(_LAYERS, 0.0)
+        self._pending = 0                   # atualizações desde o último recálculo completo
+        self._dirty_A = True
+        self._keys = ()
+        self._result = None
+        self._trade = None
+        self.version = 0
+        self.last_mode = None
+
+    # ----------------- entradas -----------------
+    def _load(self, scenario: str):
+        cat = self.cat
+        self.scenario = scenario
+        self._calibration = calibration_version()
+        self._P = cat.scenario_profiles(scenario)
+        K = cat.kpi[cat.scenario_index.get(scenario, 1)].copy()
+        missing = np.isnan(K[:, 2])
+        if missing.any():
+            K[missing, 2] = np.asarray(_pf_fallback_c(), dtype=float)[missing]
+        self._K = K
+
+    def _rebuild(self):
+        A, B, C = (self._vec[k] for k in _LAYERS)
+        self._raw_A = A @ self._P
+        self._raw = (A + C) @ self._P + B * 100.0
+        self._kpi_sum = A @ self._K
+        self._total = {k: float(self._vec[k].sum()) for k in _LAYERS}
+        self._pending = 0
+        self._dirty_A = True
+
+    def set(self, layer: str, key: str, value: float) -> bool:
+        """Muda uma proporção (camada "A"/"B"/"C"; valores ≤ 0 → 0) com custo O(F). True se mudou."""
+        i = self._index[layer].get(key)
+        if i is None:
+            return False
+        if self._P is None:
+            self._load("mean")
+        vec = self._vec[layer]
+        new = float(value) if value and value > 0 else 0.0
+        d = new - vec[i]
+        if d == 0:
+            return False
+        vec[i] = new
+        self._total[layer] += d
+        if layer == "B":
+            self._raw[i] += d * 100.0
+        else:
+            self._raw += d * self._P[i]
+            if layer == "A":
+                self._raw_A += d * self._P[i]
+                self._kpi_sum += d * self._K[i]
+                self._dirty_A = True
+        self._pending += 1
+        if self._total[layer] < _ZERO_TOL or self._pending >= REBUILD_EVERY:
+            self._rebuild()
+        self.version += 1
+        return True
+
+    def _changes(self, layer: str, values: Mix) -> list:
+        index, vec = self._index[layer], self._vec[layer]
+        seen, out = set(), []
+        for k, v in values.items():
+            i = index.get(k)
+            if i is None:
+                continue
+            seen.add(i)
+            new = float(v) if v and v > 0 else 0.0
+            if new != vec[i]:
+                out.append((k, new))
+        # chaves ausentes contam como 0 (ex.: camada de ajuste que saiu de uso)
+        if len(seen) < len(vec) and self._total[layer] > 0:
+            keys = self.cat.fa_order if layer == "B" else self.cat.ing_keys
+            out += [(keys[i], 0.0) for i in np.flatnonzero(vec) if i not in seen]
+        return out
+
+    def update(self, A_vals: Mix, B_vals: Mix = None, C_vals: Mix = None,
+               scenario: str = "mean") -> HeuristicResult:
+        """Mesmas entradas/saída de evaluate_heuristic; só refaz o que os sliders alterados afetam."""
+        self._keys = tuple(k for k in A_vals if k in self.cat.ing_index)
+        changes = [(layer, k, v) for layer, values in zip(_LAYERS, (A_vals, B_vals or {}, C_vals or {}))
+                   for k, v in self._changes(layer, values)]
+        if scenario != self.scenario or calibration_version() != self._calibration \
+                or len(changes) > REBUILD_CHANGES:
+            self._load(scenario)
+            for layer, k, v in changes:
+                self._vec[layer][self._index[layer][k]] = v
+            self._rebuild()
+            self.version += 1
+            self.last_mode = "completo"
+        elif changes:
+            for layer, k, v in changes:
+                self.set(layer, k, v)
+            self.last_mode = "posto 1"
+        elif self._result is not None:
+            self.last_mode = "reuso"
+            return self._result
+        return self._evaluate()
+
+    # ----------------- saídas -----------------
+    def _fa(self, raw: np.ndarray):
+        """Perfil normalizado como vetor (F,) e como dict."""
+        tot = raw.sum()
+        vec = raw * (100.0 / tot) if tot > 0 else np.zeros_like(raw)
+        return vec, dict(zip(self.cat.fa_order, vec.tolist()))
+
+    def _evaluate(self) -> HeuristicResult:
+        prev = self._result
+        tA, tB, tC = (self._total[k] for k in _LAYERS)
+        if self._dirty_A or prev is None:
+            fa_base = self._fa(self._raw_A)[1]
+            base = KPIs(*(float(x) for x in self._kpi_sum / tA)) if tA > 0 else KPIs(0.0, 0.0, 0.0)
+            self._dirty_A = False
+        else:
+            fa_base, base = prev["fa_base"], prev["base"]
+        vec, fa = self._fa(self._raw)
+        PF_idx = float(melt_index_v(vec, self.cat)[0])
+        II_tech = float(iodine_index_v(vec, self.cat)[0])
+        has_adjust = tB + tC > 0
+        # mesma regra de evaluate_heuristic: com ajuste, KPIs técnicos calibrados do perfil FA
+        if has_adjust:
+            coef = calibration_coefficients()
+            (a_ii, b_ii), (a_is, b_is) = coef["II"], coef["ISap"]
+            now = KPIs(a_ii * II_tech + b_ii, a_is * float(saponification_index_v(vec, self.cat)[0]) + b_is,
+                       pf_index_to_celsius(PF_idx))
+        else:
+            now = base
+        total = tA + tB + tC
+        scores, radar = _scores_finais(fa, PF_idx, II_tech) if total > 0 else (None, None)
+        self._result = {"fa": fa, "fa_base": fa_base, "total": float(total), "has_adjust": has_adjust,
+                        "base": base, "now": now, "PF_idx": PF_idx, "scores": scores, "radar": radar}
+        return self._result
+
+    def tradeoffs(self, step: float = 5.0) -> TradeoffBars:
+        """Barras de trade-off do blend atual (como tradeoffs_blend); refeitas só se o blend, o passo ou
+        os rótulos (chaves de A do último update) mudarem."""
+        key = (self.version, float(step), self._keys)
+        if self._trade is None or self._trade[0] != key:
+            sens = tradeoff_sensitivity_blend(self._vec["A"], B=self._vec["B"], C=self._vec["C"],
+                                              steps=(step,), scenario=self.scenario, catalog=self.cat)
+            self._trade = (key, None if sens is None else tradeoff_bars(self._keys, sens))
+        return self._trade[1]
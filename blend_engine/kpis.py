@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# blend_engine/kpis.py
+# KPIs técnicos (não calibrados) a partir do perfil FA: índice de iodo, índice de
+# saponificação e índice de fusão (0–100), em lote (matrizes) e por dicionário, mais as
+# médias de literatura ponderadas pela mistura.
+
+import numpy as np
+
+from .catalog import CATALOG, CompiledCatalog, fa_vector
+from .mixing import _as_2d, mix_fa
+
+# Coeficientes do índice de fusão (ver melt_index)
+_MELT_W_LS, _MELT_W_MS, _MELT_W_MONO, _MELT_W_POLY = 0.90, -0.20, -0.20, -0.55
+_MELT_CURV = 0.004
+
+
+# ----------------- KPIs vetorizados -----------------
+def iodine_index_v(FA, catalog: CompiledCatalog = None) -> np.ndarray:
+    cat = catalog or CATALOG
+    return _as_2d(FA) @ cat.iv / 100.0
+
+def saponification_index_v(FA, catalog: CompiledCatalog = None) -> np.ndarray:
+    # FA em % (0–100). NÃO dividir por 100 aqui.
+    cat = catalog or CATALOG
+    return _as_2d(FA) @ cat.sap
+
+def melt_index_v(FA, catalog: CompiledCatalog = None) -> np.ndarray:
+    """Índice de fusão 0–100 (mesma fórmula de melt_index) para cada linha de FA."""
+    cat = catalog or CATALOG
+    FA = _as_2d(FA)
+    zero = np.zeros(FA.shape[0])
+    col = lambda k: FA[:, cat.fa_index[k]] if k in cat.fa_index else zero
+    LS = col("C16:0") + col("C18:0")
+    MS = col("C12:0") + col("C14:0")
+    MONO = col("C18:1")
+    POLY = col("C18:2") + col("C18:3")
+    score = (_MELT_W_LS*LS + _MELT_W_MS*MS + _MELT_W_MONO*MONO + _MELT_W_POLY*POLY
+             + _MELT_CURV*(LS**2))
+    return np.clip(score, 0.0, 100.0)
+
+def kpi_means_mix(W, scenario: str = "mean", pf_fallback=None,
+                  catalog: CompiledCatalog = None) -> np.ndarray:
+    """
+    KPIs de literatura (KPI_RANGES no cenário; fallback KPI_MEANS) ponderados pelas
+    proporções W (N, I). Retorna (N, 3) com II, ISap, PF(°C).
+    pf_fallback (I,): PF(°C) usado para ingredientes sem PF de literatura
+    (sem ele, o PF desses ingredientes conta como 0).
+    """
+    cat = catalog or CATALOG
+    W = np.clip(_as_2d(W), 0.0, None)
+    tot = W.sum(axis=1, keepdims=True)
+    safe = np.where(tot > 0, tot, 1.0)
+    K = cat.kpi[cat.scenario_index.get(scenario, 1)].copy()
+    missing = np.isnan(K[:, 2])
+    if missing.any():
+        K[missing, 2] = 0.0 if pf_fallback is None else np.asarray(pf_fallback, dtype=float)[missing]
+    return np.where(tot > 0, (W @ K) / safe, 0.0)
+
+
+def evaluate_blends(A=None, B=None, C=None, scenario: str = "mean",
+                    catalog: CompiledCatalog = None) -> dict:
+    """
+    Avalia N blends de uma vez. Retorna dict com:
+      fa (N, F) normalizado, II (N,), ISap (N,), PF_idx (N,) — KPIs técnicos (não calibrados).
+    """
+    cat = catalog or CATALOG
+    FA = mix_fa(A, B, C, scenario, cat)
+    return {
+        "fa": FA,
+        "II": iodine_index_v(FA, cat),
+        "ISap": saponification_index_v(FA, cat),
+        "PF_idx": melt_index_v(FA, cat),
+    }
+
+
+# ⛳ ANCHOR: melt_index_v2_chain_aware
+def melt_index(fa_pct: dict) -> float:
+    """
+    Índice 0–100 que sobe com saturados de cadeia longa (C16:0, C18:0),
+    cai levemente com cadeia média (C12:0, C14:0) e cai com insaturados
+    (poli > |mono|). Clamp 0–100. (Cálculo vetorizado em melt_index_v.)
+    """
+    return float(melt_index_v(fa_vector(fa_pct))[0])
+
+# ----------------- KPIs baseados em FA -----------------
+def iodine_index(fa_pct: dict) -> float:
+    return float(iodine_index_v(fa_vector(fa_pct))[0])
+
+def saponification_index(fa_pct: dict) -> float:
+    # fa_pct em % (0–100). NÃO dividir por 100 aqui.
+    return float(saponification_index_v(fa_vector(fa_pct))[0])
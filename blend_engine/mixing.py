@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# blend_engine/mixing.py
+# Mistura de blends: Classe A/C (ingredientes) e Classe B (ácidos graxos puros) viram
+# perfis FA normalizados, para N blends de uma vez (matrizes) ou um blend (dicts).
+
+import numpy as np
+
+from .catalog import (
+    CATALOG, FA_ORDER, CompiledCatalog, _get_profile, _normalize_percentages,
+    fa_dict, fa_vector, ingredient_vector,
+)
+from .schema import FAProfile, Mix
+
+
+# ----------------- Mistura e normalização -----------------
+def _as_2d(x) -> np.ndarray:
+    arr = np.asarray(x, dtype=float)
+    return arr[None, :] if arr.ndim == 1 else arr
+
+def normalize_rows(M) -> np.ndarray:
+    """Normaliza cada linha para somar 100; linhas com soma ≤ 0 viram zeros."""
+    M = _as_2d(M)
+    tot = M.sum(axis=1, keepdims=True)
+    safe = np.where(tot > 0, tot, 1.0)
+    return np.where(tot > 0, M * (100.0 / safe), 0.0)
+
+def mix_raw(A=None, B=None, C=None, scenario: str = "mean",
+            catalog: CompiledCatalog = None) -> np.ndarray:
+    """
+    Perfil FA bruto (não normalizado) de N blends.
+      A, C: (N, I) % por ingrediente (Classe A base / Classe C ajuste)
+      B:    (N, F) % de ácido graxo puro (Classe B)
+    Os pesos não precisam somar 100: a normalização posterior remove a escala.
+    """
+    cat = catalog or CATALOG
+    P = cat.scenario_profiles(scenario)
+    W = None
+    for part in (A, C):
+        if part is not None:
+            part = np.clip(_as_2d(part), 0.0, None)
+            W = part if W is None else W + part
+    raw = W @ P if W is not None else None
+    if B is not None:
+        fb = np.clip(_as_2d(B), 0.0, None) * 100.0
+        raw = fb if raw is None else raw + fb
+    if raw is None:
+        return np.zeros((1, len(cat.fa_order)))
+    return raw
+
+def mix_fa(A=None, B=None, C=None, scenario: str = "mean",
+           catalog: CompiledCatalog = None) -> np.ndarray:
+    """Perfil FA normalizado (N, F) — equivalente vetorizado de _fa_from_mix/fa_est."""
+    return normalize_rows(mix_raw(A, B, C, scenario, catalog))
+
+def _fa_from_mix(ing_mix: dict, total_ref: float, scenario_key: str):
+    if total_ref <= 0: return {k: 0.0 for k in FA_ORDER}
+    return fa_dict(mix_fa(A=ingredient_vector(ing_mix), scenario=scenario_key)[0])
+
+
+# ----------------- API por dicionário (um blend) -----------------
+def blend_profile(A_vals: Mix, B_vals: Mix = None, C_vals: Mix = None, scenario: str = "mean") -> FAProfile:
+    """Perfil FA normalizado de Classe A + ajuste (B: FA puros, C: ingredientes); blend vazio → zeros."""
+    return fa_dict(mix_fa(A=ingredient_vector(A_vals),
+                          B=fa_vector(B_vals) if B_vals else None,
+                          C=ingredient_vector(C_vals) if C_vals else None,
+                          scenario=scenario)[0])
+
+def combine_profile(fa_norm: FAProfile, B_vals: Mix = None, C_vals: Mix = None) -> FAProfile:
+    """
+    Ajuste fino sobre um perfil FA real (modo Upload): soma os % de FA puro (B) ou os perfis
+    'mean' dos ingredientes ponderados por % (C) ao perfil e renormaliza. Sem ajuste → cópia.
+    Ácidos fora de FA_ORDER no perfil de entrada são mantidos.
+    """
+    fa_comb = dict(fa_norm)
+    if B_vals and sum(B_vals.values()) > 0:
+        for fa, pct in B_vals.items():
+            fa_comb[fa] = fa_comb.get(fa, 0.0) + pct
+        return _normalize_percentages(fa_comb)
+    if C_vals and sum(C_vals.values()) > 0:
+        add = {k: 0.0 for k in FA_ORDER}
+        for ing_key, pct in C_vals.items():
+            if pct <= 0: continue
+            for fa_key, fa_pct in _get_profile(ing_key, "mean").items():
+                add[fa_key] += (pct * fa_pct / 100.0)
+        for fa_key, inc in add.items():
+            fa_comb[fa_key] = fa_comb.get(fa_key, 0.0) + inc
+        return _normalize_percentages(fa_comb)
+    return fa_comb
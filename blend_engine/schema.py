@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# blend_engine/schema.py
+# Tipos do API público do motor. Resultados por dicionário continuam sendo tuplas/dicts
+# comuns (NamedTuple/TypedDict só dão nome e tipo aos campos), então quem desempacota
+# `II, ISap, PF = ...` ou lê `res["fa"]` não muda.
+
+from typing import Mapping, NamedTuple, Optional, TypedDict
+
+FAProfile = dict[str, float]        # {código FA (ex.: "C18:1"): %}
+Mix = Mapping[str, float]           # {chave de ingrediente ou código FA: %} (não precisa somar 100)
+Scores = dict[str, float]           # {"Mãos", "Corpo", "Rosto", "Cabelos"} → nota 0–100
+Radar = dict[str, int]              # {"toque", "hidr", "brilho", "oclusividade", "absorcao"} → 0–100
+
+
+class KPIs(NamedTuple):
+    """II, ISap (mgKOH/g) e PF (°C) de um blend."""
+    II: float
+    ISap: float
+    PF_C: float
+
+
+class BaselineKPIs(NamedTuple):
+    """KPIs técnicos do baseline (só Classe A) e o perfil FA normalizado de onde vieram."""
+    II: float
+    ISap: float
+    PF_C: float
+    fa: FAProfile
+
+
+class TradeoffBars(NamedTuple):
+    """Trade-offs no formato dos gráficos: rótulos e ΔII, ΔISap, ΔPF (°C) por ingrediente (2 casas)."""
+    labels: list
+    dII: list
+    dISap: list
+    dPF_C: list
+
+
+class HeuristicResult(TypedDict):
+    """Blend do modo heurístico (Classe A + ajuste B ou C); ver evaluate_heuristic."""
+    fa: FAProfile               # perfil FA normalizado (A + ajuste)
+    fa_base: FAProfile          # perfil FA só da Classe A
+    total: float                # soma global (A + ajuste), em %
+    has_adjust: bool
+    base: KPIs                  # médias de literatura calibradas (Classe A)
+    now: KPIs                   # técnico calibrado do perfil FA se houver ajuste; senão = base
+    PF_idx: float               # índice de fusão (0–100) do perfil FA
+    scores: Optional[Scores]    # None se o blend estiver vazio
+    radar: Optional[Radar]
+
+
+class ProfileResult(TypedDict):
+    """Perfil FA real (modo Upload, já combinado com o ajuste); ver evaluate_profile."""
+    fa: FAProfile
+    kpis: KPIs                  # técnicos calibrados
+    PF_idx: float
+    scores: Optional[Scores]    # notas com o II calibrado; None se o perfil estiver vazio
+    radar: Optional[Radar]
+
+
+class Issue(NamedTuple):
+    """Problema de validação: nível ("erro" | "aviso"), camada ("A" | "B" | "C" | "global") e mensagem."""
+    level: str
+    layer: str
+    message: str
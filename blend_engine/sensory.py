@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+# blend_engine/sensory.py
+# Heurísticas sensoriais: notas por finalidade (Mãos, Corpo, Rosto, Cabelos) e radar
+# (toque, hidratação, brilho, oclusividade, absorção), por dicionário e em lote.
+
+from collections import OrderedDict
+
+import numpy as np
+
+from .calibration import _pf_fallback_c, ii_calibrated_v, isap_calibrated_v, pf_index_to_celsius_v
+from .catalog import CATALOG, CompiledCatalog
+from .kpis import iodine_index_v, kpi_means_mix, melt_index_v
+from .mixing import _as_2d, mix_fa, normalize_rows
+
+# ----------------- Heurísticas sensoriais -----------------
+def _spread(fa):  # espalhabilidade
+    insat = fa.get("C18:1",0) + fa.get("C18:2",0) + fa.get("C18:3",0)
+    laur = fa.get("C12:0",0) + fa.get("C14:0",0)
+    return max(0, min(100, 0.7*insat + 0.2*laur))
+
+def _hidr(fa):
+    lin = fa.get("C18:2",0); ole = fa.get("C18:1",0)
+    sat = fa.get("C16:0",0) + fa.get("C18:0",0)
+    return max(0, min(100, 0.5*lin + 0.4*ole + 0.1*sat))
+
+def _ocl(fa):  # oclusão
+    sat = fa.get("C12:0",0)+fa.get("C14:0",0)+fa.get("C16:0",0)+fa.get("C18:0",0)
+    return max(0, min(100, 0.9*sat))
+
+def _toque_seco(PF_idx):
+    return max(0, min(100, 100 - PF_idx))
+
+def _brilho(fa):
+    ole = fa.get("C18:1",0); laur = fa.get("C12:0",0)+fa.get("C14:0",0)
+    return max(0, min(100, 0.6*ole + 0.3*laur))
+
+def _scores_finais(fa, PF_idx, II_for_scores):
+    spread = _spread(fa); hidr = _hidr(fa)
+    ocl = _ocl(fa); toque = _toque_seco(PF_idx); brilho_v = _brilho(fa)
+    scores = OrderedDict()
+    scores["Mãos"]    = round(0.5*toque + 0.3*spread + 0.2*max(0,100-0.4*II_for_scores), 1)
+    scores["Corpo"]   = round(0.4*hidr  + 0.3*ocl    + 0.3*max(0,100-0.4*II_for_scores), 1)
+    scores["Rosto"]   = round(0.4*fa.get("C18:1",0) + 0.3*max(0,100-0.4*II_for_scores) + 0.3*toque, 1)
+    scores["Cabelos"] = round(0.5*spread + 0.3*fa.get("C18:1",0) + 0.2*max(0,100-0.4*II_for_scores), 1)
+    radar = OrderedDict(toque=int(round(toque)), hidr=int(round(hidr)),
+                        brilho=int(round(brilho_v)), oclusividade=int(round(ocl)),
+                        absorcao=int(round((toque+spread)/2)))
+    return scores, radar
+
+
+# ----------------- Pontuação em lote (vetorizada) -----------------
+SCORE_KEYS = ("Mãos", "Corpo", "Rosto", "Cabelos")
+RADAR_KEYS = ("toque", "hidr", "brilho", "oclusividade", "absorcao")
+
+def scores_finais_v(FA, PF_idx, II_for_scores, catalog: CompiledCatalog = None):
+    """
+    Versão vetorizada de _scores_finais para N perfis.
+    Retorna (scores (N, 4) na ordem SCORE_KEYS, radar (N, 5) inteiros na ordem RADAR_KEYS).
+    """
+    cat = catalog or CATALOG
+    FA = _as_2d(FA)
+    zero = np.zeros(FA.shape[0])
+    col = lambda k: FA[:, cat.fa_index[k]] if k in cat.fa_index else zero
+    ole = col("C18:1")
+    insat = ole + col("C18:2") + col("C18:3")
+    laur = col("C12:0") + col("C14:0")
+    sat_long = col("C16:0") + col("C18:0")
+
+    spread = np.clip(0.7*insat + 0.2*laur, 0, 100)
+    hidr = np.clip(0.5*col("C18:2") + 0.4*ole + 0.1*sat_long, 0, 100)
+    ocl = np.clip(0.9*(laur + sat_long), 0, 100)
+    toque = np.clip(100 - np.asarray(PF_idx, dtype=float), 0, 100)
+    brilho_v = np.clip(0.6*ole + 0.3*laur, 0, 100)
+    ii_term = np.maximum(0, 100 - 0.4*np.asarray(II_for_scores, dtype=float))
+
+    scores = np.column_stack([
+        0.5*toque + 0.3*spread + 0.2*ii_term,
+        0.4*hidr + 0.3*ocl + 0.3*ii_term,
+        0.4*ole + 0.3*ii_term + 0.3*toque,
+        0.5*spread + 0.3*ole + 0.2*ii_term,
+    ]).round(1)
+    radar = np.rint(np.column_stack([toque, hidr, brilho_v, ocl, (toque + spread)/2])).astype(int)
+    return scores, radar
+
+def score_ingredient_blends(A, B=None, C=None, scenario: str = "mean",
+                            catalog: CompiledCatalog = None) -> dict:
+    """
+    Pontua N blends do modo heurístico (Classe A + ajuste B/C) com a mesma regra da aba:
+      - baseline = médias de literatura da Classe A (kpis_calibrados_por_medias);
+      - com ajuste (B ou C > 0): KPIs técnicos calibrados a partir do perfil FA;
+      - notas/radar usam o II técnico (não calibrado) do perfil FA.
+    Linhas sem nenhum ingrediente/ajuste recebem NaN (o radar sai sempre em float por isso).
+    """
+    cat = catalog or CATALOG
+    A = np.clip(_as_2d(A), 0.0, None)
+    n = A.shape[0]
+    B = np.zeros((n, len(cat.fa_order))) if B is None else np.clip(_as_2d(B), 0.0, None)
+    C = np.zeros((n, cat.n_ingredients)) if C is None else np.clip(_as_2d(C), 0.0, None)
+
+    FA = mix_fa(A, B, C, scenario, cat)
+    PF_idx = melt_index_v(FA, cat)
+    base = kpi_means_mix(A, scenario, pf_fallback=_pf_fallback_c(), catalog=cat)
+    has_adjust = (B.sum(axis=1) > 0) | (C.sum(axis=1) > 0)
+    II = np.where(has_adjust, ii_calibrated_v(FA), base[:, 0])
+    ISap = np.where(has_adjust, isap_calibrated_v(FA), base[:, 1])
+    PF_c = np.where(has_adjust, pf_index_to_celsius_v(PF_idx), base[:, 2])
+    scores, radar = scores_finais_v(FA, PF_idx, iodine_index_v(FA, cat), cat)
+
+    empty = (A.sum(axis=1) + B.sum(axis=1) + C.sum(axis=1)) <= 0
+    return _mask_empty({
+        "fa": FA, "II": II, "ISap": ISap, "PF_C": PF_c, "PF_idx": PF_idx,
+        "II_base": base[:, 0], "ISap_base": base[:, 1], "PF_base_C": base[:, 2],
+        "has_adjust": has_adjust, "scores": scores, "radar": radar,
+    }, empty)
+
+def score_fa_profiles(FA, catalog: CompiledCatalog = None) -> dict:
+    """
+    Pontua N perfis FA (modo Upload real, sem ajuste): KPIs técnicos calibrados e notas
+    com o II calibrado. Linhas com soma ≤ 0 recebem NaN (radar sempre em float).
+    """
+    cat = catalog or CATALOG
+    raw = np.clip(_as_2d(FA), 0.0, None)
+    FA = normalize_rows(raw)
+    PF_idx = melt_index_v(FA, cat)
+    II = ii_calibrated_v(FA)
+    scores, radar = scores_finais_v(FA, PF_idx, II, cat)
+    return _mask_empty({
+        "fa": FA, "II": II, "ISap": isap_calibrated_v(FA), "PF_C": pf_index_to_celsius_v(PF_idx),
+        "PF_idx": PF_idx, "scores": scores, "radar": radar,
+    }, raw.sum(axis=1) <= 0)
+
+def _mask_empty(out: dict, empty: np.ndarray) -> dict:
+    # radar em float64 sempre, com ou sem linha vazia: o dtype não pode depender do lote
+    out["radar"] = out["radar"].astype(float)
+    if empty.any():
+        for v in out.values():
+            if v.dtype.kind == "f":
+                v[empty] = np.nan
+    return out
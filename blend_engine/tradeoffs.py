@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+# blend_engine/tradeoffs.py
+# Trade-offs: sensibilidade dos KPIs a uma variação de t pontos % em cada ingrediente,
+# em forma fechada (lote de passos × ingredientes) e no formato dos gráficos da aba.
+
+import numpy as np
+
+from .calibration import pf_index_to_celsius_v
+from .catalog import CATALOG, ISAP_DELTA_CLAMP, CompiledCatalog, fa_vector, ingredient_vector
+from .kpis import _MELT_CURV, _MELT_W_LS, _MELT_W_MONO, _MELT_W_MS, _MELT_W_POLY
+from .schema import FAProfile, Mix, TradeoffBars
+
+
+# ----------------- Sensibilidade (trade-offs) em forma fechada -----------------
+# II, ISap e os grupos do índice de fusão (LS, MS, MONO, POLY) são funcionais lineares
+# do perfil bruto r: depois da normalização, cada um vale 100·(g·r)/(1·r). Como r é
+# linear nos pesos da mistura, basta projetar cada perfil de ingrediente uma vez na
+# base G (F × 7) — a "jacobiana" J = P·G (I × 7) — e avaliar a razão para todos os
+# ingredientes e passos em uma única operação (K passos × I ingredientes × 7).
+_BASIS_COLS = ("II", "ISap", "LS", "MS", "MONO", "POLY", "SUM")
+
+def _kpi_basis(catalog: CompiledCatalog = None) -> np.ndarray:
+    cat = catalog or CATALOG
+    ind = lambda keys: np.array([1.0 if k in keys else 0.0 for k in cat.fa_order])
+    return np.column_stack([
+        cat.iv / 100.0, cat.sap,
+        ind(("C16:0", "C18:0")), ind(("C12:0", "C14:0")),
+        ind(("C18:1",)), ind(("C18:2", "C18:3")),
+        np.ones(len(cat.fa_order)),
+    ])
+
+def _kpis_from_projection(proj: np.ndarray):
+    """proj (..., 7) = r·G → (II, ISap, PF_idx, PF_C) do perfil normalizado correspondente."""
+    tot = proj[..., 6]
+    safe = np.where(tot != 0, tot, 1.0)
+    v = np.where(tot[..., None] != 0, 100.0 * proj[..., :6] / safe[..., None], 0.0)
+    LS, MS, MONO, POLY = v[..., 2], v[..., 3], v[..., 4], v[..., 5]
+    melt = np.clip(_MELT_W_LS*LS + _MELT_W_MS*MS + _MELT_W_MONO*MONO + _MELT_W_POLY*POLY
+                   + _MELT_CURV*(LS**2), 0.0, 100.0)
+    return v[..., 0], v[..., 1], melt, pf_index_to_celsius_v(melt)
+
+def _deltas(proj_new, proj_base, isap_clamp):
+    II1, IS1, _, PF1 = _kpis_from_projection(proj_new)
+    II0, IS0, _, PF0 = _kpis_from_projection(proj_base)
+    dIS = IS1 - IS0
+    if isap_clamp is not None:
+        dIS = np.clip(dIS, -isap_clamp, isap_clamp)
+    return {"II": II1 - II0, "ISap": dIS, "PF_C": PF1 - PF0,
+            "base": {"II": float(II0), "ISap": float(IS0), "PF_C": float(PF0)}}
+
+def tradeoff_sensitivity_blend(A, B=None, C=None, steps=(5.0,), scenario: str = "mean",
+                               isap_clamp: float = ISAP_DELTA_CLAMP,
+                               catalog: CompiledCatalog = None):
+    """
+    Trade-offs do modo heurístico em forma fechada: para cada passo t (pontos %) e cada
+    ingrediente i do catálogo, A[i] → max(0, A[i]+t) com a Classe A re-escalada para manter
+    o total global (mesma regra de _compute_tradeoffs_heuristico); o ajuste B/C fica fixo.
+    Retorna dict com arrays (K, I) de ΔII, ΔISap (com clamp ±isap_clamp) e ΔPF (°C),
+    mais "base" (KPIs técnicos do ponto de partida). None se o blend estiver vazio.
+    """
+    cat = catalog or CATALOG
+    a = np.clip(np.asarray(A, dtype=float), 0.0, None)
+    P = cat.scenario_profiles(scenario)
+    G = _kpi_basis(cat)
+    J = P @ G                                                  # (I, 7)
+    b = np.zeros(len(cat.fa_order)) if B is None else np.clip(np.asarray(B, dtype=float), 0.0, None)
+    c = np.zeros(cat.n_ingredients) if C is None else np.clip(np.asarray(C, dtype=float), 0.0, None)
+    total = a.sum() + b.sum() + c.sum()
+    if total <= 0:
+        return None
+
+    pA = a @ J                                                 # projeção da Classe A
+    p_adj = (b * 100.0) @ G + c @ J                            # ajuste fixo (B puro ou C)
+    t = np.asarray(steps, dtype=float)[:, None]                # (K, 1)
+    eff = np.maximum(0.0, a[None, :] + t) - a[None, :]         # (K, I) passo efetivo
+    new_total = total + eff
+    factor = np.where(new_total > 0, total / np.where(new_total > 0, new_total, 1.0), 1.0)
+    proj = factor[..., None] * (pA + eff[..., None] * J[None, :, :]) + p_adj
+    return _deltas(proj, pA + p_adj, isap_clamp)
+
+def tradeoff_sensitivity_profile(fa_start, add=None, steps=(5.0,), scenario: str = "mean",
+                                 extra_mass: float = 0.0, isap_clamp: float = ISAP_DELTA_CLAMP,
+                                 catalog: CompiledCatalog = None):
+    """
+    Trade-offs sobre um perfil FA fixo (modo Upload / snapshots) em forma fechada: soma
+    t% de cada ingrediente ao perfil normalizado, renormaliza e, se `add` (F,) tiver soma
+    > 0, soma o ajuste B/C e renormaliza de novo (mesma regra de _compute_tradeoffs_upload).
+    extra_mass: massa de ácidos fora de FA_ORDER no perfil normalizado (entra só nas somas).
+    Retorna dict com arrays (K, I) de ΔII, ΔISap (com clamp) e ΔPF (°C) + "base".
+    """
+    cat = catalog or CATALOG
+    G = _kpi_basis(cat)
+    J = cat.scenario_profiles(scenario) @ G                    # (I, 7)
+    p0 = np.asarray(fa_start, dtype=float) @ G
+    p0[6] += extra_mass
+    if p0[6] > 0:
+        p0 = p0 * (100.0 / p0[6])                              # perfil base normalizado (soma 100)
+    t = np.asarray(steps, dtype=float)[:, None, None]          # (K, 1, 1)
+    # 1ª normalização: perfil base (soma p0[6]) + t/100 · perfil do ingrediente
+    raw = p0 + t * J[None, :, :] / 100.0                       # (K, I, 7)
+    tot = raw[..., 6:7]
+    proj = np.where(tot != 0, 100.0 * raw / np.where(tot != 0, tot, 1.0), 0.0)
+    if add is not None and np.sum(add) > 0:
+        proj = proj + np.asarray(add, dtype=float) @ G         # soma 100 + ajuste; razão normaliza
+    return _deltas(proj, p0, isap_clamp)
+
+
+# ----------------- API por dicionário (gráficos da aba) -----------------
+# passos oferecidos na UI (a sensibilidade em forma fechada aceita qualquer valor)
+TRADEOFF_STEPS = [-10.0, -5.0, -1.0, 1.0, 5.0, 10.0]
+
+def tradeoff_bars(keys, sens: dict, step_idx: int = 0) -> TradeoffBars:
+    """Converte a saída de tradeoff_sensitivity_* nas listas (rótulos, ΔII, ΔISap, ΔPF) dos gráficos."""
+    labels, dII, dIS, dPFc = [], [], [], []
+    for ing_key in keys:
+        i = CATALOG.ing_index[ing_key]
+        labels.append(CATALOG.labels[i])
+        dII.append(round(float(sens["II"][step_idx, i]), 2))
+        dIS.append(round(float(sens["ISap"][step_idx, i]), 2))  # MICRO3A: clamp já aplicado acima
+        dPFc.append(round(float(sens["PF_C"][step_idx, i]), 2))
+    return TradeoffBars(labels, dII, dIS, dPFc)
+
+def tradeoffs_blend(A_vals: Mix, B_vals: Mix = None, C_vals: Mix = None, scenario: str = "mean",
+                    step: float = 5.0):
+    """
+    Modo heurístico: variação de `step` pontos % em cada ingrediente da Classe A (renormalizado),
+    com o ajuste B (FA puros) ou C (ingredientes) fixo. None se o blend estiver vazio.
+    """
+    sens = tradeoff_sensitivity_blend(
+        ingredient_vector(A_vals),
+        B=fa_vector(B_vals) if B_vals else None,
+        C=ingredient_vector(C_vals) if C_vals else None,
+        steps=(step,), scenario=scenario,
+    )
+    if sens is None:
+        return None
+    return tradeoff_bars([k for k in A_vals if k in CATALOG.ing_index], sens)
+
+def tradeoffs_profile(fa_start: FAProfile, B_vals: Mix = None, C_vals: Mix = None, scenario: str = "mean",
+                      step: float = 5.0) -> TradeoffBars:
+    """Perfil FA fixo (Upload / snapshots): variação de `step` % de cada ingrediente do catálogo (+ ajuste B/C)."""
+    extra = sum(float(v or 0) for k, v in fa_start.items() if k not in CATALOG.fa_index)
+    if B_vals:
+        add = fa_vector(B_vals)
+    else:
+        add = (ingredient_vector(C_vals or {}) @ CATALOG.scenario_profiles(scenario)) / 100.0
+    sens = tradeoff_sensitivity_profile(fa_vector(fa_start), add=add, steps=(step,),
+                                        scenario=scenario, extra_mass=extra)
+    return tradeoff_bars(CATALOG.ing_keys, sens)
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+# blend_engine/validation.py
+# Validação de blends por dicionário (Classe A/C por ingrediente, Classe B por FA): chaves
+# desconhecidas, valores fora de 0–100, ajuste fino acima do recomendado e total ≠ 100%.
+# Também decide as camadas efetivas de um blend salvo (heur_blend_layers) e interpreta
+# percentuais digitados/colados numa camada (parse_layer_text).
+# Só devolve os problemas; quem chama decide como mostrar (a aba usa st.error/st.warning).
+
+import math
+import re
+
+from .catalog import CATALOG
+from .schema import Issue, Mix
+
+TOTAL_TOL = 1e-6            # |total − 100| abaixo disso conta como 100%
+ADJUST_WARN_PCT = 30.0      # ajuste fino (B ou C) acima disso descaracteriza o óleo base
+_LAYER_NAMES = {"A": "Classe A", "B": "Classe B", "C": "Classe C"}
+
+
+def total_status(total: float) -> str:
+    """'ok' (100% ± TOTAL_TOL), 'abaixo' ou 'acima'."""
+    if abs(total - 100.0) < TOTAL_TOL:
+        return "ok"
+    return "abaixo" if total < 100 else "acima"
+
+def check_adjust(total: float, layer: str):
+    """Aviso de ajuste fino (B ou C) acima de ADJUST_WARN_PCT, ou None."""
+    if total > ADJUST_WARN_PCT:
+        return Issue("aviso", layer, f"A {_LAYER_NAMES.get(layer, layer)} excede {ADJUST_WARN_PCT:g}% do blend — "
+                                     "considere reduzir para manter o caráter do óleo base.")
+    return None
+
+def _check_layer(values: Mix, layer: str, known) -> list:
+    issues = []
+    name = _LAYER_NAMES[layer]
+    unknown = [k for k in values if k not in known]
+    if unknown:
+        issues.append(Issue("erro", layer, f"{name}: chave(s) desconhecida(s): {', '.join(map(str, unknown))}."))
+    for k, v in values.items():
+        try:
+            x = float(v)
+        except (TypeError, ValueError):
+            issues.append(Issue("erro", layer, f"{name}: valor não numérico em {k!s} ({v!r})."))
+            continue
+        if not math.isfinite(x) or x < 0 or x > 100:
+            issues.append(Issue("erro", layer, f"{name}: {k!s} = {v!r} fora de 0–100%."))
+    return issues
+
+def validate_blend(A_vals: Mix, B_vals: Mix = None, C_vals: Mix = None) -> list:
+    """
+    Problemas do blend (Classe A + ajuste B ou C), em ordem: erros de chave/valor por camada,
+    avisos de ajuste acima de ADJUST_WARN_PCT e do total global ≠ 100%. Lista vazia = blend válido.
+    """
+    layers = [("A", A_vals or {}, CATALOG.ing_index), ("B", B_vals or {}, CATALOG.fa_index),
+              ("C", C_vals or {}, CATALOG.ing_index)]
+    issues = [i for layer, values, known in layers for i in _check_layer(values, layer, known)]
+    if any(i.level == "erro" for i in issues):
+        return issues
+    totals = {layer: sum(float(v) for v in values.values()) for layer, values, _ in layers}
+    for layer in ("B", "C"):
+        issue = check_adjust(totals[layer], layer)
+        if issue:
+            issues.append(issue)
+    total = sum(totals.values())
+    status = total_status(total)
+    if status != "ok":
+        issues.append(Issue("aviso", "global", f"Total global {total:.2f}% {status} de 100%."))
+    return issues
+
+def active_layers(A_vals: Mix, B_vals: Mix = None, C_vals: Mix = None, method: str = None):
+    """
+    Só a camada de ajuste escolhida conta (a outra fica oculta na aba): method "B" zera C, "C"
+    zera B, None mantém as duas. Retorna cópias (A, B, C); as chaves zeradas continuam presentes.
+    """
+    A, B, C = dict(A_vals or {}), dict(B_vals or {}), dict(C_vals or {})
+    if method == "B":
+        C = dict.fromkeys(C, 0.0)
+    elif method == "C":
+        B = dict.fromkeys(B, 0.0)
+    return A, B, C
+
+def heur_blend_layers(blend: dict):
+    """
+    Camadas efetivas (A, B, C) de um JSON heur_blend ("Salvar Blend" da aba): valores em float e
+    regra de active_layers pelo "ajuste_method". ValueError/TypeError se um valor não for numérico.
+    """
+    layers = ({k: float(v) for k, v in (blend.get(f"classe{x}_pct") or {}).items()} for x in ("A", "B", "C"))
+    return active_layers(*layers, method=blend.get("ajuste_method"))
+
+def normalize_blend(A_vals: Mix, B_vals: Mix = None, C_vals: Mix = None, target: float = 100.0):
+    """Escala A, B e C pelo mesmo fator para o total global virar `target`. Camadas None continuam None."""
+    total = sum(A_vals.values()) + sum((B_vals or {}).values()) + sum((C_vals or {}).values())
+    if total <= 0:
+        return dict(A_vals), None if B_vals is None else dict(B_vals), None if C_vals is None else dict(C_vals)
+    scale = target / total
+    scaled = lambda d: None if d is None else {k: v * scale for k, v in d.items()}
+    return scaled(A_vals), scaled(B_vals), scaled(C_vals)
+
+
+# ----------------- Texto digitado / colado -----------------
+# Uma linha "nome valor" (separados por espaço, tab, "=", ":" ou ";") ou só números (vetor na
+# ordem do catálogo, como uma coluna colada da planilha). Vírgula decimal e "%" são aceitos.
+_NAMED_LINE = re.compile(r"^(?P<name>.*?[^\W\d_].*?)[\s=:;]+(?P<value>[-+]?\d+(?:[.,]\d*)?)\s*%?$")
+_VECTOR_SEP = re.compile(r",\s+|[\s;]+")
+
+def _name_key(s: str) -> str:
+    return "".join(ch for ch in s.casefold() if ch.isalnum())
+
+def _layer_names(layer: str) -> dict:
+    """Nome normalizado (chave, rótulo sem emoji; para B, código FA com ou sem "FA ") → chave."""
+    if layer == "B":
+        names = {_name_key(fa): fa for fa in CATALOG.fa_order}
+        names.update({_name_key(f"FA {fa}"): fa for fa in CATALOG.fa_order})
+        return names
+    names = {_name_key(k): k for k in CATALOG.ing_keys}
+    names.update({_name_key(label): k for k, label in zip(CATALOG.ing_keys, CATALOG.labels)})
+    return names
+
+def _pct(token: str) -> float:
+    return float(token.strip().rstrip("%").replace(",", "."))
+
+def parse_layer_text(text: str, layer: str):
+    """
+    Percentuais de uma camada ("A" | "B" | "C") a partir de texto livre. Linhas com nome mudam só
+    os itens citados; um vetor de números precisa ter um valor por item da camada. Retorna
+    (valores, issues): valores só com as chaves lidas; issues com nível "erro" invalidam o texto.
+    """
+    keys = CATALOG.fa_order if layer == "B" else CATALOG.ing_keys
+    names = _layer_names(layer)
+    name = _LAYER_NAMES[layer]
+    values, vector, issues = {}, [], []
+    for n, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line:
+            continue
+        m = _NAMED_LINE.match(line)
+        if m:
+            key = names.get(_name_key(m["name"]))
+            if key is None:
+                issues.append(Issue("erro", layer, f"{name}, linha {n}: “{m['name'].strip()}” não é um item desta camada."))
+            else:
+                values[key] = _pct(m["value"])
+            continue
+        for token in filter(None, _VECTOR_SEP.split(line)):
+            try:
+                vector.append(_pct(token))
+            except ValueError:
+                issues.append(Issue("erro", layer, f"{name}, linha {n}: “{token}” não é um número."))
+    if vector:
+        if values:
+            issues.append(Issue("erro", layer, f"{name}: use linhas “nome valor” ou só um vetor de números, não os dois."))
+        elif len(vector) != len(keys):
+            issues.append(Issue("erro", layer, f"{name}: o vetor tem {len(vector)} valor(es); esperados {len(keys)} "
+                                               f"({', '.join(keys)})."))
+        else:
+            values = dict(zip(keys, vector))
+    if not any(i.level == "erro" for i in issues):
+        issues += _check_layer(values, layer, CATALOG.fa_index if layer == "B" else CATALOG.ing_index)
+    return values, issues
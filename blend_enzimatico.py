@@ -1,589 +1,216 @@
 # -*- coding: utf-8 -*-
 # blend_enzimatico.py
 
-import io, json, math
+import io, json, math, os, time
 from collections import OrderedDict
+from contextlib import contextmanager
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import streamlit as st
 
-# --- MICRO3A: parâmetros para suavizar ΔISap ---
-ISAP_DELTA_CLAMP = 6.0  # mgKOH/g (limite |ΔISap|); ajuste fino se quiser
-def _clamp(x, lo, hi):
-    return max(lo, min(hi, x))
-
 def _rerun():
     if hasattr(st, "rerun"):
         st.rerun()
     else:
         st.experimental_rerun()
 
-# ----------------- Catálogo de ingredientes (Classe A/C) -----------------
-INGREDIENTS = [
-    ("rbd_palma",            "🟠 RBD (Óleo de Palma)"),
-    ("estearina_palma",      "🧴 Estearina de Palma"),
-    ("oleina_palma",         "✨ Oleína de Palma"),
-    ("rpko_palmiste",        "🌰 RPKO (Óleo de Palmiste)"),
-    ("estearina_palmiste",   "🧼 Estearina de Palmiste"),
-    ("oleina_palmiste",      "💧 Oleína de Palmiste"),
-    ("pfad",                 "🌿 PFAD"),
-    ("soapstock",            "♻️ Soapstock"),
-]
-
-# ----------------- Médias calibradas (faixas típicas) -----------------
-# II/ISap = médias das faixas mostradas nos expanders;
-# PF (°C) = média calibrada quando disponível; usado como baseline de comunicação.
-KPI_MEANS = {
-    "rbd_palma":          {"II": 52.5, "ISap": 197.5, "PF": 36},  # 34–38 → 36
-    "estearina_palma":    {"II": 37.0, "ISap": 192.5, "PF": 54},  # ~50–58 → 54
-    "oleina_palma":       {"II": 60.0, "ISap": 200.0, "PF": 22},  # ~19–24 → 22
-    "rpko_palmiste":      {"II": 18.0, "ISap": 247.5, "PF": 26},  # ~24–28 → 26
-    "estearina_palmiste": {"II": 11.0, "ISap": 242.5, "PF": 35},  # ~33–37 → 35
-    "oleina_palmiste":    {"II": 23.0, "ISap": 247.5, "PF": 20},  # ~18–22 → 20
-    "pfad":               {"II": 50.0, "ISap": 195.0, "PF": 50},  # ~45–55 → 50
-    "soapstock":          {"II": 57.5, "ISap": 197.5, "PF": 40},  # ~35–45 → 40
-}
-
-# >>> ADD: KPI_RANGES (min/mean/max) – coerente com os expanders
-KPI_RANGES = {
-    "rbd_palma": {
-        "II":   {"min": 50.0, "mean": 52.5, "max": 55.0},
-        "ISap": {"min": 190.0, "mean": 197.5, "max": 205.0},
-        "PF":   {"min": 34.0, "mean": 36.0, "max": 38.0},
-    },
-    "estearina_palma": {
-        "II":   {"min": 32.0, "mean": 37.0, "max": 42.0},
-        "ISap": {"min": 185.0, "mean": 192.5, "max": 200.0},
-        "PF":   {"min": 50.0, "mean": 54.0, "max": 58.0},
-    },
-    "oleina_palma": {
-        "II":   {"min": 55.0, "mean": 60.0, "max": 65.0},
-        "ISap": {"min": 195.0, "mean": 200.0, "max": 205.0},
-        "PF":   {"min": 19.0, "mean": 22.0, "max": 24.0},
-    },
-    "rpko_palmiste": {
-        "II":   {"min": 14.0, "mean": 18.0, "max": 22.0},
-        "ISap": {"min": 240.0, "mean": 247.5, "max": 255.0},
-        "PF":   {"min": 24.0, "mean": 26.0, "max": 28.0},
-    },
-    "estearina_palmiste": {
-        "II":   {"min":  8.0, "mean": 11.0, "max": 14.0},
-        "ISap": {"min": 235.0, "mean": 242.5, "max": 250.0},
-        "PF":   {"min": 33.0, "mean": 35.0, "max": 37.0},
-    },
-    "oleina_palmiste": {
-        "II":   {"min": 18.0, "mean": 23.0, "max": 28.0},
-        "ISap": {"min": 240.0, "mean": 247.5, "max": 255.0},
-        "PF":   {"min": 18.0, "mean": 20.0, "max": 22.0},
-    },
-    "pfad": {
-        "II":   {"min": 45.0, "mean": 50.0, "max": 55.0},
-        "ISap": {"min": 185.0, "mean": 195.0, "max": 205.0},
-        "PF":   {"min": 45.0, "mean": 50.0, "max": 55.0},
-    },
-    "soapstock": {
-        "II":   {"min": 50.0, "mean": 57.5, "max": 65.0},
-        "ISap": {"min": 185.0, "mean": 197.5, "max": 210.0},
-        "PF":   {"min": 35.0, "mean": 40.0, "max": 45.0},
-    },
-}
-
-# ----------------- Constantes FA -----------------
-FA_CONST = {
-    "C12:0": {"IV": 0.0,   "MW": 200.32},
-    "C14:0": {"IV": 0.0,   "MW": 228.37},
-    "C16:0": {"IV": 0.0,   "MW": 256.42},
-    "C18:0": {"IV": 0.0,   "MW": 284.48},
-    "C18:1": {"IV": 90.0,  "MW": 282.47},
-    "C18:2": {"IV": 181.0, "MW": 280.45},
-    "C18:3": {"IV": 273.0, "MW": 278.43},
-}
-FA_ORDER = list(FA_CONST.keys())
-
-# ----------------- Perfis FA por ingrediente (Min/Mean/Max) -----------------
-FA_PROFILES_RANGED = {
-    "rbd_palma": {
-        "mean": {"C16:0": 44, "C18:1": 39, "C18:2": 10, "C18:0": 4, "C14:0": 1, "C12:0": 0},
-        "min":  {"C16:0": 41, "C18:1": 36, "C18:2": 8,  "C18:0": 3, "C14:0": 1, "C12:0": 0},
-        "max":  {"C16:0": 47, "C18:1": 42, "C18:2": 12, "C18:0": 5, "C14:0": 2, "C12:0": 1},
-    },
-    "oleina_palma": {
-        "mean": {"C16:0": 39, "C18:1": 42, "C18:2": 13, "C18:0": 4, "C14:0": 1, "C12:0": 0},
-        "min":  {"C16:0": 36, "C18:1": 39, "C18:2": 11, "C18:0": 3, "C14:0": 1, "C12:0": 0},
-        "max":  {"C16:0": 42, "C18:1": 45, "C18:2": 15, "C18:0": 5, "C14:0": 2, "C12:0": 1},
-    },
-    "estearina_palma": {
-        "mean": {"C16:0": 55, "C18:1": 33, "C18:2": 7,  "C18:0": 4, "C14:0": 1, "C12:0": 0},
-        "min":  {"C16:0": 52, "C18:1": 30, "C18:2": 6,  "C18:0": 3, "C14:0": 1, "C12:0": 0},
-        "max":  {"C16:0": 58, "C18:1": 36, "C18:2": 9,  "C18:0": 5, "C14:0": 2, "C12:0": 1},
-    },
-    "rpko_palmiste": {
-        "mean": {"C12:0": 48, "C14:0": 16, "C16:0": 8,  "C18:1": 15, "C18:2": 2, "C18:0": 2},
-        "min":  {"C12:0": 45, "C14:0": 14, "C16:0": 7,  "C18:1": 13, "C18:2": 2, "C18:0": 1},
-        "max":  {"C12:0": 51, "C14:0": 18, "C16:0": 9,  "C18:1": 17, "C18:2": 3, "C18:0": 3},
-    },
-    "oleina_palmiste": {
-        "mean": {"C12:0": 42, "C14:0": 15, "C16:0": 10, "C18:1": 20, "C18:2": 4, "C18:0": 2},
-        "min":  {"C12:0": 39, "C14:0": 14, "C16:0": 9,  "C18:1": 18, "C18:2": 3, "C18:0": 1},
-        "max":  {"C12:0": 45, "C14:0": 17, "C16:0": 11, "C18:1": 22, "C18:2": 5, "C18:0": 3},
-    },
-    "estearina_palmiste": {
-        "mean": {"C12:0": 50, "C14:0": 17, "C16:0": 7,  "C18:1": 12, "C18:2": 3, "C18:0": 3},
-        "min":  {"C12:0": 47, "C14:0": 15, "C16:0": 6,  "C18:1": 10, "C18:2": 2, "C18:0": 2},
-        "max":  {"C12:0": 53, "C14:0": 19, "C16:0": 8,  "C18:1": 14, "C18:2": 4, "C18:0": 4},
-    },
-    "pfad": {
-        "mean": {"C16:0": 50, "C18:1": 35, "C18:2": 10, "C18:0": 5},
-        "min":  {"C16:0": 47, "C18:1": 33, "C18:2": 8,  "C18:0": 4},
-        "max":  {"C16:0": 53, "C18:1": 37, "C18:2": 12, "C18:0": 6},
-    },
-    # ⛳ MICRO4: soapstock_variabilidade_mais_larga
-    "soapstock": {
-        "mean": {"C16:0": 40, "C18:1": 40, "C18:2": 15, "C18:0": 5},
-        # aumentamos a amplitude min/max para refletir maior variabilidade típica do subproduto
-        "min":  {"C16:0": 35, "C18:1": 36, "C18:2": 12, "C18:0": 4},
-        "max":  {"C16:0": 45, "C18:1": 44, "C18:2": 20, "C18:0": 7},
-    },
-}
+# ----------------- Motor (sem Streamlit) -----------------
+# Catálogo, mistura, KPIs, calibração, notas sensoriais, trade-offs e validação vivem no
+# pacote blend_engine; esta aba só lê os widgets, chama o motor e desenha o resultado.
+from blend_engine import (
+    INGREDIENTS, FA_CONST, FA_ORDER, CATALOG, SCORE_KEYS, fa_vector, ingredient_vector,
+    kpis_tecnicos_do_baseline, combine_profile, evaluate_profile, IncrementalBlend,
+    TRADEOFF_STEPS, tradeoffs_blend, tradeoffs_profile,
+    total_status, check_adjust, validate_blend, normalize_blend, parse_layer_text,
+)
+# Leitura/interpretação de planilhas (um blend ou vários por arquivo)
+from blend_upload import parse_upload, parse_workbook, workbook_sheets, filter_table, profile_of_row
+# Gráficos: PNG com cache LRU (padrão) ou specs Plotly desenhadas no navegador (LIPIDPALMA_CHARTS=plotly)
+from blend_charts import (
+    CHART_BACKEND, fa_bars_png, radar_png, tradeoff_bars_png, hist_png, scatter_png, delta_heatmap_png,
+    fa_bars_spec, radar_spec, tradeoff_bars_spec, hist_spec, scatter_spec, delta_heatmap_spec,
+)
+from blend_snapshots import Snapshot, MAX_SNAPSHOTS, COMPARE_KEYS, compare_matrix, delta_matrix
+from blend_repo import KPI_COLUMNS, PAGE_SIZE, get_repository
+from blend_jobs import DONE, FAILED, PENDING, get_runner
+import blend_profiler as profiler
 
 # ----------------- Helpers -----------------
-def _normalize_percentages(d: dict) -> dict:
-    total = sum(float(v or 0) for v in d.values())
-    if total <= 0:
-        return {k: 0.0 for k in d}
-    return {k: (float(v or 0) * 100.0 / total) for k, v in d.items()}
-
 def _badge_total(total: float, prefix="Total"):
     msg = f"**{prefix}: {total:.2f}%**"
-    if abs(total - 100.0) < 1e-6:
+    status = total_status(total)
+    if status == "ok":
         st.success(msg)
-    elif total < 100:
+    elif status == "abaixo":
         st.warning(msg + " • abaixo de 100%")
     else:
         st.error(msg + " • acima de 100%")
 
-def _get_profile(ing_key: str, scenario: str) -> dict:
-    profs = FA_PROFILES_RANGED.get(ing_key, {})
-    return profs.get(scenario, profs.get("mean", {}))
-
-# -------------- Conversão PF índice -> °C (calibrada) --------------
-# ⛳ ANCHOR: melt_index_v2_chain_aware
-def melt_index(fa_pct: dict) -> float:
-    """
-    Índice 0–100 que sobe com saturados de cadeia longa (C16:0, C18:0),
-    cai levemente com cadeia média (C12:0, C14:0) e cai com insaturados
-    (poli > |mono|). Clamp 0–100.
-    """
-    C12 = fa_pct.get("C12:0", 0.0)
-    C14 = fa_pct.get("C14:0", 0.0)
-    C16 = fa_pct.get("C16:0", 0.0)
-    C18_0 = fa_pct.get("C18:0", 0.0)
-    C18_1 = fa_pct.get("C18:1", 0.0)
-    C18_2 = fa_pct.get("C18:2", 0.0)
-    C18_3 = fa_pct.get("C18:3", 0.0)
-
-    LS   = C16 + C18_0                 # long-chain saturated
-    MS   = C12 + C14                   # medium-chain saturated
-    MONO = C18_1
-    POLY = C18_2 + C18_3
-
-    w_LS, w_MS, w_MONO, w_POLY = 0.90, -0.20, -0.20, -0.55
-    score = (w_LS*LS + w_MS*MS + w_MONO*MONO + w_POLY*POLY
-             + 0.004*(LS**2))  # leve curvatura
-
-    return max(0.0, min(100.0, score))
-
-def _fit_pf_index_to_celsius():
-    """Ajusta uma regressão linear °C = a*(PF_idx) + b a partir dos ingredientes com PF calibrado."""
-    xs, ys = [], []
-    for ing_key, means in KPI_MEANS.items():
-        if "PF" in means:
-            prof = _get_profile(ing_key, "mean")
-            x = melt_index(prof)      # índice calculado do perfil 'mean'
-            y = means["PF"]          # °C calibrado de literatura
-            xs.append(float(x)); ys.append(float(y))
-    if len(xs) >= 2:
-        n = len(xs)
-        sumx = sum(xs); sumy = sum(ys)
-        sumx2 = sum(x*x for x in xs); sumxy = sum(x*y for x, y in zip(xs, ys))
-        denom = (n*sumx2 - sumx*sumx)
-        if abs(denom) > 1e-9:
-            a = (n*sumxy - sumx*sumy) / denom
-            b = (sumy - a*sumx) / n
-            return a, b
-    # fallback seguro (mapeamento razoável)
-    return 0.6, 5.0
-
-_PF_A, _PF_B = _fit_pf_index_to_celsius()
-
-# ⛳ ANCHOR: pf_sensitivity_tune
-PF_SENSITIVITY = 1.15  # antes 1.6; reduz ganho para deltas mais realistas
-
-def pf_index_to_celsius(pf_idx: float) -> float:
-    """
-    Converte índice de PF (0–100) em °C.
-    Leve ganho de sensibilidade aplicado em 'a' (declive), preservando intercepto 'b'.
-    """
-    return max(0.0, (_PF_A * PF_SENSITIVITY) * float(pf_idx) + _PF_B)
-
-# ----------------- KPIs baseados em FA -----------------
-def iodine_index(fa_pct: dict) -> float:
-    return sum((fa_pct.get(k, 0.0) / 100.0) * FA_CONST[k]["IV"] for k in FA_CONST.keys())
-
-def saponification_index(fa_pct: dict) -> float:
-    # fa_pct em % (0–100). NÃO dividir por 100 aqui.
-    return sum(fa_pct.get(k, 0.0) * (560.0 / FA_CONST[k]["MW"]) for k in FA_CONST.keys())
-
-# ⛳ ANCHOR: kpi_linear_calibration
-def _fit_linear_map_x_to_y(x_list, y_list, default_a=1.0, default_b=0.0):
-    if len(x_list) >= 2:
-        n = len(x_list)
-        sx = sum(x_list); sy = sum(y_list)
-        sxx = sum(x*x for x in x_list); sxy = sum(x*y for x, y in zip(x_list, y_list))
-        denom = n*sxx - sx*sx
-        if abs(denom) > 1e-9:
-            a = (n*sxy - sx*sy) / denom
-            b = (sy - a*sx) / n
-            return a, b
-    return default_a, default_b
-
-def _ingredient_means_fa(ing_key: str) -> dict:
-    return _get_profile(ing_key, "mean")
-
-def _prepare_kpi_calibration():
-    xs_ii, ys_ii = [], []
-    xs_is, ys_is = [], []
-    for ing_key, means in KPI_MEANS.items():
-        fa_mean = _ingredient_means_fa(ing_key)
-        ii_raw = iodine_index(fa_mean)
-        is_raw = saponification_index(fa_mean)
-        ii_tgt = float(means.get("II", ii_raw))
-        is_tgt = float(means.get("ISap", is_raw))
-        xs_ii.append(ii_raw); ys_ii.append(ii_tgt)
-        xs_is.append(is_raw); ys_is.append(is_tgt)
-    a_ii, b_ii = _fit_linear_map_x_to_y(xs_ii, ys_ii, default_a=1.0, default_b=0.0)
-    a_is, b_is = _fit_linear_map_x_to_y(xs_is, ys_is, default_a=1.0, default_b=0.0)
-    return (a_ii, b_ii), (a_is, b_is)
-
-(_II_A, _II_B), (_IS_A, _IS_B) = _prepare_kpi_calibration()
-
-def ii_calibrated_from_fa(fa_pct: dict) -> float:
-    raw = iodine_index(fa_pct)
-    return _II_A * raw + _II_B
-
-def isap_calibrated_from_fa(fa_pct: dict) -> float:
-    raw = saponification_index(fa_pct)
-    return _IS_A * raw + _IS_B
-
-# ⛳ ANCHOR: kpis_tecnicos_do_baseline
-def kpis_tecnicos_do_baseline(A_vals: dict, C_vals: dict, scenario: str) -> tuple[float, float, float]:
-    """
-    Calcula KPIs do *baseline A* de forma **técnica**, a partir do perfil FA médio
-    (usando FA_PROFILES_RANGED no 'scenario' selecionado), sem ajuste B/C.
-    Retorna (II, ISap, PF_celsius).
-    """
-    total_A = sum(A_vals.values())
-    total_C = sum(C_vals.values())
-    total_ref = total_A + total_C
-    if total_ref <= 0:
-        return 0.0, 0.0, 0.0
-
-    fa_mean = {k: 0.0 for k in FA_ORDER}
-    for mix, tot in ((A_vals, total_ref), (C_vals, total_ref)):
-        for ing_key, pct in mix.items():
-            if pct <= 0:
-                continue
-            w = pct / total_ref
-            prof = _get_profile(ing_key, scenario)
-            for fa_key, fa_pct in prof.items():
-                fa_mean[fa_key] += w * fa_pct
-
-    fa_mean = _normalize_percentages(fa_mean)
-    II  = iodine_index(fa_mean)
-    IS  = saponification_index(fa_mean)
-    PFc = pf_index_to_celsius(melt_index(fa_mean))
-    return II, IS, PFc
-
-# ----------------- Heurísticas sensoriais -----------------
-def _spread(fa):  # espalhabilidade
-    insat = fa.get("C18:1",0) + fa.get("C18:2",0) + fa.get("C18:3",0)
-    laur = fa.get("C12:0",0) + fa.get("C14:0",0)
-    return max(0, min(100, 0.7*insat + 0.2*laur))
-
-def _hidr(fa):
-    lin = fa.get("C18:2",0); ole = fa.get("C18:1",0)
-    sat = fa.get("C16:0",0) + fa.get("C18:0",0)
-    return max(0, min(100, 0.5*lin + 0.4*ole + 0.1*sat))
-
-def _ocl(fa):  # oclusão
-    sat = fa.get("C12:0",0)+fa.get("C14:0",0)+fa.get("C16:0",0)+fa.get("C18:0",0)
-    return max(0, min(100, 0.9*sat))
-
-def _toque_seco(PF_idx):
-    return max(0, min(100, 100 - PF_idx))
-
-def _brilho(fa):
-    ole = fa.get("C18:1",0); laur = fa.get("C12:0",0)+fa.get("C14:0",0)
-    return max(0, min(100, 0.6*ole + 0.3*laur))
-
-def _scores_finais(fa, PF_idx, II_for_scores):
-    spread = _spread(fa); hidr = _hidr(fa)
-    ocl = _ocl(fa); toque = _toque_seco(PF_idx); brilho_v = _brilho(fa)
-    scores = OrderedDict()
-    scores["Mãos"]    = round(0.5*toque + 0.3*spread + 0.2*max(0,100-0.4*II_for_scores), 1)
-    scores["Corpo"]   = round(0.4*hidr  + 0.3*ocl    + 0.3*max(0,100-0.4*II_for_scores), 1)
-    scores["Rosto"]   = round(0.4*fa.get("C18:1",0) + 0.3*max(0,100-0.4*II_for_scores) + 0.3*toque, 1)
-    scores["Cabelos"] = round(0.5*spread + 0.3*fa.get("C18:1",0) + 0.2*max(0,100-0.4*II_for_scores), 1)
-    radar = OrderedDict(toque=int(round(toque)), hidr=int(round(hidr)),
-                        brilho=int(round(brilho_v)), oclusividade=int(round(ocl)),
-                        absorcao=int(round((toque+spread)/2)))
-    return scores, radar
-
-# >>> REPLACE: baseline usa KPI_RANGES por cenário (min/mean/max)
-def kpis_calibrados_por_medias(A_vals: dict, C_vals: dict, scenario: str) -> tuple[float,float,float]:
-    """
-    Baseline (sem ajuste): usa diretamente as faixas de literatura (KPI_RANGES) de acordo com o cenário
-    'min' | 'mean' | 'max'. Se algum ingrediente não estiver em KPI_RANGES, cai no KPI_MEANS.
-    Retorna II (estim.), ISap (mgKOH/g, estim.), PF (°C, estim.).
-    """
-    total_ref = sum(A_vals.values()) + sum(C_vals.values())
-    if total_ref <= 0:
-        return 0.0, 0.0, 0.0
-
-    II = 0.0
-    IS = 0.0
-    PFc = 0.0
-
-    for vals in (A_vals, C_vals):
-        for ing_key, pct in vals.items():
-            if pct <= 0:
-                continue
-            w = pct / total_ref
-
-            kr = KPI_RANGES.get(ing_key)
-            if kr and scenario in ("min", "mean", "max"):
-                II  += w * float(kr["II"][scenario])
-                IS  += w * float(kr["ISap"][scenario])
-                PFc += w * float(kr["PF"][scenario])
-            else:
-                # fallback: mantém compatibilidade com sua média calibrada
-                km = KPI_MEANS.get(ing_key, {})
-                II  += w * float(km.get("II", 0.0))
-                IS  += w * float(km.get("ISap", 0.0))
-                if "PF" in km:
-                    PFc += w * float(km["PF"])
-                else:
-                    # último recurso: estimar PF via perfil 'mean'
-                    prof = _get_profile(ing_key, "mean")
-                    PFc += w * pf_index_to_celsius(melt_index(prof))
-
-    return II, IS, PFc
-
-def _fa_from_mix(ing_mix: dict, total_ref: float, scenario_key: str):
-    fa_tmp = {k: 0.0 for k in FA_ORDER}
-    if total_ref <= 0: return fa_tmp
-    for ing_key, pct in ing_mix.items():
-        if pct <= 0: continue
-        w = pct / total_ref
-        prof = _get_profile(ing_key, scenario_key)
-        for fa_key, fa_pct in prof.items():
-            fa_tmp[fa_key] += w * fa_pct
-    return _normalize_percentages(fa_tmp)
+# ----------------- Tarefas em segundo plano -----------------
+# Contas longas (Pareto, Monte Carlo) vão para o executor do processo (blend_jobs): o script
+# segue respondendo e um rerun não descarta a conta. A sessão guarda só a chave da tarefa
+# em "<slot>_job"; ao concluir, o resultado vai para "<slot>_result" como antes.
+JOB_POLL_S = 0.5
+
+def _submit_job(slot: str, fn, params: dict, label: str, with_progress: bool = True):
+    job = get_runner().submit(slot, fn, params, label=label, with_progress=with_progress)
+    st.session_state[f"{slot}_job"] = job.key
+    st.session_state.pop(f"{slot}_result", None)
+    return job
+
+@st.fragment(run_every=JOB_POLL_S)
+def _job_progress(slot: str):
+    """Barra de progresso + cancelar; só este trecho reroda enquanto a tarefa anda."""
+    job = get_runner().get(st.session_state.get(f"{slot}_job"))
+    if job is None or not job.active:
+        st.rerun()          # rerun completo: _job_status recolhe o resultado
+    if job.total:
+        text = f"{job.label}: {job.done:,} / {job.total:,}"
+    else:
+        text = f"{job.label}: {'na fila…' if job.status == PENDING else 'calculando…'}"
+    st.progress(job.fraction or 0.0, text=f"{text} ({job.elapsed_s:.0f} s)")
+    if st.button("✖️ Cancelar", key=f"btn_{slot}_cancel", disabled=job.cancel_requested):
+        job.cancel()
+
+def _job_status(slot: str) -> bool:
+    """True enquanto a tarefa de `slot` roda (mostra o progresso); encerrada, publica o resultado/erro."""
+    key = st.session_state.get(f"{slot}_job")
+    if key is None:
+        return False
+    job = get_runner().get(key)
+    if job is not None and job.active:
+        _job_progress(slot)
+        return True
+    st.session_state.pop(f"{slot}_job", None)
+    if job is None:
+        st.warning("O resultado desta análise expirou; rode-a novamente.")
+    elif job.status == DONE:
+        st.session_state[f"{slot}_result"] = job.result
+    elif job.status == FAILED:
+        st.error(job.error)
+    else:
+        st.info("Análise cancelada.")
+    return False
 
 # ----------------- Gráficos -----------------
-def _plot_tradeoff_bars(title: str, labels: list, deltas: list, ylabel: str):
-    fig, ax = plt.subplots()
-    ax.bar(range(len(labels)), deltas)
-    ax.set_xticks(range(len(labels)))
-    ax.set_xticklabels(labels, rotation=45, ha='right')
-    ax.set_ylabel(ylabel)
-    ax.set_title(title)
-    st.pyplot(fig)
-
-def _compute_tradeoffs_heuristico(A_vals, method, B_vals, C_vals, consider_var, scenario):
-    total_A = sum(A_vals.values())
-    total_adjust = sum(B_vals.values()) if method.startswith("Classe B") else sum(C_vals.values())
-    total_all = total_A + total_adjust
-    if total_all <= 0: return None
-
-    # ponto de partida (perfil FA combinado)
-    fa_base = {k:0.0 for k in FA_ORDER}
-    for ing_key, pct in A_vals.items():
-        if pct <= 0: continue
-        w = pct / total_all
-        prof = _get_profile(ing_key, scenario if consider_var else "mean")
-        for fk, fp in prof.items():
-            fa_base[fk] += w * fp
-    if method.startswith("Classe B"):
-        for fk, pct in B_vals.items():
-            if pct <= 0: continue
-            w = pct / total_all
-            fa_base[fk] += w * 100.0
+def _show_chart(png_fn, spec_fn, *args, key: str):
+    profiler.count("gráficos exibidos")
+    if CHART_BACKEND == "plotly":
+        st.plotly_chart(spec_fn(*args), use_container_width=True, key=key)
     else:
-        for ing_key, pct in C_vals.items():
-            if pct <= 0: continue
-            w = pct / total_all
-            prof = _get_profile(ing_key, scenario if consider_var else "mean")
-            for fk, fp in prof.items():
-                fa_base[fk] += w * fp
-    fa_base = _normalize_percentages(fa_base)
-    II0, IS0 = iodine_index(fa_base), saponification_index(fa_base)
-    PF0_idx = melt_index(fa_base); PF0_c = pf_index_to_celsius(PF0_idx)
-
-    labels, dII, dIS, dPFc = [], [], [], []
-    for ing_key, pct in A_vals.items():
-        inc = 5.0
-        A_new = A_vals.copy(); A_new[ing_key] = max(0.0, pct + inc)
-        new_total_A = sum(A_new.values())
-        factor = (total_all) / (new_total_A + total_adjust) if (new_total_A + total_adjust) > 0 else 1.0
-        for k in A_new: A_new[k] *= factor
-
-        fa_new = {k:0.0 for k in FA_ORDER}
-        for k, pv in A_new.items():
-            if pv <= 0: continue
-            w = pv / total_all
-            prof = _get_profile(k, scenario if consider_var else "mean")
-            for fk, fp in prof.items():
-                fa_new[fk] += w * fp
-        if method.startswith("Classe B"):
-            for fk, pv in B_vals.items():
-                if pv <= 0: continue
-                w = pv / total_all
-                fa_new[fk] += w * 100.0
-        else:
-            for k, pv in C_vals.items():
-                if pv <= 0: continue
-                w = pv / total_all
-                prof2 = _get_profile(k, scenario if consider_var else "mean")
-                for fk, fp in prof2.items():
-                    fa_new[fk] += w * fp
-        fa_new = _normalize_percentages(fa_new)
-        II1, IS1 = iodine_index(fa_new), saponification_index(fa_new)
-        PF1_idx = melt_index(fa_new); PF1_c = pf_index_to_celsius(PF1_idx)
-
-        label = next(lbl for key,lbl in INGREDIENTS if key==ing_key)
-        labels.append(label)
-        dII.append(round(II1 - II0, 2))
-        # MICRO3A: clamp em ΔISap
-        dIS.append(round(_clamp(IS1 - IS0, -ISAP_DELTA_CLAMP, ISAP_DELTA_CLAMP), 2))
-        dPFc.append(round(PF1_c - PF0_c, 2))
-    return labels, dII, dIS, dPFc
-
-def _compute_tradeoffs_upload(fa_start, method_upl, B_vals_u, C_vals_u, consider_var, scenario):
-    fa_base = _normalize_percentages(fa_start.copy())
-    II0, IS0 = iodine_index(fa_base), saponification_index(fa_base)
-    PF0_c = pf_index_to_celsius(melt_index(fa_base))
-    labels, dII, dIS, dPFc = [], [], [], []
-    for ing_key, label in INGREDIENTS:
-        add_pct = 5.0
-        add_fa = {k:0.0 for k in FA_ORDER}
-        prof = _get_profile(ing_key, scenario if consider_var else "mean")
-        for fk, fp in prof.items():
-            add_fa[fk] += (add_pct * fp / 100.0)
-
-        fa_new = fa_base.copy()
-        for fk, inc in add_fa.items():
-            fa_new[fk] = fa_new.get(fk, 0.0) + inc
-        fa_new = _normalize_percentages(fa_new)
-
-        if method_upl.startswith("Classe B"):
-            totB = sum(B_vals_u.values())
-            if totB > 0:
-                for fk, pv in B_vals_u.items():
-                    fa_new[fk] = fa_new.get(fk, 0.0) + pv
-                fa_new = _normalize_percentages(fa_new)
-        else:
-            totC = sum(C_vals_u.values())
-            if totC > 0:
-                add2 = {k:0.0 for k in FA_ORDER}
-                for k, pv in C_vals_u.items():
-                    if pv <= 0: continue
-                    prof2 = _get_profile(k, scenario if consider_var else "mean")
-                    for fk, fp in prof2.items():
-                        add2[fk] += (pv * fp / 100.0)
-                for fk, inc2 in add2.items():
-                    fa_new[fk] = fa_new.get(fk, 0.0) + inc2
-                fa_new = _normalize_percentages(fa_new)
-
-        II1, IS1 = iodine_index(fa_new), saponification_index(fa_new)
-        PF1_c = pf_index_to_celsius(melt_index(fa_new))
-        labels.append(label); dII.append(round(II1 - II0, 2)); dIS.append(round(_clamp(IS1 - IS0, -ISAP_DELTA_CLAMP, ISAP_DELTA_CLAMP), 2)); dPFc.append(round(PF1_c - PF0_c, 2))
-    return labels, dII, dIS, dPFc
-
-def _plot_fa_bars(fa_norm):
-    # rótulos amigáveis — inclui C12:0 (Láurico)
-    FRIENDLY_FA_LABELS = {
-        "C12:0": "C12:0 (Láurico)",
-        "C14:0": "C14:0 (Mirístico)",
-        "C16:0": "C16:0 (Palmítico)",
-        "C18:0": "C18:0 (Esteárico)",
-        "C18:1": "C18:1 (Oleico)",
-        "C18:2": "C18:2 (Linoleico)",
-        "C18:3": "C18:3 (Linolênico)",
-    }
-    data = [fa_norm.get(k, 0.0) for k in FA_ORDER]
-    labels = [FRIENDLY_FA_LABELS.get(k, k) for k in FA_ORDER]
-    fig, ax = plt.subplots()
-    ax.bar(range(len(FA_ORDER)), data)
-    ax.set_xticks(range(len(FA_ORDER)))
-    ax.set_xticklabels(labels, rotation=45, ha='right')
-    ax.set_ylabel('%')
-    ax.set_title('Composição por Ácido Graxo (%)')
-    st.pyplot(fig)
-
-def _plot_radar(rad_dict=None):
-    """Desenha o radar. Se rad_dict for vazio/None, mostra apenas o 'frame' (sem polígono)."""
-    import math as _m
-
-    # Ordem usada em _scores_finais:
-    base_labels = ["toque", "hidr", "brilho", "oclusividade", "absorcao"]
-
-    if not rad_dict:
-        labels = base_labels
-        N = len(labels)
-        angles = [n / float(N) * 2 * _m.pi for n in range(N)]
-        fig, ax = plt.subplots(subplot_kw=dict(polar=True))
-        # Apenas eixos/labels – sem plot nem fill
-        ax.set_xticks(angles)
-        ax.set_xticklabels(labels)
-        ax.set_yticklabels([])
-        ax.set_title("Radar Sensorial (0–100)")
-        st.pyplot(fig)
-        return
+        st.image(png_fn(*args), use_container_width=True)
 
-    # Caso normal (com dados)
-    labels = list(rad_dict.keys())
-    values = [rad_dict[k] for k in labels]
-    N = len(labels)
-    angles = [n / float(N) * 2 * _m.pi for n in range(N)]
-    values += values[:1]
-    angles += angles[:1]
-    fig, ax = plt.subplots(subplot_kw=dict(polar=True))
-    ax.plot(angles, values)
-    ax.fill(angles, values, alpha=0.25)
-    ax.set_xticks(angles[:-1])
-    ax.set_xticklabels(labels)
-    ax.set_yticklabels([])
-    ax.set_title("Radar Sensorial (0–100)")
-    st.pyplot(fig)
+def _plot_tradeoff_bars(title: str, labels: list, deltas: list, ylabel: str):
+    _show_chart(tradeoff_bars_png, tradeoff_bars_spec, title, labels, deltas, ylabel, key=f"chart_to_{title}")
+
+def _plot_mc_hist(title: str, values, spec, xlabel: str):
+    _show_chart(hist_png, hist_spec, title, values, spec, xlabel, key=f"chart_mc_{title}")
+
+@profiler.profiled("trade-offs (cálculo)")
+def _compute_tradeoffs_heuristico(A_vals, method, B_vals, C_vals, consider_var, scenario, step=5.0):
+    """Variação de `step` pontos % em cada ingrediente da Classe A (renormalizado), em forma fechada."""
+    use_B = method.startswith("Classe B")
+    return tradeoffs_blend(A_vals, B_vals if use_B else None, None if use_B else C_vals,
+                           scenario=scenario if consider_var else "mean", step=step)
+
+@profiler.profiled("trade-offs (cálculo)")
+def _compute_tradeoffs_upload(fa_start, method_upl, B_vals_u, C_vals_u, consider_var, scenario, step=5.0):
+    """Variação de `step` % de cada ingrediente sobre um perfil FA fixo (+ ajuste B/C), em forma fechada."""
+    use_B = method_upl.startswith("Classe B")
+    return tradeoffs_profile(fa_start, B_vals_u if use_B else None, None if use_B else C_vals_u,
+                             scenario=scenario if consider_var else "mean", step=step)
+
+def _heur_state() -> IncrementalBlend:
+    """Estado incremental do modo heurístico desta sessão: só o slider que mudou é recalculado."""
+    state = st.session_state.get("_heur_state")
+    if state is None:
+        state = st.session_state["_heur_state"] = IncrementalBlend()
+    return state
+
+# ----------------- Sliders A/B/C: escrita e edição em lote -----------------
+# Toda mudança programática dos sliders (normalizar, solver, Pareto, biblioteca, repositório)
+# é um callback on_click: grava as chaves dos sliders antes do rerun, que já sai com o blend
+# novo — sem o st.rerun() extra do handshake _apply_norm (que fica só para o JSON carregado
+# pelo uploader, aplicado depois dos widgets). Com "Editar em lote", os sliders de uma classe
+# ficam num st.form: arrastar não recalcula nada e "Aplicar" grava tudo num único rerun,
+# junto com o texto digitado/colado e, se pedido, a normalização.
+_SLIDER_PREFIX = {"A": "slider_ing_", "B": "slider_fa_", "C": "slider_adj_"}
+_METHOD_B, _METHOD_C = "Classe B — Ácidos graxos puros", "Classe C — Ingredientes"
+
+def _set_sliders(A: dict = None, B: dict = None, C: dict = None, method: str = None):
+    """Grava proporções nos sliders (só antes de criá-los: em callbacks ou no topo do modo heurístico)."""
+    for layer, vals in (("A", A), ("B", B), ("C", C)):
+        for k, v in (vals or {}).items():
+            st.session_state[f"{_SLIDER_PREFIX[layer]}{k}"] = float(round(v, 2))
+    if method:
+        st.session_state["ajuste_method_heur"] = method
+
+def _slider_values(layer: str) -> dict:
+    keys = FA_ORDER if layer == "B" else CATALOG.ing_keys
+    return {k: float(st.session_state.get(f"{_SLIDER_PREFIX[layer]}{k}", 0.0)) for k in keys}
+
+def _normalize_sliders():
+    """on_click: Classe A + camada de ajuste em uso escaladas para 100% no total global."""
+    use_B = st.session_state.get("ajuste_method_heur", _METHOD_B).startswith("Classe B")
+    _set_sliders(*normalize_blend(_slider_values("A"), _slider_values("B") if use_B else None,
+                                  None if use_B else _slider_values("C")))
+
+def _commit_edit(layer: str, normalize: bool = False):
+    """on_click do "Aplicar": os sliders do form já chegam com os valores novos; soma o texto e normaliza."""
+    text = st.session_state.get(f"edit_paste_{layer}", "")
+    if text.strip():
+        values, issues = parse_layer_text(text, layer)
+        errors = [i.message for i in issues if i.level == "erro"]
+        if errors:
+            # transação inteira descartada: sliders voltam ao que estava antes do form
+            _set_sliders(**{layer: st.session_state.get(f"_edit_base_{layer}")})
+            st.session_state[f"_edit_errors_{layer}"] = errors
+            return
+        _set_sliders(**{layer: values})
+        st.session_state[f"edit_paste_{layer}"] = ""
+    if normalize:
+        _normalize_sliders()
+
+@contextmanager
+def _edit_transaction(layer: str):
+    """Bloco dos sliders de uma classe; com "Editar em lote" ligado, vira um st.form com Aplicar."""
+    batch = st.toggle("✏️ Editar em lote", key=f"edit_lote_{layer}",
+                      help="Arraste vários sliders, digite ou cole percentuais e aplique tudo num único recálculo.")
+    if not batch:
+        yield
+        return
+    for msg in st.session_state.pop(f"_edit_errors_{layer}", None) or ():
+        st.error(f"Edição não aplicada — {msg}")
+    st.session_state[f"_edit_base_{layer}"] = _slider_values(layer)
+    with st.form(f"form_edit_{layer}", border=False):
+        yield
+        st.text_area("Digitar / colar percentuais (opcional)", key=f"edit_paste_{layer}", height=90,
+                     placeholder=("C16:0 = 5\nC18:1 = 3   (ou um número por ácido graxo, na ordem)" if layer == "B" else
+                                  "pfad = 10\nsoapstock 2,5   (ou um número por ingrediente, na ordem)"),
+                     help="Linhas “nome valor” mudam só os itens citados; uma coluna de números colada da "
+                          "planilha substitui a camada inteira.")
+        c1, c2 = st.columns(2)
+        c1.form_submit_button("✅ Aplicar", on_click=_commit_edit, args=(layer,), type="primary",
+                              use_container_width=True)
+        c2.form_submit_button("✅ Aplicar e normalizar para 100%", on_click=_commit_edit, args=(layer, True),
+                              use_container_width=True)
+
+def _plot_fa_bars(fa_norm, key: str = "chart_fa"):
+    # rótulos amigáveis (inclui C12:0 Láurico) ficam em blend_charts.FRIENDLY_FA_LABELS
+    _show_chart(fa_bars_png, fa_bars_spec, fa_norm, key=key)
+
+def _plot_radar(rad_dict=None, key: str = "chart_radar"):
+    """Desenha o radar. Se rad_dict for vazio/None, mostra apenas o 'frame' (sem polígono)."""
+    _show_chart(radar_png, radar_spec, rad_dict, key=key)
 
 # ⛳ MICRO1: pf_em_celsius_no_snapshot
-def _make_snapshot(label: str, fa_dict: dict, II: float, ISap: float, PF_celsius: float):
+def _make_snapshot(label: str, fa_dict: dict, II: float, ISap: float, PF_celsius: float, A_vals: dict = None):
     """
     PF_celsius deve ser passado já em °C (como você exibe nos KPIs).
     Mantemos também o 'pf_index' (0–100) apenas para radar/heurísticas.
+    Retorna um Snapshot compacto (lido como dict: snap["fa"], snap["kpis"], ...).
     """
-    fa_n = _normalize_percentages(fa_dict)
-    PF_index = melt_index(fa_n)  # índice 0–100 para radar/sensório
-    scores, radar = _scores_finais(fa_n, PF_index, II)
-    return {
-        "label": label,
-        "fa": fa_n,
-        "kpis": {"II": float(II), "ISap": float(ISap), "PF": float(PF_celsius)},  # sempre °C
-        "pf_index": PF_index,  # técnico para radar
-        "scores": scores,
-        "radar": radar,
-    }
+    return Snapshot.from_profile(label, fa_dict, II, ISap, PF_celsius, A_vals=A_vals)
 
 def _render_snapshot(title: str, snap: dict):
     st.markdown(f"**{title}: {snap['label']}**")
@@ -594,38 +221,9 @@ def _render_snapshot(title: str, snap: dict):
         k1.metric("Índice de Iodo (II)", f"{k['II']:.1f}")
         k2.metric("Índice de Saponificação (ISap)", f"{k['ISap']:.1f} mgKOH/g")
         k3.metric("Ponto de Fusão (°C)", f"{k['PF']:.1f}")
-        _plot_fa_bars(snap["fa"])
+        _plot_fa_bars(snap["fa"], key=f"chart_fa_{title}")
     with c2:
-        _plot_radar(snap["radar"]) 
-
-# ⛳ ANCHOR: kpis_tecnicos_do_baseline
-def kpis_tecnicos_do_baseline(A_vals_ctx: dict, scenario_ctx: str):
-    """
-    Reconstrói o baseline técnico A a partir das proporções de Classe A
-    e do cenário ('min'|'mean'|'max'), e calcula KPIs técnicos pelo perfil FA.
-    Retorna (II, ISap, PF_celsius, fa_A_norm).
-    """
-    totA = sum(A_vals_ctx.values())
-    if totA <= 0:
-        faA = {k: 0.0 for k in FA_ORDER}
-        return 0.0, 0.0, 0.0, faA
-
-    # monta FA só com Classe A, no cenário escolhido
-    faA = {k: 0.0 for k in FA_ORDER}
-    scen = scenario_ctx if scenario_ctx in ("min", "mean", "max") else "mean"
-    for ing_key, pct in A_vals_ctx.items():
-        if pct <= 0: 
-            continue
-        w = pct / totA
-        prof = _get_profile(ing_key, scen)
-        for fk, fp in prof.items():
-            faA[fk] += w * fp
-
-    faA = _normalize_percentages(faA)
-    II_A   = iodine_index(faA)
-    IS_A   = saponification_index(faA)
-    PF_A_c = pf_index_to_celsius(melt_index(faA))
-    return II_A, IS_A, PF_A_c, faA
+        _plot_radar(snap["radar"], key=f"chart_radar_{title}")
 
 def _render_compare_AB():
     """Se existir A e B no session_state, renderiza comparação lado a lado."""
@@ -649,7 +247,8 @@ def _render_compare_AB():
     # reconstruímos A técnico a partir do contexto salvo ao criar A.
     if compare_vs == "Baseline técnico (FA mean)":
         ctx = st.session_state.get("cmp_ctx", {}) or {}
-        A_vals_ctx  = ctx.get("A_vals", {}) or {}
+        # A vindo da biblioteca traz a própria Classe A (o contexto é o do blend atual)
+        A_vals_ctx  = snapA.get("A_vals") or ctx.get("A_vals", {}) or {}
         scenario_ctx = ctx.get("scenario", "mean")
         try:
             II_A_t, IS_A_t, PF_A_t, _ = kpis_tecnicos_do_baseline(A_vals_ctx, scenario_ctx)
@@ -769,6 +368,450 @@ def _render_compare_AB():
                 with c3: _plot_tradeoff_bars("Δ PF (°C) (B)", lb, b_dPFc, "Δ PF (°C)")
 
 
+# ⛳ ANCHOR: comparacao_n_snapshots
+_COMPARE_LABELS = {"II": "II", "ISap": "ISap", "PF": "PF (°C)",
+                   "Mãos": "Mãos", "Corpo": "Corpo", "Rosto": "Rosto", "Cabelos": "Cabelos"}
+
+def _add_to_compare(snaps) -> int:
+    """Acrescenta snapshots à lista N-way (até MAX_SNAPSHOTS); retorna quantos entraram."""
+    cur = st.session_state.setdefault("cmp_set", [])
+    room = max(0, MAX_SNAPSHOTS - len(cur))
+    cur.extend(list(snaps)[:room])
+    return min(room, len(snaps))
+
+def _render_compare_n(current: Snapshot = None):
+    """Comparação de até MAX_SNAPSHOTS snapshots: uma tabela e um gráfico com todos os deltas (vetorizados)."""
+    if st.session_state.pop("_cmp_n_reset", False):   # lista mudou: referência/seleção antigas não valem
+        for k in ("cmp_n_ref", "cmp_n_drop", "cmp_n_metric"):
+            st.session_state.pop(k, None)
+    snaps = st.session_state.get("cmp_set", [])
+    with st.expander(f"🧮 Comparação de variantes ({len(snaps)}/{MAX_SNAPSHOTS})", expanded=bool(snaps)):
+        c1, c2, c3 = st.columns([2, 1, 1])
+        label = c1.text_input("Nome da variante", key="cmp_n_label", placeholder=f"Variante {len(snaps) + 1}")
+        if current is not None and c2.button("➕ Adicionar atual", key="btn_cmp_n_add"):
+            snap = Snapshot(label.strip() or f"Variante {len(snaps) + 1}", current.fa, current.kpis,
+                            current.pf_index, current.scores, current.radar, current.A)
+            if not _add_to_compare([snap]):
+                st.warning(f"Limite de {MAX_SNAPSHOTS} snapshots atingido — remova algum antes.")
+            snaps = st.session_state["cmp_set"]
+        ab = [st.session_state[k] for k in ("cmp_A", "cmp_B") if st.session_state.get(k) is not None]
+        if ab and c3.button("➕ Adicionar A/B", key="btn_cmp_n_add_ab"):
+            _add_to_compare(ab)
+            snaps = st.session_state["cmp_set"]
+        if len(snaps) < 2:
+            st.caption("Adicione ao menos 2 snapshots (atual, A/B ou vizinhos da biblioteca) para comparar.")
+            return
+
+        names = [f"{i + 1}. {s.label}" for i, s in enumerate(snaps)]
+        ref = st.selectbox("Referência (Δ = variante − referência)", range(len(snaps)),
+                           format_func=lambda i: names[i], key="cmp_n_ref")
+        ref = min(int(ref), len(snaps) - 1)
+        cols = [_COMPARE_LABELS[k] for k in COMPARE_KEYS]
+        D = delta_matrix(snaps)                  # (N, N, V): todos os pares numa operação
+        M = compare_matrix(snaps)
+        table = pd.DataFrame(M, index=names, columns=cols)
+        for j, c in enumerate(cols):
+            table[f"Δ {c}"] = D[:, ref, j]
+        st.dataframe(table.round(2), use_container_width=True)
+
+        view = st.radio("Gráfico", ["Δ vs referência (todas as métricas)", "Δ entre pares (uma métrica)"],
+                        horizontal=True, key="cmp_n_view")
+        if view.startswith("Δ vs"):
+            _show_chart(delta_heatmap_png, delta_heatmap_spec, f"Δ vs {names[ref]}", names, cols, D[:, ref, :],
+                        key="chart_cmp_n_ref")
+        else:
+            metric = st.selectbox("Métrica", range(len(cols)), format_func=lambda j: cols[j], key="cmp_n_metric")
+            _show_chart(delta_heatmap_png, delta_heatmap_spec, f"Δ {cols[metric]} (linha − coluna)",
+                        names, names, D[:, :, metric], key="chart_cmp_n_pairs")
+
+        drop = st.multiselect("Remover da comparação", range(len(snaps)), format_func=lambda i: names[i],
+                              key="cmp_n_drop")
+        b1, b2 = st.columns(2)
+        if drop and b1.button("🗑️ Remover selecionados", key="btn_cmp_n_drop"):
+            st.session_state["cmp_set"] = [s for i, s in enumerate(snaps) if i not in set(drop)]
+            st.session_state["_cmp_n_reset"] = True
+            st.rerun()
+        if b2.button("🧹 Limpar comparação", key="btn_cmp_n_clear"):
+            st.session_state["cmp_set"] = []
+            st.session_state["_cmp_n_reset"] = True
+            st.rerun()
+
+# ⛳ ANCHOR: solver_design_inverso
+def _render_solver(A_vals: dict, C_vals: dict, scen_mix: str):
+    """Modo solver: metas de II/ISap/PF (°C) → proporções de Classe A (+ C), sem ajustar slider a slider."""
+    with st.expander("🎯 Solver de metas (design inverso): II, ISap e PF (°C)", expanded=False):
+        st.caption("Informe as faixas-alvo e os limites por ingrediente; o solver devolve o blend viável "
+                   "mais próximo do atual (ou o de menor custo) e pode aplicá-lo direto nos sliders.")
+        c1, c2, c3 = st.columns(3)
+        ii_rng = c1.slider("Faixa de II", 0.0, 100.0, (40.0, 55.0), step=0.5, key="solver_ii")
+        is_rng = c2.slider("Faixa de ISap (mgKOH/g)", 150.0, 300.0, (190.0, 215.0), step=0.5, key="solver_isap")
+        pf_rng = c3.slider("Faixa de PF (°C)", 0.0, 70.0, (30.0, 40.0), step=0.5, key="solver_pf")
+
+        o1, o2, o3 = st.columns(3)
+        objetivo = o1.radio("Objetivo", ["Mais próximo do blend atual", "Menor custo"], key="solver_obj")
+        usar_C = o2.checkbox("Permitir ajuste fino Classe C (≤ 30%)", value=bool(sum(C_vals.values()) > 0),
+                             key="solver_use_C")
+        modelo = o3.radio("Modelo de KPI", ["Técnico (perfil FA calibrado)", "Médias de literatura (baseline)"],
+                          index=0 if usar_C else 1, key="solver_model",
+                          help="Sem ajuste a aba exibe as médias de literatura; com ajuste B/C, os KPIs técnicos.")
+
+        limites = st.data_editor(
+            pd.DataFrame({
+                "Ingrediente": [lbl for _, lbl in INGREDIENTS],
+                "Mín (%)": [0.0] * len(INGREDIENTS),
+                "Máx (%)": [100.0] * len(INGREDIENTS),
+                "Custo (R$/kg)": [0.0] * len(INGREDIENTS),
+            }),
+            disabled=["Ingrediente"], hide_index=True, use_container_width=True, key="solver_limites",
+        )
+
+        if st.button("🎯 Resolver", key="btn_solver"):
+            from blend_solver import solve_blend
+            keys = [k for k, _ in INGREDIENTS]
+            cost = np.zeros(CATALOG.n_ingredients)
+            for k, c in zip(keys, limites["Custo (R$/kg)"]):
+                cost[CATALOG.ing_index[k]] = float(c or 0.0)
+            if objetivo == "Menor custo" and not cost.any():
+                st.warning("Informe o custo por ingrediente para otimizar por custo.")
+            st.session_state["solver_result"] = solve_blend(
+                targets={"II": ii_rng, "ISap": is_rng, "PF_C": pf_rng},
+                bounds={k: (float(lo), float(hi)) for k, lo, hi in zip(keys, limites["Mín (%)"], limites["Máx (%)"])},
+                reference=(ingredient_vector(A_vals), ingredient_vector(C_vals)),
+                cost=cost,
+                objective="custo" if objetivo == "Menor custo" else "referencia",
+                use_C=usar_C,
+                scenario=scen_mix,
+                model="tecnico" if modelo.startswith("Técnico") else "literatura",
+            )
+
+        res = st.session_state.get("solver_result")
+        if not res:
+            return
+        (st.success if res["ok"] else st.warning)(f"{res['message']} ({res['elapsed_ms']:.0f} ms)")
+        if res["A"] is None:
+            return
+        k = res["kpis"]
+        m1, m2, m3 = st.columns(3)
+        m1.metric("II (solver)", f"{k['II']:.1f}")
+        m2.metric("ISap (solver)", f"{k['ISap']:.1f} mgKOH/g")
+        m3.metric("PF (°C, solver)", f"{k['PF_C']:.1f}")
+        st.dataframe(pd.DataFrame({
+            "Ingrediente": [lbl for _, lbl in INGREDIENTS],
+            "Classe A (%)": [round(float(res["A"][CATALOG.ing_index[key]]), 2) for key, _ in INGREDIENTS],
+            "Classe C (%)": [round(float(res["C"][CATALOG.ing_index[key]]), 2) for key, _ in INGREDIENTS],
+        }), hide_index=True, use_container_width=True)
+
+        st.button("✅ Aplicar solução nos sliders", key="btn_solver_apply", on_click=_apply_solver, args=(res,))
+
+def _apply_solver(res: dict):
+    """on_click: solução do solver → Classe A + ajuste C (B zerada)."""
+    _set_sliders({key: float(res["A"][CATALOG.ing_index[key]]) for key, _ in INGREDIENTS},
+                 {fa: 0.0 for fa in FA_ORDER},
+                 {key: float(res["C"][CATALOG.ing_index[key]]) for key, _ in INGREDIENTS}, _METHOD_C)
+    st.session_state.pop("solver_result", None)
+
+# ⛳ ANCHOR: fronteira_pareto
+_PARETO_LABELS = {"II": "II", "ISap": "ISap", "PF_C": "PF (°C)",
+                  "Mãos": "Mãos", "Corpo": "Corpo", "Rosto": "Rosto", "Cabelos": "Cabelos"}
+
+def _plot_pareto_scatter(front: pd.DataFrame, x: str, y: str):
+    _show_chart(scatter_png, scatter_spec, front[x], front[y], x, y, "Fronteira de Pareto", key="chart_pareto")
+
+def _render_pareto(B_vals: dict, C_vals: dict, scen_mix: str):
+    """Explora o simplex da Classe A (com o ajuste B/C atual fixo) e mostra só os blends não dominados."""
+    from blend_pareto import OBJECTIVES, lattice_size, pareto_explore, DEFAULT_MAX_LATTICE
+    with st.expander("📈 Fronteira de Pareto (explorar o simplex da Classe A)", expanded=False):
+        st.caption("Avalia todas as composições da Classe A (reticulado) ou uma amostra uniforme do simplex, "
+                   "em blocos, e mantém só os blends que nenhum outro supera em todos os objetivos.")
+        label_by_key = dict(INGREDIENTS)
+        ing_sel = st.multiselect("Ingredientes explorados (Classe A)", [k for k, _ in INGREDIENTS],
+                                 default=[k for k, _ in INGREDIENTS], format_func=label_by_key.get,
+                                 key="pareto_ing")
+        obj_sel = st.multiselect("Objetivos", list(OBJECTIVES), default=["Mãos", "PF_C"],
+                                 format_func=_PARETO_LABELS.get, key="pareto_obj")
+        objectives = []
+        if obj_sel:
+            dcols = st.columns(len(obj_sel))
+            for col, k in zip(dcols, obj_sel):
+                d = col.radio(_PARETO_LABELS[k], ["máx", "mín"], index=0 if OBJECTIVES[k] == "max" else 1,
+                              horizontal=True, key=f"pareto_dir_{k}")
+                objectives.append((k, "max" if d == "máx" else "min"))
+
+        c1, c2 = st.columns(2)
+        step = c1.select_slider("Passo do reticulado (%)", options=[20.0, 10.0, 5.0, 2.5, 2.0, 1.0],
+                                value=5.0, key="pareto_step")
+        n_samples = c2.select_slider("Amostras (se o reticulado for grande)",
+                                     options=[100_000, 500_000, 1_000_000, 2_000_000], value=1_000_000,
+                                     key="pareto_n")
+        n_lat = lattice_size(len(ing_sel), step) if ing_sel else 0
+        if n_lat <= DEFAULT_MAX_LATTICE:
+            st.caption(f"Reticulado completo: {n_lat:,} composições.")
+        else:
+            st.caption(f"Reticulado de {n_lat:,} composições: inviável; usando {n_samples:,} amostras de Dirichlet.")
+        adj = fa_vector(B_vals).sum() + ingredient_vector(C_vals).sum()
+        usar_adj = st.checkbox(f"Manter o ajuste fino atual (B/C = {adj:.1f}%)", value=True,
+                               disabled=not 0 < adj < 100, key="pareto_use_adj")
+
+        if st.button("📈 Explorar", key="btn_pareto", disabled=not (ing_sel and objectives)):
+            keep_adj = usar_adj and 0 < adj < 100
+            _submit_job("pareto", pareto_explore, dict(
+                objectives=objectives, ingredients=ing_sel, step=step, n_samples=int(n_samples),
+                B=fa_vector(B_vals) if keep_adj else None,
+                C=ingredient_vector(C_vals) if keep_adj else None,
+                total_A=float(100.0 - adj) if keep_adj else 100.0,
+                scenario=scen_mix,
+            ), label="Blends avaliados")
+        if _job_status("pareto"):
+            return
+
+        res = st.session_state.get("pareto_result")
+        if not res:
+            return
+        st.caption(f"{res['evaluated']:,} blends avaliados ({res['method']}) em {res['elapsed_ms'] / 1000:.1f} s; "
+                   f"{len(res['A'])} não dominados.")
+        if len(res["A"]) == 0:
+            return
+        front = pd.DataFrame({label_by_key[k]: res["A"][:, CATALOG.ing_index[k]].round(2)
+                              for k, _ in INGREDIENTS if res["A"][:, CATALOG.ing_index[k]].any()})
+        for k, v in res["values"].items():
+            front[_PARETO_LABELS[k]] = np.round(v, 2)
+        st.dataframe(front, use_container_width=True)
+        objs = [_PARETO_LABELS[k] for k, _ in res["objectives"]]
+        if len(objs) >= 2:
+            _plot_pareto_scatter(front, objs[0], objs[1])
+
+        row = st.number_input("Linha para aplicar na Classe A", 0, len(front) - 1, 0, step=1, key="pareto_row")
+        st.button("✅ Aplicar linha nos sliders da Classe A", key="btn_pareto_apply", on_click=_set_sliders,
+                  args=({key: float(res["A"][int(row), CATALOG.ing_index[key]]) for key, _ in INGREDIENTS},))
+
+# ⛳ ANCHOR: monte_carlo_lotes
+def _render_montecarlo(A_vals: dict, B_vals: dict, C_vals: dict):
+    """Distribuição dos KPIs em lotes reais: amostra perfis FA dentro dos envelopes Min/Max."""
+    with st.expander("🎲 Monte Carlo de lotes: distribuição de II, ISap e PF (°C)", expanded=False):
+        st.caption("Sorteia perfis FA de cada ingrediente dentro do envelope Min/Típico/Max "
+                   "(Min/Max ≈ ±3σ) e avalia os KPIs técnicos calibrados de todas as amostras. "
+                   "A Classe B (ácido puro) não varia.")
+        c1, c2, c3 = st.columns(3)
+        n_samples = c1.select_slider("Amostras", options=[10_000, 50_000, 100_000, 200_000],
+                                     value=100_000, key="mc_n")
+        rho_fa = c2.slider("Correlação entre ácidos (ρ)", 0.0, 1.0, 0.5, step=0.05, key="mc_rho_fa",
+                           help="Fator de saturação do lote: saturados sobem juntos e insaturados descem.")
+        rho_ing = c3.slider("Correlação entre ingredientes (ρ)", 0.0, 1.0, 0.0, step=0.05, key="mc_rho_ing",
+                            help="Lotes de mesma safra/fornecedor tendem a desviar no mesmo sentido.")
+        s1, s2, s3 = st.columns(3)
+        specs = {
+            "II": s1.slider("Especificação II", 0.0, 100.0, (40.0, 60.0), step=0.5, key="mc_spec_ii"),
+            "ISap": s2.slider("Especificação ISap (mgKOH/g)", 150.0, 300.0, (190.0, 215.0), step=0.5, key="mc_spec_isap"),
+            "PF_C": s3.slider("Especificação PF (°C)", 0.0, 70.0, (30.0, 45.0), step=0.5, key="mc_spec_pf"),
+        }
+
+        if st.button("🎲 Simular lotes", key="btn_mc"):
+            from blend_montecarlo import simulate_lot_variability
+            _submit_job("mc", simulate_lot_variability, dict(
+                A=ingredient_vector(A_vals), B=fa_vector(B_vals), C=ingredient_vector(C_vals),
+                n_samples=int(n_samples), rho_fa=rho_fa, rho_ing=rho_ing, specs=specs,
+            ), label="Simulando lotes", with_progress=False)
+        if _job_status("mc"):
+            return
+
+        res = st.session_state.get("mc_result")
+        if res is None:
+            st.caption("Defina o blend e clique em **Simular lotes**.")
+            return
+        from blend_montecarlo import mc_summary_rows
+        st.metric("Probabilidade de lote fora da especificação", f"{100 * res['out_of_spec']['any']:.1f}%")
+        st.dataframe(pd.DataFrame(mc_summary_rows(res)).round(3), hide_index=True, use_container_width=True)
+        h1, h2, h3 = st.columns(3)
+        with h1: _plot_mc_hist("II", res["samples"]["II"], res["specs"]["II"], "II")
+        with h2: _plot_mc_hist("ISap", res["samples"]["ISap"], res["specs"]["ISap"], "mgKOH/g")
+        with h3: _plot_mc_hist("PF (°C)", res["samples"]["PF_C"], res["specs"]["PF_C"], "°C")
+        st.caption(f"{res['n']:,} amostras em {res['elapsed_ms']:.0f} ms (especificações da última simulação).")
+
+# ⛳ ANCHOR: biblioteca_blends
+_LIBRARY_LABELS = {"II": "II", "ISap": "ISap", "PF_C": "PF (°C)",
+                   "Mãos": "Mãos", "Corpo": "Corpo", "Rosto": "Rosto", "Cabelos": "Cabelos"}
+
+def _render_library(A_vals: dict, B_vals: dict, C_vals: dict, scen_mix: str):
+    """Salva o blend atual na biblioteca colunar e consulta por faixas de KPI/nota; um resultado vai para os sliders."""
+    from blend_library import VALUE_KEYS, get_library
+    lib = get_library()
+    with st.expander(f"📚 Biblioteca de blends ({len(lib):,})", expanded=False):
+        c1, c2 = st.columns([3, 1])
+        nome = c1.text_input("Nome do blend", key="library_nome", placeholder="ex.: Sabonete base v3")
+        if c2.button("💾 Salvar na biblioteca", key="btn_library_save", disabled=not nome.strip()):
+            vec = lambda d, keys: [float(d.get(k, 0.0)) for k in keys]
+            rid = lib.append([vec(A_vals, CATALOG.ing_keys)], [vec(B_vals, FA_ORDER)], [vec(C_vals, CATALOG.ing_keys)],
+                             nomes=[nome.strip()], origem="aba", scenario=scen_mix)[0]
+            st.success(f"Salvo como id {rid}.")
+        if not len(lib):
+            st.caption("Biblioteca vazia. Salve blends aqui ou importe JSON com `python blend_library.py importar`.")
+            return
+
+        st.markdown("**Consulta por faixas**")
+        ranges = {}
+        cols = st.columns(3)
+        for col, (k, lo, hi) in zip(cols, (("II", 0.0, 150.0), ("ISap", 150.0, 300.0), ("PF_C", 0.0, 70.0))):
+            rng = col.slider(_LIBRARY_LABELS[k], lo, hi, (lo, hi), step=0.5, key=f"library_q_{k}")
+            if rng != (lo, hi):
+                ranges[k] = (None if rng[0] <= lo else rng[0], None if rng[1] >= hi else rng[1])
+        cols = st.columns(4)
+        for col, k in zip(cols, SCORE_KEYS):
+            v = col.number_input(f"{k} ≥", 0.0, 100.0, 0.0, step=5.0, key=f"library_min_{k}")
+            if v > 0:
+                ranges[k] = (v, None)
+        order_by = st.selectbox("Ordenar por", list(VALUE_KEYS), format_func=_LIBRARY_LABELS.get,
+                                index=VALUE_KEYS.index("Rosto"), key="library_order")
+        t0 = time.perf_counter()
+        ids = lib.query(ranges)
+        ms = (time.perf_counter() - t0) * 1000
+        top = lib.query(ranges, limit=200, sort_by=order_by, descending=order_by not in ("II", "PF_C"))
+        st.caption(f"{len(ids):,} de {len(lib):,} blends na consulta ({ms:.1f} ms). Mostrando até 200.")
+        if not len(top):
+            return
+        st.dataframe(lib.frame(top).round(2), use_container_width=True, hide_index=True)
+
+        rid = st.selectbox("Blend para carregar", [int(i) for i in top], key="library_pick",
+                           format_func=lambda i: f"{i} — {lib.column('nome', [i])[0]}")
+        st.button("⬆️ Carregar nos sliders", key="btn_library_load", on_click=_load_library_record, args=(rid,))
+
+def _load_library_record(rid: int):
+    """on_click: blend da biblioteca → sliders A/B/C e método de ajuste."""
+    from blend_library import get_library
+    rec = get_library().record(rid)
+    _set_sliders(rec["A"], rec["B"], rec["C"], _METHOD_B if any(rec["B"].values()) else _METHOD_C)
+
+# ⛳ ANCHOR: repositorio_blends
+def _blend_layers(blend: dict) -> tuple:
+    """JSON heur_blend → (A, B, C, método de ajuste) no formato de _set_sliders."""
+    return (*({k: float(v) for k, v in (blend.get(f"classe{x}_pct") or {}).items()} for x in ("A", "B", "C")),
+            _METHOD_B if blend.get("ajuste_method") == "B" else _METHOD_C)
+
+def _load_blend_into_sliders(blend: dict):
+    """JSON heur_blend lido no meio do script (uploader): handshake _apply_norm + rerun, aplicado antes dos widgets."""
+    st.session_state["_apply_norm"] = True
+    for x, vals in zip(("A", "B", "C", "method"), _blend_layers(blend)):
+        st.session_state[f"_norm_{x}"] = vals
+    st.rerun()
+
+def _load_repo_blend(bid: int):
+    """on_click: blend do repositório → sliders (e "blend", para exportar/guardar o mesmo JSON)."""
+    loaded = get_repository().load(bid)
+    st.session_state["blend"] = loaded
+    _set_sliders(*_blend_layers(loaded))
+
+_REPO_COLUMNS = {"criado": "Mais recentes", "nome": "Nome", "II": "II", "ISap": "ISap", "PF_C": "PF (°C)",
+                 "maos": "Mãos", "corpo": "Corpo", "rosto": "Rosto", "cabelos": "Cabelos"}
+
+def _render_repository(heur_blend: dict):
+    """Repositório SQLite no servidor: salvar o blend atual, buscar (paginado) e carregar nos sliders."""
+    repo = get_repository()
+    c1, c2 = st.columns([3, 1])
+    nome = c1.text_input("Nome para salvar no repositório", key="repo_nome", placeholder="ex.: Sabonete base v3")
+    if c2.button("🗄️ Salvar no repositório", key="btn_repo_save", disabled=not nome.strip()):
+        bid = repo.save(heur_blend, nome)
+        st.success(f"Blend salvo (id {bid}).")
+
+    f1, f2, f3 = st.columns([3, 2, 1])
+    busca = f1.text_input("Buscar por nome", key="repo_busca")
+    ordem = f2.selectbox("Ordenar por", list(_REPO_COLUMNS), format_func=_REPO_COLUMNS.get, key="repo_ordem")
+    _, total = repo.search(busca, page_size=1)
+    pages = max(1, -(-total // PAGE_SIZE))
+    page = f3.number_input("Página", 1, pages, 1, step=1, key="repo_pagina") if pages > 1 else 1
+    rows, total = repo.search(busca, page=min(int(page), pages), order_by=ordem,
+                              descending=ordem not in ("nome", "II", "PF_C"))
+    st.caption(f"{total} blend(s) no repositório" + (f" para “{busca}”" if busca.strip() else "") +
+               (f" — página {min(int(page), pages)} de {pages}." if pages > 1 else "."))
+    if not rows:
+        return
+    table = pd.DataFrame(rows).rename(columns={k: v for k, v in _REPO_COLUMNS.items() if k in KPI_COLUMNS})
+    table["criado"] = pd.to_datetime(table["criado"], unit="s").dt.strftime("%Y-%m-%d %H:%M")
+    st.dataframe(table.round(2), use_container_width=True, hide_index=True)
+
+    names = {r["id"]: r["nome"] for r in rows}
+    bid = st.selectbox("Blend", list(names), format_func=lambda i: f"{i} — {names[i]}", key="repo_pick")
+    b1, b2, b3 = st.columns(3)
+    b1.button("⬆️ Carregar nos sliders", key="btn_repo_load", on_click=_load_repo_blend, args=(bid,))
+    b2.download_button("💾 Exportar (JSON)", data=json.dumps(repo.load(bid), ensure_ascii=False, indent=2).encode("utf-8"),
+                       file_name=f"blend_{bid}.json", mime="application/json", key="dl_repo_json")
+    if b3.button("🗑️ Excluir", key="btn_repo_delete"):
+        repo.delete(bid)
+        st.rerun()
+
+# ⛳ ANCHOR: vizinhos_biblioteca
+def _render_neighbors(fa_now: dict, kpis_now: dict):
+    """k blends da biblioteca mais parecidos com o atual (perfil FA e/ou KPIs); um deles pode virar o snapshot A."""
+    from blend_library import get_library
+    lib = get_library()
+    with st.expander("🔎 Blends semelhantes na biblioteca", expanded=False):
+        if not len(lib):
+            st.caption("Biblioteca vazia — salve blends em **📚 Biblioteca de blends** para buscar semelhantes.")
+            return
+        if sum(fa_now.values()) <= 0:
+            st.caption("Defina o blend atual para buscar semelhantes.")
+            return
+        c1, c2 = st.columns([3, 1])
+        by = c1.radio("Semelhança por", ["Perfil FA", "KPIs (II, ISap, PF)", "Perfil FA + KPIs"],
+                      horizontal=True, key="library_nn_by")
+        k = c2.number_input("Quantos", 1, 50, 5, step=1, key="library_nn_k")
+        t0 = time.perf_counter()
+        ids, dist = lib.nearest(fa=None if by.startswith("KPIs") else [fa_now.get(fa, 0.0) for fa in FA_ORDER],
+                                kpis=kpis_now if "KPIs" in by else None, k=int(k))
+        ms = (time.perf_counter() - t0) * 1000
+        st.caption(f"Busca em {len(lib):,} blends: {ms:.1f} ms. Distância em tolerâncias "
+                   "(5 pp por ácido graxo; II/ISap ±5; PF ±2 °C).")
+        if not len(ids):
+            return
+        table = lib.frame(ids)
+        table.insert(3, "Distância", dist.astype(float))
+        st.dataframe(table.round(2), use_container_width=True, hide_index=True)
+
+        rid = st.selectbox("Vizinho", [int(i) for i in ids], key="library_nn_pick",
+                           format_func=lambda i: f"{i} — {lib.column('nome', [i])[0]}")
+        if st.button("📌 Usar como snapshot A", key="btn_library_nn_snapA"):
+            rec = lib.record(rid)
+            st.session_state["cmp_A"] = _make_snapshot(
+                label=f"Biblioteca #{rec['id']} — {rec['nome']}", fa_dict=rec["fa"],
+                II=rec["II"], ISap=rec["ISap"], PF_celsius=rec["PF_C"], A_vals=rec["A"])
+            st.session_state.pop("cmp_A_tradeoffs", None)
+            st.success(f"Blend #{rec['id']} salvo como A. Salve o atual como B para comparar.")
+        if st.button("➕ Adicionar todos à comparação de variantes", key="btn_library_nn_cmp"):
+            recs = [lib.record(int(i)) for i in ids]
+            added = _add_to_compare([_make_snapshot(label=f"#{r['id']} {r['nome']}", fa_dict=r["fa"], II=r["II"],
+                                                    ISap=r["ISap"], PF_celsius=r["PF_C"], A_vals=r["A"])
+                                     for r in recs])
+            st.success(f"{added} vizinho(s) adicionado(s) à comparação de variantes.")
+
+# ⛳ ANCHOR: upload_multi_blend
+def _render_wide_upload(wide: dict, file_id: str, origem: str = "Formato largo"):
+    """Tabela (ordenável/filtrável) de N blends do formato largo; devolve o perfil FA do blend escolhido."""
+    table = wide["table"]
+    valid = table["II"].notna()
+    st.success(f"{origem}: {len(table)} blends ({int(valid.sum())} com composição).")
+    if not valid.any():
+        return None
+
+    f1, f2, f3, f4 = st.columns(4)
+    text = f1.text_input("Filtrar por texto (ID, lote…)", key=f"upload_wide_text_{file_id}")
+    ranges = {}
+    for col, (widget_col, label) in {"II": (f2, "Faixa de II"), "ISap": (f3, "Faixa de ISap"),
+                                     "PF (°C)": (f4, "Faixa de PF (°C)")}.items():
+        lo, hi = float(np.floor(table[col].min())), float(np.ceil(table[col].max()))
+        if hi > lo:
+            ranges[col] = widget_col.slider(label, lo, hi, (lo, hi), key=f"upload_wide_{col}_{file_id}")
+    shown = table[filter_table(table, text, ranges)]
+    st.caption(f"{len(shown)} de {len(table)} blends no filtro. Clique no cabeçalho para ordenar.")
+    st.dataframe(shown.round(2), use_container_width=True)
+    st.download_button("📥 Baixar resultados (CSV)", data=shown.to_csv(index=False).encode("utf-8"),
+                       file_name="blends_pontuados.csv", mime="text/csv", key=f"dl_upload_wide_{file_id}")
+    if shown.empty:
+        return None
+
+    id_col = wide["layout"]["extra"][0] if wide["layout"]["extra"] else None
+    row = st.selectbox("Blend para detalhar (KPIs, ajuste fino e trade-offs)", list(shown.index),
+                       format_func=lambda i: f"{table.at[i, id_col]}" if id_col else f"Linha {i + 1}",
+                       key=f"upload_wide_row_{file_id}")
+    return profile_of_row(wide, row)
+
 # ----------------- RENDER -----------------
 def render_blend_enzimatico():
     st.header("Blend Enzimático ⚗️")
@@ -781,7 +824,8 @@ def render_blend_enzimatico():
 
     # Variabilidade
     st.markdown("### Variabilidade de lote (opcional)")
-    consider_var = st.toggle("Considerar variabilidade de lote", value=False, help="Usa perfis Min/Típico/Max por ingrediente.")
+    consider_var = st.toggle("Considerar variabilidade de lote", value=False, help="Usa perfis Min/Típico/Max por ingrediente.",
+                             key="consider_var")
     scenario = "mean"
     if consider_var:
         scen_label = st.radio("Cenário", ["Típico", "Min", "Max"], horizontal=True, index=0, key="var_scenario")
@@ -793,122 +837,88 @@ def render_blend_enzimatico():
 
     # ---------------- HEURÍSTICO ----------------
     if mode == "Heurísticas (rápido)":
+        profiler.stage("sessão / handshake")
         for k, _ in INGREDIENTS:
             st.session_state.setdefault(f"slider_ing_{k}", 0.0)
         for fa in FA_ORDER:
             st.session_state.setdefault(f"slider_fa_{fa}", 0.0)
         for k, _ in INGREDIENTS:
             st.session_state.setdefault(f"slider_adj_{k}", 0.0)
-        # Aplicar normalização pendente (antes de criar widgets)
-        if st.session_state.get("_apply_norm"):
-            normA = st.session_state.get("_norm_A", {})
-            normB = st.session_state.get("_norm_B")
-            normC = st.session_state.get("_norm_C")
-            for k, v in normA.items():
-                st.session_state[f"slider_ing_{k}"] = float(round(v, 2))
-            if normB is not None:
-                for k, v in normB.items():
-                    st.session_state[f"slider_fa_{k}"] = float(round(v, 2))
-            if normC is not None:
-                for k, v in normC.items():
-                    st.session_state[f"slider_adj_{k}"] = float(round(v, 2))
-            for _tmp in ("_apply_norm", "_norm_A", "_norm_B", "_norm_C"):
-                st.session_state.pop(_tmp, None)
+        # Blend carregado por JSON no rerun anterior (antes de criar widgets)
+        if st.session_state.pop("_apply_norm", False):
+            _set_sliders(*(st.session_state.pop(f"_norm_{x}", None) for x in ("A", "B", "C", "method")))
 
         st.subheader("Heurísticas com duas camadas: Base (Classe A) + Ajuste fino (B ou C)")
         st.caption("⚠️ **Médias calibradas** para II/ISap/PF quando **sem ajuste**; com ajuste, KPIs passam a ser **técnicos (perfil FA)**.")
 
+        profiler.stage("sliders A/B/C")
         # Classe A
         A_vals = OrderedDict()
         with st.expander("Classe A — Ingredientes da palma (base do blend)", expanded=True):
-            colsA = st.columns(4)
-            for idx, (k, label) in enumerate(INGREDIENTS):
-                with colsA[idx % 4]:
-                    A_vals[k] = st.slider(label, min_value=0.0, max_value=100.0, step=1.0, key=f"slider_ing_{k}")
+            with _edit_transaction("A"):
+                colsA = st.columns(4)
+                for idx, (k, label) in enumerate(INGREDIENTS):
+                    with colsA[idx % 4]:
+                        A_vals[k] = st.slider(label, min_value=0.0, max_value=100.0, step=1.0, key=f"slider_ing_{k}")
             total_A = sum(A_vals.values()); _badge_total(total_A, "Total Classe A")
 
         # Método ajuste
         st.markdown("**Ajuste fino** (opcional): escolha o método")
-        method = st.radio("Método de ajuste", ["Classe B — Ácidos graxos puros", "Classe C — Ingredientes"],
-                          horizontal=True, key="ajuste_method_heur")
+        method = st.radio("Método de ajuste", [_METHOD_B, _METHOD_C], horizontal=True, key="ajuste_method_heur")
 
         # Classe B
         B_vals = OrderedDict((fa, 0.0) for fa in FA_ORDER)
         total_B = 0.0
         if method.startswith("Classe B"):
             with st.expander("Classe B — Ajuste fino por Ácidos graxos puros", expanded=True):
-                colsB = st.columns(4)
-                for idx, fa in enumerate(FA_ORDER):
-                    with colsB[idx % 4]:
-                        B_vals[fa] = st.slider(f"FA {fa}", min_value=0.0, max_value=100.0, step=1.0, key=f"slider_fa_{fa}")
+                with _edit_transaction("B"):
+                    colsB = st.columns(4)
+                    for idx, fa in enumerate(FA_ORDER):
+                        with colsB[idx % 4]:
+                            B_vals[fa] = st.slider(f"FA {fa}", min_value=0.0, max_value=100.0, step=1.0, key=f"slider_fa_{fa}")
                 total_B = sum(B_vals.values()); _badge_total(total_B, "Total Classe B")
-                if total_B > 30:
-                    st.warning("A Classe B excede 30% do blend — considere reduzir para manter o caráter do óleo base.")
+                issue = check_adjust(total_B, "B")
+                if issue:
+                    st.warning(issue.message)
 
         # Classe C
         C_vals = OrderedDict((k, 0.0) for k, _ in INGREDIENTS)
         total_C = 0.0
         if method.endswith("Ingredientes"):
             with st.expander("Classe C — Ajuste fino por Ingredientes", expanded=True):
-                colsC = st.columns(4)
-                for idx, (k, label) in enumerate(INGREDIENTS):
-                    with colsC[idx % 4]:
-                        C_vals[k] = st.slider(f"{label} (ajuste)", min_value=0.0, max_value=100.0, step=1.0, key=f"slider_adj_{k}")
+                with _edit_transaction("C"):
+                    colsC = st.columns(4)
+                    for idx, (k, label) in enumerate(INGREDIENTS):
+                        with colsC[idx % 4]:
+                            C_vals[k] = st.slider(f"{label} (ajuste)", min_value=0.0, max_value=100.0, step=1.0, key=f"slider_adj_{k}")
                 total_C = sum(C_vals.values()); _badge_total(total_C, "Total Classe C")
-                if total_C > 30:
-                    st.warning("A Classe C excede 30% do blend — considere reduzir para manter o caráter do óleo base.")
+                issue = check_adjust(total_C, "C")
+                if issue:
+                    st.warning(issue.message)
 
+        # só a camada de ajuste escolhida entra no blend
+        B_use = B_vals if method.startswith("Classe B") else None
+        C_use = C_vals if method.endswith("Ingredientes") else None
         total_all = total_A + (total_B if method.startswith("Classe B") else total_C)
         st.markdown("---")
         _badge_total(total_all, "Total Global (A + Ajuste)")
-        if total_all > 0 and st.button("🔄 Normalizar Global (A + Ajuste) para 100%", key="btn_norm_AB_or_AC"):
-            scale = 100.0 / total_all
-            A_scaled = {k: A_vals[k] * scale for k in A_vals}
-            if method.startswith("Classe B"):
-                B_scaled = {k: B_vals[k] * scale for k in B_vals}
-                C_scaled = None
-            else:
-                C_scaled = {k: C_vals[k] * scale for k in C_vals}
-                B_scaled = None
-            st.session_state["_apply_norm"] = True
-            st.session_state["_norm_A"] = A_scaled
-            st.session_state["_norm_B"] = B_scaled
-            st.session_state["_norm_C"] = C_scaled
-            st.rerun()
-
-        # Perfil FA estimado (para gráficos e PF índice)
-        fa_est = {k: 0.0 for k in FA_ORDER}
         if total_all > 0:
-            for ing_key, pct in A_vals.items():
-                if pct <= 0: continue
-                w = pct / total_all
-                prof = _get_profile(ing_key, scenario if consider_var else "mean")
-                for fa_key, fa_pct in prof.items():
-                    fa_est[fa_key] += w * fa_pct
-            if method.startswith("Classe B"):
-                for fa_key, pct in B_vals.items():
-                    if pct <= 0: continue
-                    w = pct / total_all
-                    fa_est[fa_key] += w * 100.0
-            else:
-                for ing_key, pct in C_vals.items():
-                    if pct <= 0: continue
-                    w = pct / total_all
-                    prof = _get_profile(ing_key, scenario if consider_var else "mean")
-                    for fa_key, fa_pct in prof.items():
-                        fa_est[fa_key] += w * fa_pct
-        fa_est = _normalize_percentages(fa_est)
-
-        # KPIs — baseline calibrado (A) x atual técnico (se houver ajuste)
-        II_base, IS_base, PF_base_c = kpis_calibrados_por_medias(A_vals, {}, scenario if consider_var else "mean")
-        has_adjust = (total_B > 0) or (total_C > 0)
-        # ⛳ ANCHOR: apply_calibrated_kpis_heur_now
-        if has_adjust:
-            II_now = ii_calibrated_from_fa(fa_est)
-            IS_now = isap_calibrated_from_fa(fa_est)
-            PF_now_c = pf_index_to_celsius(melt_index(fa_est))
-        else:
-            II_now, IS_now, PF_now_c = II_base, IS_base, PF_base_c
+            st.button("🔄 Normalizar Global (A + Ajuste) para 100%", key="btn_norm_AB_or_AC", on_click=_normalize_sliders)
+
+        profiler.stage("solver / Pareto")
+        scen_mix = scenario if consider_var else "mean"
+        _render_solver(A_vals, C_vals if method.endswith("Ingredientes") else {}, scen_mix)
+        _render_pareto(B_vals if method.startswith("Classe B") else {},
+                       C_vals if method.endswith("Ingredientes") else {}, scen_mix)
+
+        profiler.stage("mistura FA / KPIs")
+        # Perfil FA estimado + KPIs: baseline calibrado (A) x atual técnico (se houver ajuste)
+        heur_state = _heur_state()
+        heur = heur_state.update(A_vals, B_use, C_use, scen_mix)
+        profiler.count(f"mistura: {heur_state.last_mode}")
+        fa_est, has_adjust = heur["fa"], heur["has_adjust"]
+        II_base, IS_base, PF_base_c = heur["base"]
+        II_now, IS_now, PF_now_c = heur["now"]
 
         st.markdown("---")
         st.subheader("KPIs")
@@ -931,18 +941,15 @@ def render_blend_enzimatico():
             cols2[1].metric("ISap — baseline", f"{IS_base:.1f} mgKOH/g")
             cols2[2].metric("PF — baseline (°C)", f"{PF_base_c:.1f}")
 
+        profiler.stage("Monte Carlo")
+        if consider_var:
+            _render_montecarlo(A_vals, B_vals if method.startswith("Classe B") else {},
+                               C_vals if method.endswith("Ingredientes") else {})
+
+        profiler.stage("snapshots / comparação")
         # --- Botões de Snapshot (Heurístico) ---
         # Baseline FA = somente Classe A (proporcional a total_A), usando perfis 'scenario/mean'
-        fa_baseline_A = {k: 0.0 for k in FA_ORDER}
-        if sum(A_vals.values()) > 0:
-            for ing_key, pct in A_vals.items():
-                if pct <= 0:
-                    continue
-                w = pct / sum(A_vals.values())
-                profA = _get_profile(ing_key, scenario if consider_var else "mean")
-                for fa_key, fa_pct in profA.items():
-                    fa_baseline_A[fa_key] += w * fa_pct
-        fa_baseline_A = _normalize_percentages(fa_baseline_A)
+        fa_baseline_A = heur["fa_base"]
         # ⛳ ANCHOR: cmp_ctx_setup (DEVE ficar logo antes dos botões Salvar A/B)
         st.session_state["cmp_ctx"] = {
             "mode": "heur",
@@ -985,8 +992,12 @@ def render_blend_enzimatico():
             st.session_state.pop("cmp_B_tradeoffs", None)  # limpa trade-offs de B
             st.info("Snapshots A e B limpos.")
 
+        _render_neighbors(fa_est, {"II": II_now, "ISap": IS_now, "PF_C": PF_now_c})
+
         # Renderiza comparação, se existir
         _render_compare_AB()
+        _render_compare_n(_make_snapshot(label="Atual", fa_dict=fa_est, II=II_now, ISap=IS_now,
+                                         PF_celsius=PF_now_c, A_vals=A_vals))
         
         # Expanders (faixas típicas)
         e1, e2, e3 = st.columns(3)
@@ -1030,26 +1041,28 @@ def render_blend_enzimatico():
 
         st.info("📄 Após finalizar sua formulação, gere o dossiê completo na aba **Exportação PDF** (perfil FA, KPIs, preview e narrativa).")
 
+        profiler.stage("gráficos FA / radar")
         # Gráficos
         g1, g2 = st.columns(2)          # <-- garante g1 e g2 definidos
         with g1:
             _plot_fa_bars(fa_est)
 
         with g2:
-            if sum(A_vals.values()) + sum(B_vals.values()) + sum(C_vals.values()) > 0:
-                II_for_radar = iodine_index(fa_est)
-                _, radar_vals = _scores_finais(fa_est, melt_index(fa_est), II_for_radar)
-                _plot_radar(radar_vals)
+            if heur["radar"] is not None:
+                _plot_radar(heur["radar"])
             else:
                 _plot_radar(None)  # mostra só o frame vazio até ter algo selecionado
                 # ⛳ MICRO5: radar_frame_caption
             # (logo após _plot_radar(None))
             st.caption("Radar exibido como referência (sem dados) até selecionar ingredientes/ajustes.")
 
+        profiler.stage("trade-offs")
         # Trade-offs
         st.markdown("---")
-        st.subheader("Análise de Trade-offs (variação de +5% em cada ingrediente da Classe A)")
-        trade = _compute_tradeoffs_heuristico(A_vals, method, B_vals, C_vals, consider_var, scenario)
+        step = st.select_slider("Passo da variação (pontos %)", options=TRADEOFF_STEPS, value=5.0, key="tradeoff_step_heur")
+        st.subheader(f"Análise de Trade-offs (variação de {step:+g}% em cada ingrediente da Classe A)")
+        with profiler.span("trade-offs (cálculo)"):
+            trade = heur_state.tradeoffs(step)
         if trade is None:
             st.caption("Defina a base (Classe A) para visualizar os trade-offs.")
         else:
@@ -1058,12 +1071,12 @@ def render_blend_enzimatico():
             with cto1: _plot_tradeoff_bars("Δ Índice de Iodo (II)", labels, dII, "Δ II")
             with cto2: _plot_tradeoff_bars("Δ Índice de Saponificação (ISap)", labels, dIS, "Δ ISap")
             with cto3: _plot_tradeoff_bars("Δ Ponto de Fusão (°C)", labels, dPFc, "Δ PF (°C)")
-            st.caption("Leitura: impacto em KPIs ao variar **+5%** (renormalizado).")
+            st.caption(f"Leitura: impacto em KPIs ao variar **{step:+g}%** (renormalizado).")
 
         # Preview finalidade (estimativo) — só exibe com seleção/ajuste
         st.subheader("Preview de notas por finalidade (0–100) – estimativas")
-        if (sum(A_vals.values()) > 0) or (total_B > 0) or (total_C > 0):
-            scores, _ = _scores_finais(fa_est, melt_index(fa_est), iodine_index(fa_est))
+        if heur["scores"] is not None:
+            scores = heur["scores"]
             p1, p2, p3, p4 = st.columns(4)
             p1.metric("Mãos", f"{scores['Mãos']}")
             p2.metric("Corpo", f"{scores['Corpo']}")
@@ -1072,21 +1085,25 @@ def render_blend_enzimatico():
         else:
             st.caption("Defina ao menos 1 ingrediente da Classe A e/ou um ajuste fino (B/C) para ver as notas por finalidade.")
 
+        profiler.stage("notas / salvar / handoff")
         # Salvar/Carregar
         st.markdown("---")
-        st.subheader("Salvar / Carregar Blend (JSON)")
+        st.subheader("Salvar / Carregar Blend")
         heur_blend = {
             "modo": "heuristico",
             "classeA_pct": {k: float(v) for k, v in A_vals.items()},
             "classeB_pct": {k: float(v) for k, v in B_vals.items()},
             "classeC_pct": {k: float(v) for k, v in C_vals.items()},
             "ajuste_method": "B" if method.startswith("Classe B") else "C",
-            "fa_profile": _normalize_percentages(fa_est),
+            "fa_profile": dict(fa_est),
             "total_pct": float(total_all),
             "variabilidade": {"ativada": bool(consider_var), "cenario": scenario},
             "nota": "Heurístico com Classe A (base) + ajuste fino (B=FA puros OU C=Ingredientes). "
                     "KPIs: baseline (médias calibradas) e atual (técnico se ajuste; PF em °C por calibração).",
         }
+        _render_repository(heur_blend)
+
+        st.markdown("**Importar / exportar (JSON)**")
         cjs1, cjs2 = st.columns(2)
         with cjs1:
             st.download_button(
@@ -1098,29 +1115,39 @@ def render_blend_enzimatico():
             )
         with cjs2:
             uploaded_json = st.file_uploader("📂 Carregar Blend (JSON)", type=["json"], key="blend_json_upload_heur")
-            if uploaded_json is not None:
+            # aplica uma vez por arquivo (o uploader continua com o arquivo nos reruns seguintes)
+            if uploaded_json is not None and st.session_state.get("_blend_json_loaded") != uploaded_json.file_id:
                 try:
                     loaded = json.load(uploaded_json)
-                    if loaded.get("modo") == "heuristico":
-                        for k, v in loaded.get("classeA_pct", {}).items():
-                            st.session_state[f"slider_ing_{k}"] = float(v)
-                        for k, v in loaded.get("classeB_pct", {}).items():
-                            st.session_state[f"slider_fa_{k}"] = float(v)
-                        for k, v in loaded.get("classeC_pct", {}).items():
-                            st.session_state[f"slider_adj_{k}"] = float(v)
+                    errors = [] if loaded.get("modo") != "heuristico" else [
+                        i for i in validate_blend(loaded.get("classeA_pct") or {}, loaded.get("classeB_pct") or {},
+                                                  loaded.get("classeC_pct") or {}) if i.level == "erro"]
+                    if errors:
+                        for issue in errors:
+                            st.error(issue.message)
+                    elif loaded.get("modo") == "heuristico":
+                        st.session_state["_blend_json_loaded"] = uploaded_json.file_id
                         st.session_state["blend"] = loaded
-                        st.success("Blend heurístico (A + ajuste) carregado e sliders atualizados.")
-                        st.rerun()
+                        _load_blend_into_sliders(loaded)
                     else:
                         st.warning("JSON não parece ser um blend heurístico.")
                 except Exception as e:
                     st.error(f"Erro ao carregar JSON: {e}")
+            if uploaded_json is not None and st.session_state.get("_blend_json_loaded") == uploaded_json.file_id:
+                st.success("Blend heurístico (A + ajuste) carregado e sliders atualizados.")
+                if st.button("🗄️ Guardar também no repositório", key="btn_repo_import_json"):
+                    bid = get_repository().save(st.session_state["blend"],
+                                                os.path.splitext(uploaded_json.name)[0])
+                    st.success(f"Salvo no repositório (id {bid}).")
+
+        _render_library(A_vals, B_vals if method.startswith("Classe B") else {},
+                        C_vals if method.endswith("Ingredientes") else {}, scen_mix)
 
         st.markdown("---")
         st.info("Pronto para detalhar por finalidade no **Assistente de Formulação** (estimativa baseada em heurística).")
         assist_payload = {
             "fa_profile": fa_est,
-            "kpis": {"II": II_now, "ISap": IS_now, "PF_proxy": melt_index(fa_est)},  # compatibilidade
+            "kpis": {"II": II_now, "ISap": IS_now, "PF_proxy": heur["PF_idx"]},  # compatibilidade
             "kpis_baseline": {"II": II_base, "ISap": IS_base, "PF_celsius": PF_base_c},
             "PF_celsius": PF_now_c,
             "source": "heuristica_estimada_A+" + ("B" if method.startswith("Classe B") else "C"),
@@ -1134,6 +1161,7 @@ def render_blend_enzimatico():
 
     # ---------------- UPLOAD (perfil real) ----------------
     else:
+        profiler.stage("upload: leitura")
         st.subheader("Upload de planilha real")
         for fa in FA_ORDER:
             st.session_state.setdefault(f"slider_upload_fa_{fa}", 0.0)
@@ -1142,7 +1170,9 @@ def render_blend_enzimatico():
         st.caption(
             "Aceita **CSV/XLSX** com **Ingredientes (%)** ou **Ácidos graxos (%)**. "
             "O sistema **auto-normaliza**. Após carregar, você pode aplicar **ajuste fino** por "
-            "**B (FA)** ou **C (Ingredientes)**."
+            "**B (FA)** ou **C (Ingredientes)**. Também aceita o **formato largo** (uma linha por blend: "
+            "ID + uma coluna por ingrediente ou código FA), com tabela de todos os blends, e XLSX com "
+            "várias abas (uma por lote/fornecedor), lidas de uma vez."
         )
 
         formato = st.selectbox("Formato da planilha", ["Ingredientes (%)", "Ácidos graxos (%)"], key="formato_planilha")
@@ -1158,48 +1188,54 @@ def render_blend_enzimatico():
         parsed_ing, parsed_fa = OrderedDict(), OrderedDict()
         original_total = None; fa_norm = None
 
-        if file is not None:
-            try:
-                df = pd.read_csv(file) if file.name.lower().endswith(".csv") else pd.read_excel(file)
-            except Exception as e:
-                st.error(f"Erro ao ler arquivo: {e}"); df = None
-
-            if df is not None:
-                st.write("Prévia da planilha carregada:"); st.dataframe(df, use_container_width=True)
-                if formato == "Ingredientes (%)":
-                    col_ing, col_pct = "Ingrediente", "Percentual"
-                    if col_ing in df.columns and col_pct in df.columns:
-                        label_to_key = {lbl: k for k, lbl in INGREDIENTS}
-                        for _, row in df.iterrows():
-                            lbl = str(row[col_ing]).strip()
-                            pct = float(row[col_pct]) if pd.notna(row[col_pct]) else 0.0
-                            k = label_to_key.get(lbl)
-                            if k: parsed_ing[k] = parsed_ing.get(k, 0.0) + pct
-                            else: st.warning(f"Ingrediente não reconhecido e ignorado: '{lbl}'")
-                        original_total = sum(parsed_ing.values()); _badge_total(original_total, "Total da planilha (ingredientes)")
-                        # converte p/ FA
-                        fa_tmp = {k: 0.0 for k in FA_ORDER}
-                        tot = sum(parsed_ing.values()) or 1.0
-                        for ing_key, pct in parsed_ing.items():
-                            w = pct / tot
-                            prof = _get_profile(ing_key, "mean")
-                            for fa_key, fa_pct in prof.items():
-                                fa_tmp[fa_key] += w * fa_pct
-                        fa_norm = _normalize_percentages(fa_tmp)
+        all_sheets = False
+        if file is not None and file.name.lower().endswith(".xlsx"):
+            sheets = workbook_sheets(file.getvalue())
+            if len(sheets) > 1:
+                all_sheets = st.toggle(f"Ler todas as {len(sheets)} abas (uma por lote/fornecedor)", value=True,
+                                       key="upload_all_sheets",
+                                       help="Desligado: lê só a primeira aba.")
+
+        if file is not None and all_sheets:
+            bar = st.progress(0.0, text="Lendo abas…")
+            wb = parse_workbook(file.getvalue(), formato,
+                                progress=lambda done, total: bar.progress(done / total, text=f"Lendo abas… {done}/{total}"))
+            bar.empty()
+            if wb["errors"]:
+                with st.expander(f"⚠️ {len(wb['errors'])} aba(s) ignorada(s) com erro"):
+                    for sh, msg in wb["errors"].items():
+                        st.write(f"**{sh}**: {msg}")
+            if wb["warnings"]:
+                with st.expander(f"Avisos em {len(wb['warnings'])} aba(s)"):
+                    for sh, msgs in wb["warnings"].items():
+                        st.write(f"**{sh}**: " + "; ".join(msgs))
+            if wb["error"]:
+                st.error(wb["error"])
+            else:
+                fa_norm = _render_wide_upload(wb, f"{file.file_id}_abas", "Pasta de trabalho")
+        elif file is not None:
+            upl = parse_upload(file.getvalue(), file.name, formato)
+            if upl["error"]:
+                st.error(upl["error"])
+            else:
+                st.write("Prévia da planilha carregada:"); st.dataframe(upl["df"], use_container_width=True)
+                wide, parsed = upl["wide"], upl["parsed"]
+                if wide is None:
+                    if parsed["error"]:
+                        st.error(parsed["error"] + " Ou use o formato largo: uma linha por blend (ID + uma coluna "
+                                 "por ingrediente ou código FA).")
                     else:
-                        st.error("Planilha deve ter colunas 'Ingrediente' e 'Percentual'.")
+                        for msg in parsed["warnings"]:
+                            st.warning(msg)
+                        parsed_ing, parsed_fa = parsed["parsed_ing"], parsed["parsed_fa"]
+                        original_total = parsed["original_total"]
+                        _badge_total(original_total, "Total da planilha (ingredientes)" if formato == "Ingredientes (%)"
+                                     else "Total da planilha (FA)")
+                        fa_norm = parsed["fa_norm"]
                 else:
-                    col_fa, col_pct = "AcidoGraxos", "Percentual"
-                    if col_fa in df.columns and col_pct in df.columns:
-                        for _, row in df.iterrows():
-                            fa = str(row[col_fa]).strip()
-                            pct = float(row[col_pct]) if pd.notna(row[col_pct]) else 0.0
-                            parsed_fa[fa] = parsed_fa.get(fa, 0.0) + pct
-                        original_total = sum(parsed_fa.values()); _badge_total(original_total, "Total da planilha (FA)")
-                        fa_norm = _normalize_percentages(parsed_fa)
-                    else:
-                        st.error("Planilha deve ter colunas 'AcidoGraxos' e 'Percentual'.")
+                    fa_norm = _render_wide_upload(wide, file.file_id)
 
+        profiler.stage("upload: ajuste fino / KPIs")
         if fa_norm:
             st.markdown("---")
             st.subheader("KPIs do Blend (perfil real) + Ajuste fino (opcional)")
@@ -1216,8 +1252,9 @@ def render_blend_enzimatico():
                         with colsB[idx % 4]:
                             B_vals_u[fa] = st.slider(f"FA {fa} (ajuste fino)", min_value=0.0, max_value=30.0, step=0.5, key=f"slider_upload_fa_{fa}")
                     total_B_u = sum(B_vals_u.values())
-                    if total_B_u > 30:
-                        st.warning("Classe B excede 30% do blend — considere reduzir para manter o caráter do óleo base.")
+                    issue = check_adjust(total_B_u, "B")
+                    if issue:
+                        st.warning(issue.message)
 
             # Ajuste C
             C_vals_u = OrderedDict((k, 0.0) for k, _ in INGREDIENTS)
@@ -1229,54 +1266,41 @@ def render_blend_enzimatico():
                         with colsC[idx % 4]:
                             C_vals_u[k] = st.slider(f"{label} (ajuste fino)", min_value=0.0, max_value=30.0, step=0.5, key=f"slider_upload_adj_{k}")
                     total_C_u = sum(C_vals_u.values())
-                    if total_C_u > 30:
-                        st.warning("Classe C excede 30% do blend — considere reduzir para manter o caráter do óleo base.")
-
-            # Combina
-            fa_comb = fa_norm.copy()
-            if method_upl.startswith("Classe B") and total_B_u > 0:
-                for fa, pct in B_vals_u.items():
-                    fa_comb[fa] = fa_comb.get(fa, 0.0) + pct
-                fa_comb = _normalize_percentages(fa_comb)
-            elif method_upl.endswith("Ingredientes") and total_C_u > 0:
-                add = {k: 0.0 for k in FA_ORDER}
-                for ing_key, pct in C_vals_u.items():
-                    if pct <= 0: continue
-                    prof = _get_profile(ing_key, "mean")
-                    for fa_key, fa_pct in prof.items():
-                        add[fa_key] += (pct * fa_pct / 100.0)
-                for fa_key, inc in add.items():
-                    fa_comb[fa_key] = fa_comb.get(fa_key, 0.0) + inc
-                fa_comb = _normalize_percentages(fa_comb)
-
-            # ⛳ ANCHOR: apply_calibrated_kpis_upload
-            II  = ii_calibrated_from_fa(fa_comb)
-            ISap = isap_calibrated_from_fa(fa_comb)
-            PF_c = pf_index_to_celsius(melt_index(fa_comb))
+                    issue = check_adjust(total_C_u, "C")
+                    if issue:
+                        st.warning(issue.message)
+
+            # Combina (real + ajuste fino) e calcula KPIs calibrados / notas
+            fa_comb = combine_profile(fa_norm, B_vals_u if method_upl.startswith("Classe B") else None,
+                                      C_vals_u if method_upl.endswith("Ingredientes") else None)
+            prof_u = evaluate_profile(fa_comb)
+            II, ISap, PF_c = prof_u["kpis"]
             c1, c2, c3 = st.columns(3)
             c1.metric("Índice de Iodo (II)", f"{II:.1f}")
             c2.metric("Índice de Saponificação (ISap)", f"{ISap:.1f} mgKOH/g")
             c3.metric("Ponto de Fusão (°C)", f"{PF_c:.1f}")
             st.caption("KPIs calculados sobre o perfil **combinado** (real + ajuste fino, se houver).")
 
+            profiler.stage("upload: gráficos")
             # Gráficos + Radar
             g1, g2 = st.columns(2)
             with g1:
                 _plot_fa_bars(fa_comb)
             with g2:
-                if fa_comb:  # se já existe perfil carregado
-                    _, radar_vals = _scores_finais(fa_comb, melt_index(fa_comb), II)
-                    _plot_radar(radar_vals)
+                if prof_u["radar"] is not None:  # se já existe perfil carregado
+                    _plot_radar(prof_u["radar"])
                 else:
                     _plot_radar(None)  # mostra radar vazio até ter dados
 
+            profiler.stage("upload: trade-offs")
             # Trade-offs (upload)
             st.markdown("---")
-            st.subheader("Análise de Trade-offs (variação de +5% por ingrediente sobre o perfil real)")
+            step_u = st.select_slider("Passo da variação (pontos %)", options=TRADEOFF_STEPS, value=5.0, key="tradeoff_step_upload")
+            st.subheader(f"Análise de Trade-offs (variação de {step_u:+g}% por ingrediente sobre o perfil real)")
             trade_u = _compute_tradeoffs_upload(fa_start=fa_comb, method_upl=method_upl,
                                                 B_vals_u=B_vals_u if method_upl.startswith("Classe B") else {fa:0.0 for fa in FA_ORDER},
                                                 C_vals_u=C_vals_u if method_upl.endswith("Ingredientes") else {k:0.0 for k,_ in INGREDIENTS},
-                                                consider_var=False, scenario="mean")
+                                                consider_var=False, scenario="mean", step=step_u)
             if trade_u:
                 labels_u, dII_u, dIS_u, dPFc_u = trade_u
                 ctu1, ctu2, ctu3 = st.columns(3)
@@ -1291,8 +1315,8 @@ def render_blend_enzimatico():
 
             # Preview de notas por finalidade (0–100) — só exibe após carregar perfil e/ou ajustar
             st.subheader("Preview de notas por finalidade (0–100)")
-            if fa_norm and sum(fa_comb.values()) > 0:
-                scores, _ = _scores_finais(fa_comb, melt_index(fa_comb), II)
+            if fa_norm and prof_u["scores"] is not None:
+                scores = prof_u["scores"]
                 p1, p2, p3, p4 = st.columns(4)
                 p1.metric("Mãos", f"{scores['Mãos']}")
                 p2.metric("Corpo", f"{scores['Corpo']}")
@@ -1306,7 +1330,7 @@ def render_blend_enzimatico():
             st.info("Pronto para detalhar por finalidade e assinatura sensorial no **Assistente de Formulação**.")
             assist_payload = {
                 "fa_profile": fa_comb,
-                "kpis": {"II": II, "ISap": ISap, "PF_proxy": melt_index(fa_comb)},
+                "kpis": {"II": II, "ISap": ISap, "PF_proxy": prof_u["PF_idx"]},
                 "PF_celsius": PF_c,
                 "scores_preview": scores,
                 "source": "upload_real+" + ("ajusteB" if method_upl.startswith("Classe B") else "ajusteC"),
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+# blend_jobs.py
+# Executor de tarefas longas do processo (sem Streamlit): Pareto, Monte Carlo e afins rodam
+# num pool de threads compartilhado por todas as sessões, fora da thread do script. Cada
+# tarefa é identificada pelo hash das entradas — pedir de novo a mesma conta (outro clique,
+# outro rerun, outra sessão) devolve a tarefa já existente, em andamento ou concluída.
+# A tarefa informa o progresso por um callback(feitos, total); o cancelamento é cooperativo:
+# o próximo progresso levanta JobCancelled dentro dela. Resultados concluídos ficam num LRU
+# (MAX_FINISHED) até a sessão buscá-los pela chave guardada em st.session_state.
+# As contas são NumPy (liberam o GIL nos trechos pesados), por isso threads bastam.
+#
+# Tamanho do pool: LIPIDPALMA_JOB_WORKERS (padrão 2).
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+MAX_WORKERS = max(1, int(os.environ.get("LIPIDPALMA_JOB_WORKERS", "2") or 2))
+MAX_FINISHED = 16          # tarefas encerradas guardadas (resultados de Monte Carlo têm ~10 MB)
+
+PENDING, RUNNING, DONE, FAILED, CANCELLED = "pendente", "rodando", "concluido", "erro", "cancelado"
+
+
+class JobCancelled(Exception):
+    """Levantada dentro da tarefa, no próximo progresso, quando o cancelamento foi pedido."""
+
+
+def _canonical(obj):
+    if isinstance(obj, np.ndarray):
+        data = np.ascontiguousarray(obj)
+        return {"ndarray": data.dtype.str, "shape": list(data.shape),
+                "sha256": hashlib.sha256(data.tobytes()).hexdigest()}
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    raise TypeError(f"parâmetro não serializável para a chave da tarefa: {type(obj).__name__}")
+
+def job_key(kind: str, params: dict) -> str:
+    """Hash estável de (tipo, parâmetros): dicts em qualquer ordem, arrays pelo conteúdo."""
+    blob = json.dumps([kind, params], sort_keys=True, default=_canonical, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:20]
+
+
+class Job:
+    """Uma tarefa: estado, progresso (done/total), resultado ou erro. Lida pela UI sem trava."""
+    __slots__ = ("key", "kind", "label", "status", "done", "total", "result", "error",
+                 "submitted", "started", "finished", "_cancel", "_future")
+
+    def __init__(self, key: str, kind: str, label: str = None):
+        self.key = key
+        self.kind = kind
+        self.label = label or kind
+        self.status = PENDING
+        self.done = 0
+        self.total = None
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = self.finished = None
+        self._cancel = threading.Event()
+        self._future = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in (PENDING, RUNNING)
+
+    @property
+    def fraction(self):
+        """Fração concluída (0–1) ou None se a tarefa não informa total."""
+        if self.status == DONE:
+            return 1.0
+        return min(self.done / self.total, 1.0) if self.total else None
+
+    @property
+    def elapsed_s(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def report(self, done: int, total: int = None):
+        """Callback de progresso passado à tarefa; levanta JobCancelled se o cancelamento foi pedido."""
+        if self._cancel.is_set():
+            raise JobCancelled()
+        self.done = done
+        if total is not None:
+            self.total = total
+
+    def cancel(self):
+        """Pede o cancelamento: antes de começar, a tarefa nem roda; rodando, para no próximo progresso."""
+        self._cancel.set()
+        if self._future is not None and self._future.cancel():
+            self._finish(CANCELLED)
+
+    def _finish(self, status: str):
+        self.finished = time.time()
+        self.status = status
+
+
+class JobRunner:
+    """Pool de threads + registro de tarefas por chave (deduplicação e LRU dos resultados)."""
+
+    def __init__(self, max_workers: int = MAX_WORKERS, keep: int = MAX_FINISHED):
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="blend-job")
+        self._keep = keep
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn, params: dict, label: str = None, with_progress: bool = True) -> Job:
+        """
+        Agenda fn(**params[, progress=job.report]) e devolve a Job. Se já houver uma tarefa com as
+        mesmas entradas (pendente, rodando ou concluída), devolve essa; com erro ou cancelada, refaz.
+        """
+        key = job_key(kind, params)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.status not in (FAILED, CANCELLED) and not job.cancel_requested:
+                self._jobs.move_to_end(key)
+                return job
+            job = self._jobs[key] = Job(key, kind, label)
+            self._jobs.move_to_end(key)
+            job._future = self._pool.submit(self._run, job, fn, params, with_progress)
+            self._evict()
+        return job
+
+    def _run(self, job: Job, fn, params: dict, with_progress: bool):
+        if job.cancel_requested:
+            job._finish(CANCELLED)
+            return
+        job.started = time.time()
+        job.status = RUNNING
+        try:
+            job.result = fn(**params, progress=job.report) if with_progress else fn(**params)
+        except JobCancelled:
+            job._finish(CANCELLED)
+        except Exception as e:
+            job.error = str(e) or type(e).__name__
+            job._finish(FAILED)
+        else:
+            job._finish(DONE)
+
+    def _evict(self):
+        finished = [k for k, j in self._jobs.items() if not j.active]
+        for k in finished[:max(len(finished) - self._keep, 0)]:
+            del self._jobs[k]
+
+    def get(self, key: str) -> Job:
+        with self._lock:
+            return self._jobs.get(key)
+
+    def cancel(self, key: str) -> bool:
+        job = self.get(key)
+        if job is None or not job.active:
+            return False
+        job.cancel()
+        return True
+
+    def jobs(self) -> list:
+        """Tarefas registradas, da mais antiga para a mais recente."""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def shutdown(self, cancel: bool = True):
+        if cancel:
+            for job in self.jobs():
+                job.cancel()
+        self._pool.shutdown(wait=True)
+
+
+_RUNNER = None
+_RUNNER_LOCK = threading.Lock()
+
+def get_runner() -> JobRunner:
+    """Executor compartilhado entre sessões (um por processo)."""
+    global _RUNNER
+    with _RUNNER_LOCK:
+        if _RUNNER is None:
+            _RUNNER = JobRunner()
+    return _RUNNER
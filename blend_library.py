@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+# blend_library.py
+# Biblioteca local de blends em formato colunar (sem Streamlit). Cada append grava um segmento
+# imutável com colunas .npy (abertas com mmap), um por atributo:
+#   A/C (n, I) e B (n, F) em %, fa (n, F) normalizado, values (n, V) com II, ISap, PF °C e
+#   notas por finalidade, nome/origem/criado (metadados).
+# Índice: por segmento, cada coluna de VALUE_KEYS guarda a permutação ordenada e os valores já
+# ordenados; uma consulta por faixas faz searchsorted em cada coluna, parte da mais seletiva
+# e filtra as demais só nos candidatos — milissegundos para milhões de registros.
+# Os ids são a posição global (segmentos em ordem de criação) e sobrevivem a compact().
+# O segmento fundido lista no meta.json os que substitui ("supersedes"); reload() ignora esses,
+# então uma queda entre publicar a fusão e apagar os antigos não duplica registros.
+# Vizinhos mais próximos (nearest): força bruta em blocos sobre as colunas float32 fa/values,
+# com ‖fa‖² pré-calculado por segmento; distância em "tolerâncias" (NN_SCALES) e top-k por
+# argpartition em cada bloco.
+#
+# Uso (CLI):
+#   python blend_library.py importar blend1.json blend2.json ...   (JSON "Salvar Blend")
+#   python blend_library.py consulta II=40:50 PF_C=30:36 Rosto=60:
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from blend_engine import CATALOG, SCORE_KEYS, heur_blend_layers, score_ingredient_blends
+
+LIBRARY_SCHEMA = 1
+LIBRARY_PATH = os.environ.get(
+    "LIPIDPALMA_LIBRARY", os.path.join(os.path.dirname(os.path.abspath(__file__)), "biblioteca_blends"))
+VALUE_KEYS = ("II", "ISap", "PF_C") + tuple(SCORE_KEYS)
+MAX_SEGMENTS = 32          # acima disso, append() compacta tudo num segmento
+_NAME_WIDTH = 80
+NN_BLOCK = 1 << 17         # linhas por bloco na busca de vizinhos (≈ 3,5 MB de FA float32)
+# uma unidade de distância = uma tolerância típica: 5 pp por ácido graxo; II/ISap 5; PF 2 °C
+NN_SCALES = {"fa": 5.0, "II": 5.0, "ISap": 5.0, "PF_C": 2.0}
+
+_ARRAYS = ("A", "B", "C", "fa", "values", "order", "sorted", "fa_sq", "nome", "origem", "criado")
+_DERIVED = ("order", "sorted", "fa_sq")   # índices recalculados a cada gravação de segmento
+
+
+class _Segment:
+    """Um diretório seg-XXXXXXXX com as colunas em mmap (somente leitura)."""
+    __slots__ = ("path", "n", "scenario", "supersedes", "cols")
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("schema") != LIBRARY_SCHEMA or tuple(meta.get("fa_order", ())) != CATALOG.fa_order \
+                or tuple(meta.get("ing_keys", ())) != CATALOG.ing_keys:
+            raise ValueError(f"Segmento incompatível com o catálogo atual: {path}")
+        self.path = path
+        self.n = int(meta["n"])
+        self.scenario = meta.get("scenario", "mean")
+        self.supersedes = frozenset(meta.get("supersedes", ()))
+        self.cols = {k: np.load(os.path.join(path, f"{k}.npy"), mmap_mode="r") for k in _ARRAYS}
+
+    def range_ids(self, j: int, lo, hi) -> np.ndarray:
+        """Posições locais com lo ≤ values[:, j] ≤ hi (NaN nunca entra), via colunas ordenadas."""
+        s = self.cols["sorted"][j]
+        a = 0 if lo is None else int(np.searchsorted(s, lo, side="left"))
+        b = int(np.searchsorted(s, np.inf, side="right")) if hi is None else int(np.searchsorted(s, hi, side="right"))
+        return self.cols["order"][j, a:max(a, b)]
+
+
+def _write_segment(root: str, seq: int, cols: dict, scenario: str, supersedes=()) -> str:
+    """Grava o segmento num diretório temporário e publica com rename (atômico). `supersedes`: nomes
+    dos segmentos que ele substitui (compactação)."""
+    n = len(cols["values"])
+    values = cols["values"]
+    order = np.argsort(values, axis=0, kind="stable").T.astype(np.int32 if n < 2**31 else np.int64)
+    fa = cols["fa"] * np.float32(1.0 / NN_SCALES["fa"])
+    cols = dict(cols, order=np.ascontiguousarray(order),
+                sorted=np.ascontiguousarray(np.take_along_axis(values, order.T, axis=0).T),
+                fa_sq=np.einsum("ij,ij->i", fa, fa))   # ‖fa/escala‖² para a busca de vizinhos
+    final = os.path.join(root, f"seg-{seq:08d}")
+    tmp = final + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for k in _ARRAYS:
+        np.save(os.path.join(tmp, f"{k}.npy"), cols[k])
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"schema": LIBRARY_SCHEMA, "n": n, "scenario": scenario,
+                   "fa_order": list(CATALOG.fa_order), "ing_keys": list(CATALOG.ing_keys),
+                   "supersedes": sorted(supersedes)}, f)
+    os.replace(tmp, final)
+    return final
+
+
+class BlendLibrary:
+    """
+    Biblioteca colunar em `path` (padrão: LIPIDPALMA_LIBRARY ou ./biblioteca_blends).
+    Leituras usam mmap; escritas (append/compact) são serializadas por um lock do processo.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or LIBRARY_PATH
+        self._lock = threading.Lock()
+        self._segments = []
+        self._leftovers = []
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self.reload()
+
+    # ---------- estrutura ----------
+    def reload(self):
+        """Relê a lista de segmentos (barato: segmentos já abertos são reaproveitados)."""
+        known = {s.path: s for s in self._segments}
+        segs = []
+        if os.path.isdir(self.path):
+            for name in sorted(os.listdir(self.path)):
+                if name.startswith("seg-") and not name.endswith(".tmp"):
+                    path = os.path.join(self.path, name)
+                    segs.append(known.get(path) or _Segment(path))
+        # sobras de uma compactação interrompida: já estão dentro do segmento fundido
+        superseded = set().union(*(s.supersedes for s in segs))
+        self._leftovers = [s.path for s in segs if os.path.basename(s.path) in superseded]
+        segs = [s for s in segs if os.path.basename(s.path) not in superseded]
+        self._segments = segs
+        self._offsets = np.concatenate([[0], np.cumsum([s.n for s in segs])]).astype(np.int64)
+
+    def __len__(self) -> int:
+        return int(self._offsets[-1])
+
+    @property
+    def n_segments(self) -> int:
+        return len(self._segments)
+
+    def _next_seq(self) -> int:
+        return int(os.path.basename(self._segments[-1].path)[4:]) + 1 if self._segments else 1
+
+    def _locate(self, ids: np.ndarray):
+        """ids globais → (segmento, posições locais) agrupados, preservando a ordem de `ids`."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if ids.size and (ids.min() < 0 or ids.max() >= len(self)):
+            raise IndexError("id fora da biblioteca")
+        seg = np.searchsorted(self._offsets, ids, side="right") - 1
+        for si in np.unique(seg):
+            pos = np.flatnonzero(seg == si)
+            yield self._segments[si], pos, ids[pos] - self._offsets[si]
+
+    # ---------- escrita ----------
+    def append(self, A, B=None, C=None, nomes=None, origem: str = "", scenario: str = "mean") -> np.ndarray:
+        """
+        Acrescenta N blends (A/C: (N, I) %, B: (N, F) %), pontuados com a regra do modo heurístico.
+        Retorna os ids atribuídos.
+        """
+        A = np.atleast_2d(np.asarray(A, dtype=float))
+        n = len(A) if A.size else 0
+        if n == 0:
+            return np.zeros(0, dtype=np.int64)     # nada a gravar: sem segmento vazio
+        B = np.zeros((n, len(CATALOG.fa_order))) if B is None else np.atleast_2d(np.asarray(B, dtype=float))
+        C = np.zeros((n, CATALOG.n_ingredients)) if C is None else np.atleast_2d(np.asarray(C, dtype=float))
+        res = score_ingredient_blends(A, B, C, scenario=scenario)
+        values = np.column_stack([res["II"], res["ISap"], res["PF_C"], res["scores"]]).astype(np.float32)
+        nomes = [f"Blend {i + 1}" for i in range(len(self), len(self) + n)] if nomes is None else list(nomes)
+        cols = {
+            "A": A.astype(np.float32), "B": B.astype(np.float32), "C": C.astype(np.float32),
+            "fa": res["fa"].astype(np.float32), "values": values,
+            # texto de largura fixa do próprio segmento (a maior string, até _NAME_WIDTH)
+            "nome": np.array([str(s)[:_NAME_WIDTH] for s in nomes], dtype=str),
+            "origem": np.full(n, str(origem)[:_NAME_WIDTH]),
+            "criado": np.full(n, time.time()),
+        }
+        with self._lock:
+            self.reload()
+            start = len(self)
+            os.makedirs(self.path, exist_ok=True)
+            _write_segment(self.path, self._next_seq(), cols, scenario)
+            self.reload()
+            if self.n_segments > MAX_SEGMENTS:
+                self._compact_locked()
+        return np.arange(start, start + n, dtype=np.int64)
+
+    def compact(self):
+        """Funde todos os segmentos num só (mesma ordem → mesmos ids) e apaga sobras de fusões interrompidas."""
+        with self._lock:
+            self.reload()
+            self._compact_locked()
+
+    def _compact_locked(self):
+        for p in self._leftovers:
+            shutil.rmtree(p, ignore_errors=True)
+        self._leftovers = []
+        if self.n_segments <= 1:
+            return
+        old = [s.path for s in self._segments]
+        scen = {s.scenario for s in self._segments}
+        cols = {k: np.concatenate([s.cols[k] for s in self._segments])
+                for k in _ARRAYS if k not in _DERIVED}
+        # o fundido declara os antigos como substituídos: publicado ele, os antigos já não contam
+        _write_segment(self.path, self._next_seq(), cols, scen.pop() if len(scen) == 1 else "misto",
+                       supersedes=[os.path.basename(p) for p in old])
+        self._segments = []
+        for p in old:
+            shutil.rmtree(p, ignore_errors=True)
+        self.reload()
+
+    # ---------- consulta ----------
+    def query(self, ranges: dict, limit: int = None, sort_by: str = None, descending: bool = True) -> np.ndarray:
+        """
+        ids dos blends com lo ≤ valor ≤ hi para cada {chave: (lo, hi)} de VALUE_KEYS (None = aberto).
+        Ex.: {"II": (40, 50), "PF_C": (30, 36), "Rosto": (60, None)}.
+        sort_by ordena o resultado por uma chave de VALUE_KEYS; limit corta depois de ordenar.
+        """
+        conds = []
+        for k, (lo, hi) in (ranges or {}).items():
+            if k not in VALUE_KEYS:
+                raise ValueError(f"Chave de consulta inválida: {k}")
+            conds.append((VALUE_KEYS.index(k), lo, hi))
+        hits = []
+        for seg, off in zip(self._segments, self._offsets[:-1]):
+            if not conds:
+                hits.append(np.arange(seg.n, dtype=np.int64) + off)
+                continue
+            cands = [seg.range_ids(j, lo, hi) for j, lo, hi in conds]
+            best = int(np.argmin([len(c) for c in cands]))
+            local = np.sort(cands[best]).astype(np.int64)
+            vals = seg.cols["values"]
+            for i, (j, lo, hi) in enumerate(conds):
+                if i == best or not len(local):
+                    continue
+                v = vals[local, j]
+                ok = ~np.isnan(v)
+                if lo is not None:
+                    ok &= v >= lo
+                if hi is not None:
+                    ok &= v <= hi
+                local = local[ok]
+            hits.append(local + off)
+        ids = np.concatenate(hits) if hits else np.zeros(0, dtype=np.int64)
+        if sort_by is not None and len(ids):
+            v = self.values(ids)[:, VALUE_KEYS.index(sort_by)]
+            ids = ids[np.argsort(-v if descending else v, kind="stable")]
+        return ids if limit is None else ids[:limit]
+
+    def nearest(self, fa=None, kpis: dict = None, k: int = 10) -> tuple:
+        """
+        Os k blends mais próximos de um perfil FA (F,) em % e/ou de KPIs {"II", "ISap", "PF_C"}.
+        Distância euclidiana em unidades de NN_SCALES; com os dois, as partes se somam.
+        Retorna (ids, distâncias), do mais próximo ao mais distante.
+        """
+        if fa is None and not kpis:
+            raise ValueError("Informe o perfil FA e/ou os KPIs de referência.")
+        q_fa = None if fa is None else (np.asarray(fa, dtype=np.float32).ravel() / NN_SCALES["fa"])
+        kcols = [(VALUE_KEYS.index(key), np.float32(v / NN_SCALES[key]), np.float32(1.0 / NN_SCALES[key]))
+                 for key, v in (kpis or {}).items() if v is not None]
+        best_d = np.empty(0, dtype=np.float32)
+        best_i = np.empty(0, dtype=np.int64)
+        for seg, off in zip(self._segments, self._offsets[:-1]):
+            for s in range(0, seg.n, NN_BLOCK):
+                e = min(seg.n, s + NN_BLOCK)
+                d = np.zeros(e - s, dtype=np.float32)
+                if q_fa is not None:
+                    # ‖x − q‖² = ‖x‖² − 2·x·q + ‖q‖² (‖x‖² pré-calculado; x·q é um gemv)
+                    d += seg.cols["fa_sq"][s:e] - seg.cols["fa"][s:e] @ (q_fa * np.float32(2.0 / NN_SCALES["fa"])) \
+                        + q_fa @ q_fa
+                    np.maximum(d, 0.0, out=d)
+                if kcols:
+                    vals = seg.cols["values"][s:e]
+                    for j, q, inv in kcols:
+                        d += np.square(vals[:, j] * inv - q)
+                d[np.isnan(d)] = np.inf
+                if len(d) > k:
+                    part = np.argpartition(d, k)[:k]
+                else:
+                    part = np.arange(len(d))
+                best_d = np.concatenate([best_d, d[part]])
+                best_i = np.concatenate([best_i, part + off + s])
+                if len(best_d) > k:
+                    keep = np.argpartition(best_d, k)[:k]
+                    best_d, best_i = best_d[keep], best_i[keep]
+        order = np.lexsort((best_i, best_d))
+        best_d, best_i = best_d[order], best_i[order]
+        ok = np.isfinite(best_d)
+        return best_i[ok], np.sqrt(best_d[ok])
+
+    def column(self, name: str, ids) -> np.ndarray:
+        """Coluna `name` (A, B, C, fa, values, nome, origem, criado) para os ids, na ordem pedida."""
+        ids = np.asarray(ids, dtype=np.int64)
+        shape = self._segments[0].cols[name].shape[1:] if self._segments else ()
+        dtype = np.result_type(*(s.cols[name].dtype for s in self._segments)) if self._segments else np.float32
+        out = np.empty((len(ids),) + shape, dtype=dtype)
+        for seg, pos, local in self._locate(ids):
+            out[pos] = seg.cols[name][local]
+        return out
+
+    def values(self, ids) -> np.ndarray:
+        return self.column("values", ids)
+
+    def frame(self, ids) -> pd.DataFrame:
+        """Tabela para exibição: id, nome, origem, KPIs e notas."""
+        ids = np.asarray(ids, dtype=np.int64)
+        df = pd.DataFrame(self.values(ids).astype(float), columns=list(VALUE_KEYS))
+        df.insert(0, "origem", self.column("origem", ids))
+        df.insert(0, "nome", self.column("nome", ids))
+        df.insert(0, "id", ids)
+        return df.rename(columns={"PF_C": "PF (°C)"})
+
+    def record(self, rid: int) -> dict:
+        """Um blend completo: {"id", "nome", "origem", "criado", "A"/"C" {ingrediente: %}, "B"/"fa" {FA: %}, valores}."""
+        ids = np.array([rid], dtype=np.int64)
+        out = {"id": int(rid), "nome": str(self.column("nome", ids)[0]),
+               "origem": str(self.column("origem", ids)[0]), "criado": float(self.column("criado", ids)[0])}
+        for k, keys in (("A", CATALOG.ing_keys), ("B", CATALOG.fa_order), ("C", CATALOG.ing_keys),
+                        ("fa", CATALOG.fa_order)):
+            out[k] = {key: float(v) for key, v in zip(keys, self.column(k, ids)[0])}
+        out.update({k: float(v) for k, v in zip(VALUE_KEYS, self.values(ids)[0])})
+        return out
+
+
+_LIBRARIES = {}
+_LIBRARIES_LOCK = threading.Lock()
+
+def get_library(path: str = None) -> BlendLibrary:
+    """Instância compartilhada (por diretório) entre sessões; relê os segmentos a cada chamada."""
+    path = os.path.abspath(path or LIBRARY_PATH)
+    with _LIBRARIES_LOCK:
+        lib = _LIBRARIES.get(path)
+        if lib is None:
+            lib = _LIBRARIES[path] = BlendLibrary(path)
+    lib.reload()
+    return lib
+
+
+# ----------------- Importação de JSON ("Salvar Blend") -----------------
+def blend_json_arrays(blend: dict) -> tuple:
+    """JSON do modo heurístico → vetores (A (I,), B (F,), C (I,)) na ordem do catálogo."""
+    if blend.get("modo") != "heuristico":
+        raise ValueError("JSON não parece ser um blend heurístico.")
+    A, B, C = heur_blend_layers(blend)
+    return (np.array([A.get(k, 0.0) for k in CATALOG.ing_keys]), np.array([B.get(k, 0.0) for k in CATALOG.fa_order]),
+            np.array([C.get(k, 0.0) for k in CATALOG.ing_keys]))
+
+
+# ----------------- CLI -----------------
+def _parse_range(text: str) -> tuple:
+    key, _, rng = text.partition("=")
+    lo, _, hi = rng.partition(":")
+    return key, (float(lo) if lo else None, float(hi) if hi else None)
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Biblioteca colunar de blends (importar JSON / consultar por faixas).")
+    ap.add_argument("--biblioteca", default=None, help=f"diretório (padrão: {LIBRARY_PATH})")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    imp = sub.add_parser("importar", help="importa JSON salvos pela aba de blend")
+    imp.add_argument("arquivos", nargs="+")
+    q = sub.add_parser("consulta", help="consulta por faixas, ex.: II=40:50 PF_C=30:36 Rosto=60:")
+    q.add_argument("faixas", nargs="*")
+    q.add_argument("-n", "--limite", type=int, default=20)
+    sub.add_parser("compactar", help="funde os segmentos")
+    args = ap.parse_args(argv)
+
+    lib = BlendLibrary(args.biblioteca)
+    if args.cmd == "importar":
+        rows, names, falhas = [], [], 0
+        for path in args.arquivos:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    rows.append(blend_json_arrays(json.load(f)))
+            except Exception as e:
+                print(f"{path}: ignorado ({e})", file=sys.stderr)
+                falhas += 1
+                continue
+            names.append(os.path.splitext(os.path.basename(path))[0])
+        ids = lib.append(*(np.vstack(x) for x in zip(*rows)), nomes=names, origem="json") if rows else []
+        print(f"{len(ids)} blend(s) importado(s), {falhas} ignorado(s); biblioteca com {len(lib)}.",
+              file=sys.stderr)
+    elif args.cmd == "consulta":
+        t0 = time.perf_counter()
+        ids = lib.query(dict(_parse_range(t) for t in args.faixas))
+        ms = (time.perf_counter() - t0) * 1000
+        print(lib.frame(ids[:args.limite]).round(2).to_string(index=False))
+        print(f"{len(ids)} de {len(lib)} blends em {ms:.1f} ms.", file=sys.stderr)
+    else:
+        lib.compact()
+        print(f"{len(lib)} blends em {lib.n_segments} segmento(s).", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
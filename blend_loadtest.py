@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+# blend_loadtest.py
+# Teste de carga do serviço de blends (blend_service.py): C conexões keep-alive em paralelo
+# (asyncio, sem dependências além da biblioteca padrão + NumPy) disparam pedidos unitários
+# ou lotes de blends aleatórios durante D segundos e medem pedidos/s, blends/s e latência.
+"""
+Uso:
+    python blend_loadtest.py --iniciar                      (sobe uma instância local e mede)
+    python blend_loadtest.py --url http://127.0.0.1:8765 --modo lote --lote 500 -c 8 -d 10
+
+Os blends são JSON heur_blend aleatórios (2–4 ingredientes da Classe A, metade com ajuste
+fino B ou C) gerados com semente fixa; com --perfil-fa, perfis FA aleatórios. Ao final,
+imprime o resumo do cliente e as métricas do servidor (/metricas). Sai com código 1 se
+houver respostas com erro.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from blend_engine import CATALOG
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# ----------------- Blends sintéticos -----------------
+def random_blends(n: int, seed: int = 0, fa_profiles: bool = False) -> list:
+    """n blends aleatórios no formato heur_blend (ou {"fa_profile": ...})."""
+    rng = np.random.default_rng(seed)
+    out = []
+    for _ in range(n):
+        if fa_profiles:
+            w = rng.dirichlet(np.ones(len(CATALOG.fa_order))) * 100
+            out.append({"fa_profile": {k: round(float(v), 2) for k, v in zip(CATALOG.fa_order, w)}})
+            continue
+        k = int(rng.integers(2, 5))
+        keys = rng.choice(CATALOG.ing_keys, size=k, replace=False)
+        adjust = float(rng.choice([0.0, 0.0, 5.0, 10.0]))
+        A = {str(key): round(float(v), 2) for key, v in zip(keys, rng.dirichlet(np.ones(k)) * (100 - adjust))}
+        method = str(rng.choice(["B", "C"]))
+        B = {str(rng.choice(CATALOG.fa_order)): adjust} if method == "B" and adjust else {}
+        C = {str(rng.choice(CATALOG.ing_keys)): adjust} if method == "C" and adjust else {}
+        out.append({"modo": "heuristico", "classeA_pct": A, "classeB_pct": B, "classeC_pct": C,
+                    "ajuste_method": method, "variabilidade": {"ativada": False, "cenario": "mean"}})
+    return out
+
+
+# ----------------- Cliente HTTP mínimo -----------------
+class _Conn:
+    """Uma conexão keep-alive; request() devolve (status, corpo)."""
+
+    def __init__(self, host: str, port: int):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        return self
+
+    async def request(self, method: str, path: str, body: bytes = b""):
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                          "Content-Type: application/json\r\n"
+                          f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+        await self.writer.drain()
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ", 2)[1])
+        size = 0
+        for line in lines[1:]:
+            k, _, v = line.partition(":")
+            if k.strip().lower() == "content-length":
+                size = int(v)
+        return status, await self.reader.readexactly(size)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def _get_json(host: str, port: int, path: str) -> dict:
+    conn = await _Conn(host, port).open()
+    try:
+        status, body = await conn.request("GET", path)
+    finally:
+        conn.close()
+    if status != 200:
+        raise RuntimeError(f"GET {path} → HTTP {status}")
+    return json.loads(body)
+
+
+# ----------------- Carga -----------------
+async def run_load(host: str, port: int, mode: str = "unitario", batch: int = 100, concurrency: int = 16,
+                   duration: float = 10.0, pool: int = 2000, seed: int = 0, fa_profiles: bool = False) -> dict:
+    """Dispara pedidos por `duration` s em `concurrency` conexões. Retorna o resumo do cliente."""
+    blends = random_blends(pool, seed, fa_profiles)
+    if mode == "lote":
+        path = "/v1/lote"
+        bodies = [json.dumps({"blends": blends[i:i + batch]}).encode("utf-8")
+                  for i in range(0, max(len(blends) - batch, 0) + 1, max(batch // 2, 1))]
+        per_request = batch
+    else:
+        path = "/v1/blend"
+        bodies = [json.dumps(b).encode("utf-8") for b in blends]
+        per_request = 1
+
+    latencies, errors = [], [0]
+    deadline = time.perf_counter() + duration
+
+    async def worker(w: int):
+        conn = await _Conn(host, port).open()
+        i = w
+        try:
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                status, _ = await conn.request("POST", path, bodies[i % len(bodies)])
+                latencies.append((time.perf_counter() - t0) * 1000)
+                errors[0] += status != 200
+                i += concurrency
+        finally:
+            conn.close()
+
+    t_start = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    elapsed = time.perf_counter() - t_start
+    lat = np.asarray(latencies)
+    n = int(lat.size)
+    p50, p90, p99 = np.percentile(lat, (50, 90, 99)) if n else (0.0, 0.0, 0.0)
+    return {"modo": mode, "lote": per_request, "conexoes": concurrency, "duracao_s": round(elapsed, 2),
+            "pedidos": n, "erros": errors[0], "pedidos_por_s": round(n / elapsed, 1),
+            "blends_por_s": round(n * per_request / elapsed, 1),
+            "latencia_ms": {"p50": round(float(p50), 3), "p90": round(float(p90), 3),
+                            "p99": round(float(p99), 3), "max": round(float(lat.max()), 3) if n else 0.0}}
+
+async def _wait_ready(host: str, port: int, timeout: float = 20.0):
+    t_end = time.monotonic() + timeout
+    while True:
+        try:
+            return await _get_json(host, port, "/saude")
+        except (OSError, RuntimeError, asyncio.IncompleteReadError):
+            if time.monotonic() > t_end:
+                raise RuntimeError(f"serviço não respondeu em {host}:{port} após {timeout:.0f}s")
+            await asyncio.sleep(0.2)
+
+
+def _print_summary(res: dict, server: dict):
+    lat = res["latencia_ms"]
+    print(f"{res['pedidos']} pedidos em {res['duracao_s']} s ({res['conexoes']} conexões, "
+          f"{res['lote']} blend(s)/pedido): {res['pedidos_por_s']:.0f} pedidos/s, "
+          f"{res['blends_por_s']:.0f} blends/s, erros {res['erros']}")
+    print(f"latência (cliente) p50 {lat['p50']:.2f} ms | p90 {lat['p90']:.2f} ms | "
+          f"p99 {lat['p99']:.2f} ms | máx {lat['max']:.2f} ms")
+    for route, m in server.get("rotas", {}).items():
+        sl = m["latencia_ms"]
+        print(f"servidor {route}: {m['pedidos']} pedidos, {m['erros']} erros, "
+              f"p50 {sl['p50']:.2f} ms | p99 {sl['p99']:.2f} ms")
+    grp = server.get("agrupamento_unitario") or {}
+    if grp.get("grupos"):
+        print(f"agrupamento de pedidos unitários: média {grp['media']:.1f}, máx {grp['max']}")
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Teste de carga do serviço HTTP de blends (blend_service.py).")
+    ap.add_argument("--url", default="http://127.0.0.1:8765", help="endereço do serviço")
+    ap.add_argument("--iniciar", action="store_true",
+                    help="sobe uma instância local (porta livre) só para o teste e a encerra no fim")
+    ap.add_argument("--workers", type=int, default=2, help="threads do serviço iniciado com --iniciar")
+    ap.add_argument("--modo", choices=("unitario", "lote"), default="unitario",
+                    help="/v1/blend (um blend por pedido) ou /v1/lote")
+    ap.add_argument("--lote", type=int, default=100, help="blends por pedido no modo lote")
+    ap.add_argument("-c", "--conexoes", type=int, default=16, help="conexões simultâneas")
+    ap.add_argument("-d", "--duracao", type=float, default=10.0, help="duração em segundos")
+    ap.add_argument("--perfil-fa", action="store_true", help="envia perfis FA em vez de heur_blend")
+    ap.add_argument("--semente", type=int, default=0)
+    ap.add_argument("-o", "--saida", help="grava o resumo (cliente + /metricas) em JSON")
+    args = ap.parse_args(argv)
+
+    url = urlsplit(args.url)
+    host, port = url.hostname or "127.0.0.1", url.port or 80
+    proc = None
+    if args.iniciar:
+        import socket
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            host, port = "127.0.0.1", s.getsockname()[1]
+        proc = subprocess.Popen([sys.executable, os.path.join(_HERE, "blend_service.py"), "--host", host,
+                                 "--porta", str(port), "--workers", str(args.workers)])
+
+    async def session():
+        await _wait_ready(host, port)
+        res = await run_load(host, port, args.modo, args.lote, args.conexoes, args.duracao,
+                             seed=args.semente, fa_profiles=args.perfil_fa)
+        return res, await _get_json(host, port, "/metricas")
+
+    try:
+        res, server = asyncio.run(session())
+    except (OSError, RuntimeError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+    _print_summary(res, server)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump({"cliente": res, "servidor": server}, f, ensure_ascii=False, indent=2)
+    return 1 if res["erros"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+# blend_montecarlo.py
+# Variabilidade de lote por Monte Carlo (sem Streamlit): amostra perfis FA de cada ingrediente
+# dentro dos envelopes Min/Típico/Max de FA_PROFILES_RANGED, com correlação entre ácidos e
+# entre ingredientes, e avalia KPIs técnicos calibrados (II, ISap, PF °C) e notas por finalidade
+# de todas as amostras numa única passada vetorizada.
+
+import time
+
+import numpy as np
+
+from blend_engine import (
+    CATALOG, CompiledCatalog, SCORE_KEYS, normalize_rows, melt_index_v,
+    iodine_index_v, ii_calibrated_v, isap_calibrated_v, pf_index_to_celsius_v, scores_finais_v,
+)
+
+MC_KPI_KEYS = ("II", "ISap", "PF_C")
+DEFAULT_SAMPLES = 100_000
+DEFAULT_PERCENTILES = (5, 50, 95)
+SIGMA_SPAN = 3.0   # o envelope Min/Max corresponde a ±3σ da distribuição normal latente
+
+
+def _corr_factor(R: np.ndarray) -> np.ndarray:
+    """Fator L com L·Lᵀ = R (via autovalores; aceita R semidefinida, ex.: ρ = 1)."""
+    lam, V = np.linalg.eigh(R)
+    return V * np.sqrt(np.clip(lam, 0.0, None))
+
+def fa_correlation(rho_fa: float, catalog: CompiledCatalog = None) -> np.ndarray:
+    """
+    Correlação entre ácidos de um mesmo lote: um fator latente de saturação.
+    Saturados (IV = 0) andam juntos e em sentido oposto aos insaturados:
+      R = (1 − ρ)·I + ρ·s·sᵀ, s = +1 (saturado) / −1 (insaturado), ρ ∈ [0, 1].
+    """
+    cat = catalog or CATALOG
+    rho = float(np.clip(rho_fa, 0.0, 1.0))
+    s = np.where(cat.iv > 0, -1.0, 1.0)
+    return (1.0 - rho) * np.eye(len(s)) + rho * np.outer(s, s)
+
+def ingredient_correlation(rho_ing: float, n: int) -> np.ndarray:
+    """Correlação entre ingredientes (mesma safra/fornecedor): equicorrelação ρ ∈ [0, 1]."""
+    rho = float(np.clip(rho_ing, 0.0, 1.0))
+    return (1.0 - rho) * np.eye(n) + rho * np.ones((n, n))
+
+def sample_profiles(idx, n_samples: int, rho_fa: float = 0.5, rho_ing: float = 0.0,
+                    seed=None, catalog: CompiledCatalog = None, dtype=np.float32) -> np.ndarray:
+    """
+    Amostra perfis FA (n_samples, len(idx), F) dos ingredientes `idx`.
+    z ~ N(0, R_ing ⊗ R_fa); u = clip(z/SIGMA_SPAN, −1, 1) é mapeado no envelope assimétrico:
+      u ≥ 0 → mean + u·(max − mean);  u < 0 → mean + u·(mean − min).
+    """
+    cat = catalog or CATALOG
+    idx = np.asarray(idx, dtype=int)
+    lo, mid, hi = (cat.profiles[cat.scenario_index[s]][idx].astype(dtype) for s in ("min", "mean", "max"))
+    L_fa = _corr_factor(fa_correlation(rho_fa, cat)).astype(dtype)
+    L_ing = _corr_factor(ingredient_correlation(rho_ing, len(idx))).astype(dtype)
+
+    rng = np.random.default_rng(seed)
+    Z = rng.standard_normal((n_samples, len(idx), len(cat.fa_order)), dtype=dtype)
+    Z = L_ing @ Z @ L_fa.T
+    U = np.clip(Z * (1.0 / SIGMA_SPAN), -1.0, 1.0)
+    return mid + np.where(U >= 0, U * (hi - mid), U * (mid - lo))
+
+def simulate_lot_variability(A, B=None, C=None, n_samples: int = DEFAULT_SAMPLES,
+                             rho_fa: float = 0.5, rho_ing: float = 0.0, specs: dict = None,
+                             percentiles=DEFAULT_PERCENTILES, seed=0,
+                             catalog: CompiledCatalog = None) -> dict:
+    """
+    Monte Carlo de um blend (A/C: (I,) % por ingrediente; B: (F,) % de FA puro, sem variabilidade).
+      specs: {"II": (lo, hi), "ISap": (lo, hi), "PF_C": (lo, hi)}; lo/hi None = sem limite
+    Retorna dict com:
+      samples {"II", "ISap", "PF_C"} (n,), scores (n, 4) na ordem SCORE_KEYS,
+      percentiles {chave: {p: valor}} (KPIs e notas), out_of_spec {chave: prob, "any": prob},
+      specs (as usadas), n, elapsed_ms. Retorna None se o blend estiver vazio.
+    """
+    cat = catalog or CATALOG
+    t0 = time.perf_counter()
+    w = np.zeros(cat.n_ingredients)
+    for part in (A, C):
+        if part is not None:
+            w += np.clip(np.asarray(part, dtype=float).ravel(), 0.0, None)
+    b = np.zeros(len(cat.fa_order)) if B is None else np.clip(np.asarray(B, dtype=float).ravel(), 0.0, None)
+    if w.sum() + b.sum() <= 0:
+        return None
+
+    # só os ingredientes presentes entram na amostragem (e na correlação entre ingredientes)
+    idx = np.flatnonzero(w > 0)
+    if len(idx):
+        P = sample_profiles(idx, n_samples, rho_fa, rho_ing, seed, cat)
+        raw = np.einsum("nif,i->nf", P, w[idx].astype(P.dtype)).astype(float)
+    else:
+        raw = np.zeros((n_samples, len(cat.fa_order)))
+    FA = normalize_rows(raw + b * 100.0)
+
+    PF_idx = melt_index_v(FA, cat)
+    samples = {"II": ii_calibrated_v(FA), "ISap": isap_calibrated_v(FA), "PF_C": pf_index_to_celsius_v(PF_idx)}
+    scores, _ = scores_finais_v(FA, PF_idx, iodine_index_v(FA, cat), cat)
+
+    pcts = tuple(percentiles)
+    kpi_q = np.percentile(np.column_stack([samples[k] for k in MC_KPI_KEYS]), pcts, axis=0)
+    score_q = np.percentile(scores, pcts, axis=0)
+    table = {k: dict(zip(pcts, kpi_q[:, j].tolist())) for j, k in enumerate(MC_KPI_KEYS)}
+    table.update({k: dict(zip(pcts, score_q[:, j].tolist())) for j, k in enumerate(SCORE_KEYS)})
+
+    out = {}
+    any_out = np.zeros(n_samples, dtype=bool)
+    for k in MC_KPI_KEYS:
+        s_lo, s_hi = (specs or {}).get(k, (None, None))
+        bad = np.zeros(n_samples, dtype=bool)
+        if s_lo is not None:
+            bad |= samples[k] < s_lo
+        if s_hi is not None:
+            bad |= samples[k] > s_hi
+        out[k] = float(bad.mean())
+        any_out |= bad
+    out["any"] = float(any_out.mean())
+
+    return {
+        "samples": samples, "scores": scores, "percentiles": table, "out_of_spec": out,
+        "specs": {k: tuple((specs or {}).get(k, (None, None))) for k in MC_KPI_KEYS}, "n": int(n_samples), "elapsed_ms": (time.perf_counter() - t0) * 1000,
+    }
+
+
+def mc_summary_rows(res: dict) -> list:
+    """Linhas (dict) para tabela: KPI/nota, percentis, média e P(fora da especificação)."""
+    rows = []
+    for k, q in res["percentiles"].items():
+        vals = res["samples"][k] if k in res["samples"] else res["scores"][:, SCORE_KEYS.index(k)]
+        row = {"Indicador": k, "Média": float(np.mean(vals))}
+        row.update({f"p{p:g}": v for p, v in q.items()})
+        if k in res["out_of_spec"]:
+            row["P(fora da spec)"] = res["out_of_spec"][k]
+        rows.append(row)
+    return rows
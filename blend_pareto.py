@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+# blend_pareto.py
+# Explorador da fronteira de Pareto (sem Streamlit): percorre o simplex da Classe A
+# (reticulado por stars-and-bars ou amostragem de Dirichlet), avalia KPIs e notas por
+# finalidade em blocos vetorizados e mantém só o conjunto não dominado, em fluxo.
+
+import itertools
+import math
+import time
+
+import numpy as np
+
+from blend_engine import CATALOG, SCORE_KEYS, score_ingredient_blends
+
+# objetivos disponíveis → direção padrão ("max" | "min")
+OBJECTIVES = {
+    "II": "min", "ISap": "max", "PF_C": "min",
+    "Mãos": "max", "Corpo": "max", "Rosto": "max", "Cabelos": "max",
+}
+DEFAULT_CHUNK = 100_000
+DEFAULT_MAX_LATTICE = 2_000_000   # acima disso, "auto" troca o reticulado por amostragem
+_DOM_BLOCK = 1024                 # tamanho dos blocos nas comparações de dominância
+
+
+# ----------------- Geração de pontos no simplex -----------------
+def lattice_size(n_ing: int, step: float) -> int:
+    """Número de pontos do reticulado com passo `step` (%) em n_ing componentes: C(K+n−1, n−1)."""
+    K = int(round(100.0 / step))
+    return math.comb(K + n_ing - 1, n_ing - 1)
+
+def iter_lattice(n_ing: int, step: float, chunk: int = DEFAULT_CHUNK):
+    """
+    Reticulado completo do simplex em blocos (m, n_ing) somando 100.
+    Stars-and-bars: cada combinação de n−1 "barras" em K+n−1 posições define uma composição.
+    """
+    K = int(round(100.0 / step))
+    if n_ing == 1:
+        yield np.array([[100.0]])
+        return
+    combos = itertools.combinations(range(K + n_ing - 1), n_ing - 1)
+    while True:
+        flat = np.fromiter(itertools.chain.from_iterable(itertools.islice(combos, chunk)), dtype=np.int64)
+        if flat.size == 0:
+            return
+        bars = flat.reshape(-1, n_ing - 1)
+        edges = np.column_stack([np.full(len(bars), -1), bars, np.full(len(bars), K + n_ing - 1)])
+        yield (np.diff(edges, axis=1) - 1) * (100.0 / K)
+
+def iter_dirichlet(n_ing: int, n_samples: int, chunk: int = DEFAULT_CHUNK, seed=0):
+    """Amostras uniformes no simplex (Dirichlet(1, …, 1)) em blocos, somando 100."""
+    rng = np.random.default_rng(seed)
+    done = 0
+    while done < n_samples:
+        m = min(chunk, n_samples - done)
+        yield rng.dirichlet(np.ones(n_ing), size=m) * 100.0
+        done += m
+
+
+# ----------------- Filtro de não dominância -----------------
+def _dominated_by(P: np.ndarray, Q: np.ndarray) -> np.ndarray:
+    """Máscara (len(Q),): Q[j] é dominado por algum ponto de P (maximização em todas as colunas)."""
+    out = np.zeros(len(Q), dtype=bool)
+    if len(P) == 0 or len(Q) == 0:
+        return out
+    for qs in range(0, len(Q), _DOM_BLOCK):
+        q = Q[qs:qs + _DOM_BLOCK]
+        hit = np.zeros(len(q), dtype=bool)
+        for ps in range(0, len(P), _DOM_BLOCK):
+            p = P[ps:ps + _DOM_BLOCK]
+            # acumula coluna a coluna (evita reduzir um eixo curto de tamanho d)
+            ge = p[:, 0, None] >= q[None, :, 0]
+            gt = p[:, 0, None] > q[None, :, 0]
+            for j in range(1, P.shape[1]):
+                ge &= p[:, j, None] >= q[None, :, j]
+                gt |= p[:, j, None] > q[None, :, j]
+            hit |= (ge & gt).any(axis=0)
+        out[qs:qs + _DOM_BLOCK] = hit
+    return out
+
+def nondominated_mask(Y: np.ndarray) -> np.ndarray:
+    """
+    Máscara do conjunto não dominado de Y (m, d), maximizando todas as colunas.
+    Em ordem lexicográfica decrescente, um ponto só pode ser dominado por pontos anteriores:
+    basta comparar cada bloco com a fronteira acumulada e consigo mesmo.
+    """
+    m = len(Y)
+    keep = np.zeros(m, dtype=bool)
+    if m == 0:
+        return keep
+    order = np.lexsort(-Y.T[::-1])
+    front = np.empty((0, Y.shape[1]))
+    for s in range(0, m, _DOM_BLOCK):
+        idx = order[s:s + _DOM_BLOCK]
+        blk = Y[idx]
+        ok = ~_dominated_by(front, blk)
+        idx, blk = idx[ok], blk[ok]
+        ok = ~_dominated_by(blk, blk)
+        keep[idx[ok]] = True
+        front = np.vstack([front, blk[ok]])
+    return keep
+
+
+# ----------------- Explorador -----------------
+def _objective_matrix(res: dict, objectives) -> np.ndarray:
+    """Colunas de objetivos em forma de maximização (min → sinal trocado)."""
+    cols = []
+    for key, direction in objectives:
+        v = res["scores"][:, SCORE_KEYS.index(key)] if key in SCORE_KEYS else res[key]
+        cols.append(-v if direction == "min" else v)
+    return np.column_stack(cols)
+
+def pareto_explore(objectives, ingredients=None, step: float = 5.0, method: str = "auto",
+                   n_samples: int = 1_000_000, B=None, C=None, total_A: float = 100.0,
+                   constraints: dict = None,
+                   scenario: str = "mean", chunk: int = DEFAULT_CHUNK,
+                   max_lattice: int = DEFAULT_MAX_LATTICE, seed=0, progress=None) -> dict:
+    """
+    Fronteira de Pareto de blends de Classe A (+ ajuste fino fixo B/C, opcional).
+      objectives:  [(chave, "max"|"min")] com chaves de OBJECTIVES
+      ingredients: chaves da Classe A exploradas (padrão: todas)
+      method:      "lattice" (passo `step` %), "dirichlet" (n_samples) ou "auto"
+      B, C:        camada de ajuste (F,) / (I,) somada a todos os pontos
+      total_A:     % da Classe A no blend (ex.: 100 − ajuste, para o blend fechar em 100%)
+      constraints: {chave: (lo, hi)} filtro de viabilidade antes da dominância
+      progress:    callback(avaliados, total)
+    Retorna {"A" (k, I), "values" {chave: (k,)}, "evaluated", "feasible", "method", "elapsed_ms"}.
+    """
+    t0 = time.perf_counter()
+    objectives = [(k, d) for k, d in objectives]
+    if not objectives:
+        raise ValueError("Escolha ao menos um objetivo.")
+    for k, d in objectives:
+        if k not in OBJECTIVES or d not in ("max", "min"):
+            raise ValueError(f"Objetivo inválido: {k} ({d}).")
+    keys = list(ingredients or CATALOG.ing_keys)
+    idx = np.array([CATALOG.ing_index[k] for k in keys])
+    n_ing = len(keys)
+
+    if method == "auto":
+        method = "lattice" if lattice_size(n_ing, step) <= max_lattice else "dirichlet"
+    if method == "lattice":
+        total = lattice_size(n_ing, step)
+        points = iter_lattice(n_ing, step, chunk)
+    else:
+        total = int(n_samples)
+        points = iter_dirichlet(n_ing, total, chunk, seed)
+
+    value_keys = list(OBJECTIVES)
+    front_A = np.empty((0, CATALOG.n_ingredients))
+    front_vals = np.empty((0, len(value_keys)))
+    front_Y = np.empty((0, len(objectives)))
+    evaluated = feasible = 0
+    for pts in points:
+        m = len(pts)
+        A = np.zeros((m, CATALOG.n_ingredients))
+        A[:, idx] = pts * (total_A / 100.0)
+        res = score_ingredient_blends(
+            A,
+            B=None if B is None else np.broadcast_to(np.asarray(B, dtype=float), (m, len(CATALOG.fa_order))),
+            C=None if C is None else np.broadcast_to(np.asarray(C, dtype=float), (m, CATALOG.n_ingredients)),
+            scenario=scenario,
+        )
+        vals = np.column_stack([res[k] if k not in SCORE_KEYS else res["scores"][:, SCORE_KEYS.index(k)]
+                                for k in value_keys])
+        ok = np.ones(m, dtype=bool)
+        for k, (lo, hi) in (constraints or {}).items():
+            v = vals[:, value_keys.index(k)]
+            if lo is not None:
+                ok &= v >= lo
+            if hi is not None:
+                ok &= v <= hi
+        Y = _objective_matrix(res, objectives)[ok]
+        A, vals = A[ok], vals[ok]
+
+        # fusão com a fronteira acumulada: o que ela já domina sai antes do filtro do bloco
+        keep = ~_dominated_by(front_Y, Y)
+        Y, A, vals = Y[keep], A[keep], vals[keep]
+        keep = nondominated_mask(Y)
+        Y, A, vals = Y[keep], A[keep], vals[keep]
+        old_ok = ~_dominated_by(Y, front_Y)
+        front_Y = np.vstack([front_Y[old_ok], Y])
+        front_A = np.vstack([front_A[old_ok], A])
+        front_vals = np.vstack([front_vals[old_ok], vals])
+
+        evaluated += m
+        feasible += int(ok.sum())
+        if progress:
+            progress(evaluated, total)
+
+    return {
+        "A": front_A,
+        "values": {k: front_vals[:, j] for j, k in enumerate(value_keys)},
+        "objectives": objectives,
+        "evaluated": evaluated, "feasible": feasible, "method": method,
+        "elapsed_ms": (time.perf_counter() - t0) * 1000,
+    }
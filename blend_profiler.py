@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+# blend_profiler.py
+# Instrumentação por rerun (sem Streamlit): cada rerun vira um trace com etapas em sequência
+# (stage), spans aninhados (span / @profiled) e contadores (count), guardado num histórico
+# circular do processo para o painel de desenvolvedor (cascata, p50/p95) e exportável em JSONL.
+# Desligado (padrão), span()/stage()/count() só consultam uma flag global e devolvem um
+# contexto nulo compartilhado — custo desprezível nos caminhos quentes.
+#
+# Ativação: LIPIDPALMA_PROFILE=1 (ou enable(True) em tempo de execução);
+#           LIPIDPALMA_PROFILE_FILE=traces.jsonl grava cada trace ao final do rerun.
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+import numpy as np
+
+ENABLED = os.environ.get("LIPIDPALMA_PROFILE", "").strip().lower() in ("1", "true", "on", "sim")
+TRACE_FILE = os.environ.get("LIPIDPALMA_PROFILE_FILE") or None
+HISTORY_SIZE = 200
+
+_local = threading.local()
+_history = deque(maxlen=HISTORY_SIZE)
+_history_lock = threading.Lock()
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL = _NullSpan()
+
+
+class Trace:
+    """Um rerun: spans [(nome, início ms, duração ms, profundidade)] e contadores."""
+    __slots__ = ("label", "ts", "t0", "spans", "counters", "depth", "stage", "total_ms")
+
+    def __init__(self, label: str):
+        self.label = label
+        self.ts = time.time()
+        self.t0 = time.perf_counter()
+        self.spans = []
+        self.counters = {}
+        self.depth = 0
+        self.stage = None          # (nome, início) da etapa aberta
+        self.total_ms = None
+
+    def _now_ms(self) -> float:
+        return (time.perf_counter() - self.t0) * 1000
+
+    def close_stage(self):
+        if self.stage is not None:
+            name, start = self.stage
+            self.spans.append((name, start, self._now_ms() - start, 0))
+            self.stage = None
+
+    def to_dict(self) -> dict:
+        return {"label": self.label, "ts": self.ts, "total_ms": self.total_ms,
+                "spans": [{"nome": n, "inicio_ms": round(s, 3), "duracao_ms": round(d, 3), "nivel": lvl}
+                          for n, s, d, lvl in sorted(self.spans, key=lambda x: (x[1], x[3]))],
+                "contadores": dict(self.counters)}
+
+
+class _Span:
+    __slots__ = ("trace", "name", "start", "depth")
+
+    def __init__(self, trace: Trace, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        tr = self.trace
+        self.depth = tr.depth + (1 if tr.stage is not None else 0)
+        tr.depth += 1
+        self.start = tr._now_ms()
+        return self
+
+    def __exit__(self, *exc):
+        tr = self.trace
+        tr.depth -= 1
+        tr.spans.append((self.name, self.start, tr._now_ms() - self.start, self.depth))
+        return False
+
+
+# ----------------- API de instrumentação -----------------
+def enable(flag: bool = True):
+    global ENABLED
+    ENABLED = bool(flag)
+
+def current() -> Trace:
+    return getattr(_local, "trace", None) if ENABLED else None
+
+def span(name: str):
+    """Contexto cronometrado (aninhável) dentro do trace do rerun atual."""
+    if not ENABLED:
+        return _NULL
+    tr = getattr(_local, "trace", None)
+    return _NULL if tr is None else _Span(tr, name)
+
+def stage(name: str):
+    """Fecha a etapa anterior e abre `name` (etapas em sequência, sem indentar o código)."""
+    if not ENABLED:
+        return
+    tr = getattr(_local, "trace", None)
+    if tr is not None:
+        tr.close_stage()
+        tr.stage = (name, tr._now_ms())
+
+def count(name: str, n: int = 1):
+    if not ENABLED:
+        return
+    tr = getattr(_local, "trace", None)
+    if tr is not None:
+        tr.counters[name] = tr.counters.get(name, 0) + n
+
+def profiled(name: str = None):
+    """Decorador: a função inteira vira um span (nome padrão: nome da função)."""
+    def deco(fn):
+        label = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+@contextmanager
+def trace(label: str):
+    """Delimita um rerun. Ao sair, o trace entra no histórico (e no TRACE_FILE, se definido)."""
+    if not ENABLED:
+        yield None
+        return
+    tr = Trace(label)
+    prev = getattr(_local, "trace", None)
+    _local.trace = tr
+    try:
+        yield tr
+    finally:
+        tr.close_stage()
+        tr.total_ms = tr._now_ms()
+        _local.trace = prev
+        with _history_lock:
+            _history.append(tr)
+        if TRACE_FILE:
+            try:
+                export_jsonl(TRACE_FILE, [tr])
+            except OSError:
+                pass
+
+
+# ----------------- Leitura (painel / exportação) -----------------
+def history(label: str = None) -> list:
+    with _history_lock:
+        items = list(_history)
+    return [t for t in items if label is None or t.label == label]
+
+def clear_history():
+    with _history_lock:
+        _history.clear()
+
+def stage_stats(traces) -> list:
+    """Por etapa/span (soma por trace): [{"nome", "n", "p50_ms", "p95_ms", "max_ms"}], mais o total."""
+    per = {}
+    for t in traces:
+        sums = {}
+        for n, _, d, lvl in sorted(t.spans, key=lambda x: (x[1], x[3])):
+            key = n if lvl == 0 else f"  {n}"
+            sums[key] = sums.get(key, 0.0) + d
+        sums["TOTAL"] = t.total_ms or 0.0
+        for k, v in sums.items():
+            per.setdefault(k, []).append(v)
+    rows = []
+    for k, vals in per.items():
+        v = np.asarray(vals)
+        rows.append({"nome": k, "n": len(v), "p50_ms": float(np.percentile(v, 50)),
+                     "p95_ms": float(np.percentile(v, 95)), "max_ms": float(v.max())})
+    return rows
+
+def export_jsonl(path: str, traces=None) -> int:
+    """Anexa traces (padrão: todo o histórico) a `path`, um JSON por linha. Retorna quantos."""
+    traces = history() if traces is None else list(traces)
+    with open(path, "a", encoding="utf-8") as f:
+        for t in traces:
+            f.write(json.dumps(t.to_dict(), ensure_ascii=False) + "\n")
+    return len(traces)
+
+def to_jsonl(traces) -> str:
+    return "".join(json.dumps(t.to_dict(), ensure_ascii=False) + "\n" for t in traces)
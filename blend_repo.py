@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+# blend_repo.py
+# Repositório local de blends (sem Streamlit) num arquivo SQLite, no lugar dos JSON soltos.
+#   blends       — um registro por blend (nome, método de ajuste, cenário, JSON original)
+#   blend_layers — % por camada/chave (A/C: ingrediente, B: ácido graxo)
+#   blend_fa     — perfil FA normalizado
+#   blend_kpis   — II, ISap, PF °C e notas por finalidade (indexados para busca por faixa)
+# O formato de importação/exportação continua sendo o JSON "heur_blend" da aba de blend.
+# Conexões vêm de um pool pequeno (WAL + busy_timeout), seguro entre sessões do Streamlit.
+#
+# Uso (CLI):
+#   python blend_repo.py importar pasta/*.json
+#   python blend_repo.py listar [--busca texto] [--pagina 1]
+
+import argparse
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from blend_engine import CATALOG, FA_ORDER, heur_blend_layers, score_ingredient_blends
+
+REPO_PATH = os.environ.get(
+    "LIPIDPALMA_REPO", os.path.join(os.path.dirname(os.path.abspath(__file__)), "blends.sqlite3"))
+POOL_SIZE = 4
+PAGE_SIZE = 25
+# colunas de blend_kpis ↔ chaves exibidas
+KPI_COLUMNS = {"II": "II", "ISap": "ISap", "PF_C": "PF_C",
+               "maos": "Mãos", "corpo": "Corpo", "rosto": "Rosto", "cabelos": "Cabelos"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blends (
+    id            INTEGER PRIMARY KEY,
+    nome          TEXT NOT NULL,
+    modo          TEXT NOT NULL DEFAULT 'heuristico',
+    ajuste_method TEXT,
+    cenario       TEXT,
+    total_pct     REAL,
+    criado        REAL NOT NULL,
+    payload       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_blends_nome ON blends (nome COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS ix_blends_criado ON blends (criado);
+CREATE TABLE IF NOT EXISTS blend_layers (
+    blend_id INTEGER NOT NULL REFERENCES blends (id) ON DELETE CASCADE,
+    classe   TEXT NOT NULL CHECK (classe IN ('A', 'B', 'C')),
+    chave    TEXT NOT NULL,
+    pct      REAL NOT NULL,
+    PRIMARY KEY (blend_id, classe, chave)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_layers_chave ON blend_layers (classe, chave, pct);
+CREATE TABLE IF NOT EXISTS blend_fa (
+    blend_id INTEGER NOT NULL REFERENCES blends (id) ON DELETE CASCADE,
+    fa       TEXT NOT NULL,
+    pct      REAL NOT NULL,
+    PRIMARY KEY (blend_id, fa)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS blend_kpis (
+    blend_id INTEGER PRIMARY KEY REFERENCES blends (id) ON DELETE CASCADE,
+    II REAL, ISap REAL, PF_C REAL, maos REAL, corpo REAL, rosto REAL, cabelos REAL
+);
+CREATE INDEX IF NOT EXISTS ix_kpis_ii ON blend_kpis (II);
+CREATE INDEX IF NOT EXISTS ix_kpis_isap ON blend_kpis (ISap);
+CREATE INDEX IF NOT EXISTS ix_kpis_pf ON blend_kpis (PF_C);
+"""
+
+
+# ----------------- Pool de conexões -----------------
+class _Pool:
+    """Até `size` conexões reaproveitadas; quem passa do limite espera uma ser devolvida."""
+
+    def __init__(self, path: str, size: int = POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        with self.connection() as con:
+            con.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        con.row_factory = sqlite3.Row
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.execute("PRAGMA foreign_keys=ON")
+        return con
+
+    @contextmanager
+    def connection(self):
+        try:
+            con = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                grow = self._created < self.size
+                if grow:
+                    self._created += 1
+            if grow:
+                try:
+                    con = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                con = self._idle.get(timeout=30)
+        try:
+            yield con
+        finally:
+            if con.in_transaction:
+                con.rollback()
+            self._idle.put(con)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+
+# ----------------- Repositório -----------------
+def _layers(blend: dict) -> dict:
+    """Camadas efetivas do JSON heur_blend, por classe: só a de ajuste escolhida conta (como na aba)."""
+    return dict(zip("ABC", heur_blend_layers(blend)))
+
+def _rows_for(blends: list) -> list:
+    """Pontua N blends de uma vez (regra do modo heurístico) → tuplas de blend_kpis/blend_fa."""
+    lay = [_layers(b) for b in blends]
+    A = np.array([[l["A"].get(k, 0.0) for k in CATALOG.ing_keys] for l in lay]).reshape(len(lay), -1)
+    B = np.array([[l["B"].get(k, 0.0) for k in FA_ORDER] for l in lay]).reshape(len(lay), -1)
+    C = np.array([[l["C"].get(k, 0.0) for k in CATALOG.ing_keys] for l in lay]).reshape(len(lay), -1)
+    scen = [(b.get("variabilidade") or {}).get("cenario", "mean") if (b.get("variabilidade") or {}).get("ativada")
+            else "mean" for b in blends]
+    out = [None] * len(blends)
+    for s in set(scen):
+        idx = [i for i, x in enumerate(scen) if x == s]
+        res = score_ingredient_blends(A[idx], B[idx], C[idx], scenario=s)
+        for j, i in enumerate(idx):
+            kpis = [res["II"][j], res["ISap"][j], res["PF_C"][j], *res["scores"][j]]
+            out[i] = (lay[i], [None if np.isnan(v) else float(v) for v in kpis], res["fa"][j])
+    return out
+
+
+class BlendRepository:
+    """Blends salvos em SQLite (`path`, padrão LIPIDPALMA_REPO ou ./blends.sqlite3)."""
+
+    def __init__(self, path: str = None, pool_size: int = POOL_SIZE):
+        self.path = path or REPO_PATH
+        self._pool = _Pool(self.path, pool_size)
+
+    def close(self):
+        self._pool.close()
+
+    # ---------- escrita ----------
+    def save(self, blend: dict, nome: str) -> int:
+        """Salva um JSON heur_blend com nome; retorna o id."""
+        return self.save_many([blend], [nome])[0]
+
+    def save_many(self, blends: list, nomes: list) -> list:
+        """Salva vários blends numa única transação (importação em lote)."""
+        for b in blends:
+            if b.get("modo") != "heuristico":
+                raise ValueError("JSON não parece ser um blend heurístico.")
+        scored = _rows_for(blends)
+        now = time.time()
+        ids = []
+        with self._pool.connection() as con, con:
+            for blend, nome, (lay, kpis, fa) in zip(blends, nomes, scored):
+                cur = con.execute(
+                    "INSERT INTO blends (nome, modo, ajuste_method, cenario, total_pct, criado, payload) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (str(nome).strip() or "Sem nome", blend.get("modo"), blend.get("ajuste_method"),
+                     (blend.get("variabilidade") or {}).get("cenario"), blend.get("total_pct"), now,
+                     json.dumps(blend, ensure_ascii=False)))
+                bid = cur.lastrowid
+                con.executemany("INSERT INTO blend_layers VALUES (?, ?, ?, ?)",
+                                [(bid, cls, k, v) for cls, d in lay.items() for k, v in d.items() if v])
+                con.executemany("INSERT INTO blend_fa VALUES (?, ?, ?)",
+                                [(bid, k, float(v)) for k, v in zip(FA_ORDER, fa) if not np.isnan(v)])
+                con.execute("INSERT INTO blend_kpis VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (bid, *kpis))
+                ids.append(bid)
+        return ids
+
+    def delete(self, blend_id: int):
+        with self._pool.connection() as con, con:
+            con.execute("DELETE FROM blends WHERE id = ?", (int(blend_id),))
+
+    # ---------- leitura ----------
+    def load(self, blend_id: int) -> dict:
+        """JSON heur_blend salvo (o mesmo formato de 'Baixar Blend (JSON)')."""
+        with self._pool.connection() as con:
+            row = con.execute("SELECT payload FROM blends WHERE id = ?", (int(blend_id),)).fetchone()
+        if row is None:
+            raise KeyError(f"Blend {blend_id} não encontrado.")
+        return json.loads(row["payload"])
+
+    def search(self, text: str = "", ranges: dict = None, page: int = 1, page_size: int = PAGE_SIZE,
+               order_by: str = "criado", descending: bool = True) -> tuple:
+        """
+        Página `page` (1..) dos blends cujo nome contém `text` e cujos KPIs caem em
+        ranges {coluna de KPI_COLUMNS: (lo, hi)}. Retorna (linhas [dict], total de resultados).
+        """
+        where, args = [], []
+        text = (text or "").strip()
+        if text:
+            where.append("b.nome LIKE ? ESCAPE '\\' COLLATE NOCASE")
+            args.append("%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        for col, (lo, hi) in (ranges or {}).items():
+            if col not in KPI_COLUMNS:
+                raise ValueError(f"Coluna de KPI inválida: {col}")
+            if lo is not None:
+                where.append(f"k.{col} >= ?"); args.append(float(lo))
+            if hi is not None:
+                where.append(f"k.{col} <= ?"); args.append(float(hi))
+        if order_by not in ("criado", "nome", *KPI_COLUMNS):
+            raise ValueError(f"Ordenação inválida: {order_by}")
+        sql_where = ("WHERE " + " AND ".join(where)) if where else ""
+        order = f"{'b' if order_by in ('criado', 'nome') else 'k'}.{order_by} {'DESC' if descending else 'ASC'}"
+        page = max(1, int(page))
+        with self._pool.connection() as con:
+            total = con.execute(f"SELECT COUNT(*) FROM blends b JOIN blend_kpis k ON k.blend_id = b.id {sql_where}",
+                                args).fetchone()[0]
+            rows = con.execute(
+                f"SELECT b.id, b.nome, b.ajuste_method, b.criado, {', '.join('k.' + c for c in KPI_COLUMNS)} "
+                f"FROM blends b JOIN blend_kpis k ON k.blend_id = b.id {sql_where} "
+                f"ORDER BY {order}, b.id DESC LIMIT ? OFFSET ?",
+                args + [int(page_size), (page - 1) * int(page_size)]).fetchall()
+        return [dict(r) for r in rows], int(total)
+
+    def count(self) -> int:
+        with self._pool.connection() as con:
+            return con.execute("SELECT COUNT(*) FROM blends").fetchone()[0]
+
+
+_REPOS = {}
+_REPOS_LOCK = threading.Lock()
+
+def get_repository(path: str = None) -> BlendRepository:
+    """Instância compartilhada (por arquivo) entre sessões."""
+    path = os.path.abspath(path or REPO_PATH)
+    with _REPOS_LOCK:
+        repo = _REPOS.get(path)
+        if repo is None:
+            repo = _REPOS[path] = BlendRepository(path)
+    return repo
+
+
+# ----------------- CLI -----------------
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Repositório SQLite de blends (importar JSON / listar).")
+    ap.add_argument("--repo", default=None, help=f"arquivo SQLite (padrão: {REPO_PATH})")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    imp = sub.add_parser("importar", help="importa JSON salvos pela aba de blend")
+    imp.add_argument("arquivos", nargs="+")
+    ls = sub.add_parser("listar", help="lista blends (paginado)")
+    ls.add_argument("--busca", default="")
+    ls.add_argument("--pagina", type=int, default=1)
+    args = ap.parse_args(argv)
+
+    repo = BlendRepository(args.repo)
+    if args.cmd == "importar":
+        blends, nomes, falhas = [], [], 0
+        for path in args.arquivos:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    b = json.load(f)
+                if b.get("modo") != "heuristico":
+                    raise ValueError("não é um blend heurístico")
+                _layers(b)          # percentuais não numéricos: só este arquivo fica de fora
+            except Exception as e:
+                print(f"{path}: ignorado ({e})", file=sys.stderr)
+                falhas += 1
+                continue
+            blends.append(b)
+            nomes.append(os.path.splitext(os.path.basename(path))[0])
+        ids = repo.save_many(blends, nomes) if blends else []
+        print(f"{len(ids)} blend(s) importado(s), {falhas} ignorado(s); repositório com {repo.count()}.",
+              file=sys.stderr)
+    else:
+        rows, total = repo.search(args.busca, page=args.pagina)
+        for r in rows:
+            print(f"{r['id']:>6}  {r['nome'][:40]:<40}  II {r['II'] or 0:6.1f}  ISap {r['ISap'] or 0:6.1f}  "
+                  f"PF {r['PF_C'] or 0:5.1f}")
+        print(f"página {args.pagina}: {len(rows)} de {total}.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,476 @@
+# -*- coding: utf-8 -*-
+# blend_service.py
+# Serviço HTTP/JSON local (asyncio + biblioteca padrão, sem Streamlit) para ERP/LIMS obterem
+# II, ISap, PF °C, radar e notas por finalidade sem navegador. O laço de eventos só faz E/S;
+# decodificação, validação e pontuação rodam num pool limitado de threads. Pedidos unitários
+# que chegam enquanto o pool está ocupado são agrupados e pontuados numa única chamada
+# vetorizada (sem espera artificial: em baixa carga cada pedido sai sozinho).
+"""
+Uso:
+    python blend_service.py [--host 127.0.0.1] [--porta 8765] [--workers 2]
+
+Rotas:
+  GET  /saude       → {"status": "ok", "calibracao": ...}
+  GET  /metricas    → pedidos, erros, blends e latência (p50/p90/p99/máx, ms) por rota
+  POST /v1/blend    → um blend → resultado
+  POST /v1/lote     → {"blends": [...]} (ou a lista direto) → {"resultados": [...]}, na mesma ordem
+
+Formatos aceitos por blend (os mesmos JSON produzidos pela aba de blend):
+  - heur_blend      {"classeA_pct": {...}, "classeB_pct": {...}, "classeC_pct": {...},
+                     "ajuste_method": "B"|"C", "variabilidade": {"ativada": ..., "cenario": ...}}
+  - assist_payload  heurístico: {"classes": {"A": ..., "B": ..., "C": ...}, "source": "...+B"|"...+C", ...}
+                    upload:     {"fa_profile": {...}, ...} (perfil FA já combinado com o ajuste)
+  - perfil FA       {"fa_profile": {"C16:0": 44.0, ...}}
+Ingredientes seguem a regra do modo heurístico (baseline = médias calibradas da Classe A; com
+ajuste, KPIs técnicos calibrados do perfil FA); perfis FA, a do modo Upload. Num lote, um
+blend inválido vira {"erro": ...} na sua posição e não derruba os demais.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import numpy as np
+
+from blend_engine import (
+    CATALOG, SCENARIOS, SCORE_KEYS, RADAR_KEYS,
+    ingredient_vector, fa_vector, validate_blend, active_layers, heur_blend_layers,
+    score_ingredient_blends, score_fa_profiles, calibration_version,
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 2
+MAX_BATCH = 10_000              # blends por pedido em /v1/lote
+MAX_COALESCE = 512              # pedidos unitários pontuados juntos, no máximo
+MAX_PENDING = 2_000             # pedidos aguardando o pool; acima disso → 503
+MAX_HEADER = 64 * 1024
+MAX_BODY = 16 * 1024 * 1024
+LATENCY_WINDOW = 20_000         # últimas latências guardadas por rota (percentis de /metricas)
+_ROUTES = ("/saude", "/metricas", "/v1/blend", "/v1/lote")
+
+
+# ----------------- Leitura dos blends -----------------
+class _Blend:
+    """Blend já validado: ("ing", cenário, A, B, C) ou ("fa", perfil), mais os avisos."""
+    __slots__ = ("kind", "scenario", "A", "B", "C", "fa", "warnings")
+
+    def __init__(self, kind, scenario="mean", A=None, B=None, C=None, fa=None, warnings=()):
+        self.kind = kind
+        self.scenario = scenario
+        self.A, self.B, self.C, self.fa = A, B, C, fa
+        self.warnings = list(warnings)
+
+def _scenario(obj: dict) -> str:
+    var = obj.get("variabilidade") or {}
+    if not isinstance(var, dict):
+        raise ValueError("variabilidade deve ser um objeto {\"ativada\": ..., \"cenario\": ...}.")
+    scen = var.get("cenario", "mean") if var.get("ativada") else "mean"
+    if scen not in SCENARIOS:
+        raise ValueError(f"cenário desconhecido: {scen!r} (use {', '.join(SCENARIOS)}).")
+    return scen
+
+def _pct_dict(obj, name: str) -> dict:
+    if obj is None:
+        return {}
+    if not isinstance(obj, dict):
+        raise ValueError(f"{name} deve ser um objeto {{chave: %}}.")
+    return obj
+
+def _ingredient_blend(A: dict, B: dict, C: dict, scenario: str) -> _Blend:
+    issues = validate_blend(A, B, C)
+    errors = [i.message for i in issues if i.level == "erro"]
+    if errors:
+        raise ValueError(" ".join(errors))
+    return _Blend("ing", scenario, ingredient_vector(A), fa_vector(B), ingredient_vector(C),
+                  warnings=[i.message for i in issues])
+
+def _fa_blend(profile: dict) -> _Blend:
+    warnings = []
+    unknown = [k for k in profile if k not in CATALOG.fa_index]
+    if unknown:
+        warnings.append(f"Ácido(s) fora de FA_ORDER ignorado(s): {', '.join(map(str, unknown))}.")
+    for k, v in profile.items():
+        try:
+            if isinstance(v, bool):         # true/false do JSON não são percentuais
+                raise TypeError
+            x = float(v)
+        except (TypeError, ValueError):
+            raise ValueError(f"fa_profile: valor não numérico em {k!s} ({v!r}).") from None
+        if not math.isfinite(x) or x < 0 or x > 100:
+            raise ValueError(f"fa_profile: {k!s} = {v!r} fora de 0–100%.")
+    fa = fa_vector(profile)
+    if not math.isfinite(fa.sum()):
+        raise ValueError("fa_profile: soma dos percentuais não é finita.")
+    return _Blend("fa", fa=fa, warnings=warnings)
+
+def parse_blend(obj) -> _Blend:
+    """JSON de um blend (heur_blend, assist_payload ou perfil FA) → _Blend. ValueError se inválido."""
+    if not isinstance(obj, dict):
+        raise ValueError("cada blend deve ser um objeto JSON.")
+    if "classeA_pct" in obj or "classeB_pct" in obj or "classeC_pct" in obj:
+        for name in ("classeA_pct", "classeB_pct", "classeC_pct"):
+            _pct_dict(obj.get(name), name)
+        if obj.get("ajuste_method") not in (None, "B", "C"):
+            raise ValueError(f"ajuste_method deve ser 'B' ou 'C' (veio {obj.get('ajuste_method')!r}).")
+        try:
+            A, B, C = heur_blend_layers(obj)
+        except (TypeError, ValueError):
+            raise ValueError("classeA_pct/classeB_pct/classeC_pct: todos os valores devem ser numéricos.") from None
+        return _ingredient_blend(A, B, C, _scenario(obj))
+    if "classes" in obj:
+        classes = _pct_dict(obj["classes"], "classes")
+        A, B, C = (_pct_dict(classes.get(k), f"classes.{k}") for k in ("A", "B", "C"))
+        # mesma regra do handoff da aba: só a camada de ajuste indicada na origem conta
+        source = str(obj.get("source", ""))
+        method = "B" if source.endswith("+B") else "C" if source.endswith("+C") else None
+        return _ingredient_blend(*active_layers(A, B, C, method), _scenario(obj))
+    if "fa_profile" in obj:
+        return _fa_blend(_pct_dict(obj["fa_profile"], "fa_profile"))
+    raise ValueError("formato não reconhecido: esperado heur_blend (classeA_pct...), "
+                     "assist_payload (classes/fa_profile) ou {\"fa_profile\": {...}}.")
+
+
+# ----------------- Pontuação vetorizada -----------------
+def _num(x):
+    x = float(x)
+    return None if math.isnan(x) else round(x, 4)
+
+def _result(res: dict, j: int, blend: _Blend) -> dict:
+    empty = math.isnan(res["II"][j])
+    out = {"modo": "heuristico" if blend.kind == "ing" else "perfil",
+           "II": _num(res["II"][j]), "ISap": _num(res["ISap"][j]), "PF_C": _num(res["PF_C"][j]),
+           "PF_idx": _num(res["PF_idx"][j]),
+           "notas": None if empty else {k: _num(v) for k, v in zip(SCORE_KEYS, res["scores"][j])},
+           "radar": None if empty else {k: int(v) for k, v in zip(RADAR_KEYS, res["radar"][j])}}
+    if blend.kind == "ing":
+        out["cenario"] = blend.scenario
+        out["ajuste"] = bool(res["has_adjust"][j])
+        out["baseline"] = {"II": _num(res["II_base"][j]), "ISap": _num(res["ISap_base"][j]),
+                           "PF_C": _num(res["PF_base_C"][j])}
+    out["avisos"] = blend.warnings
+    return out
+
+def score_blends(blends: list) -> list:
+    """Pontua uma lista de _Blend (None = inválido, ignorado) com uma chamada vetorizada por grupo."""
+    out = [None] * len(blends)
+    groups = {}
+    for i, b in enumerate(blends):
+        if b is not None:
+            groups.setdefault((b.kind, b.scenario), []).append(i)
+    for (kind, scenario), idx in groups.items():
+        if kind == "ing":
+            res = score_ingredient_blends(np.stack([blends[i].A for i in idx]),
+                                          np.stack([blends[i].B for i in idx]),
+                                          np.stack([blends[i].C for i in idx]), scenario=scenario)
+        else:
+            res = score_fa_profiles(np.stack([blends[i].fa for i in idx]))
+        for j, i in enumerate(idx):
+            out[i] = _result(res, j, blends[i])
+    return out
+
+def _json(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False).encode("utf-8")
+
+def _error(status: HTTPStatus, message: str):
+    return status, _json({"erro": message})
+
+def _decode(body: bytes):
+    try:
+        return json.loads(body)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"JSON inválido: {e}") from None
+
+def _parse_item(obj, i: int, parsed: list, errors: dict):
+    """parse_blend de um item; qualquer falha fica só nele (422 se inválido, 500 se inesperada)."""
+    try:
+        parsed.append(parse_blend(obj))
+        return
+    except ValueError as e:
+        errors[i] = (HTTPStatus.UNPROCESSABLE_ENTITY, str(e))
+    except Exception as e:
+        errors[i] = (HTTPStatus.INTERNAL_SERVER_ERROR, f"falha ao ler o blend: {type(e).__name__}: {e}")
+    parsed.append(None)
+
+def _score_isolated(parsed: list, errors: dict) -> list:
+    """score_blends do grupo; se a chamada vetorizada falhar, pontua um a um e isola quem falhou."""
+    try:
+        return score_blends(parsed)
+    except Exception:
+        pass
+    out = [None] * len(parsed)
+    for i, b in enumerate(parsed):
+        if b is None:
+            continue
+        try:
+            out[i] = score_blends([b])[0]
+        except Exception as e:
+            errors[i] = (HTTPStatus.INTERNAL_SERVER_ERROR, f"falha ao pontuar: {type(e).__name__}: {e}")
+    return out
+
+def handle_single_bodies(bodies: list) -> list:
+    """
+    Corpos de N pedidos /v1/blend → N (status, JSON). Roda no pool; um único lote vetorizado.
+    JSON malformado → 400 (como em /v1/lote); blend válido como JSON mas inválido → 422.
+    Cada pedido responde só pelo próprio corpo: um erro nunca contamina os demais do grupo.
+    """
+    parsed, errors = [], {}
+    for i, body in enumerate(bodies):
+        try:
+            obj = _decode(body)
+        except ValueError as e:
+            parsed.append(None)
+            errors[i] = (HTTPStatus.BAD_REQUEST, str(e))
+            continue
+        _parse_item(obj, i, parsed, errors)
+    version = calibration_version()
+    scored = _score_isolated(parsed, errors)
+    return [_error(*errors[i]) if i in errors else (HTTPStatus.OK, _json({**res, "calibracao": version}))
+            for i, res in enumerate(scored)]
+
+def handle_batch_body(body: bytes):
+    """Corpo de /v1/lote → (status, JSON, nº de blends). Roda no pool."""
+    try:
+        obj = _decode(body)
+    except ValueError as e:
+        return (*_error(HTTPStatus.BAD_REQUEST, str(e)), 0)
+    items = obj.get("blends") if isinstance(obj, dict) else obj
+    if not isinstance(items, list):
+        return (*_error(HTTPStatus.BAD_REQUEST, "esperado {\"blends\": [...]} ou uma lista de blends."), 0)
+    if len(items) > MAX_BATCH:
+        return (*_error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                        f"lote com {len(items)} blends; máximo {MAX_BATCH} por pedido."), 0)
+    parsed, errors = [], {}
+    for i, item in enumerate(items):
+        _parse_item(item, i, parsed, errors)
+    scored = _score_isolated(parsed, errors)
+    results = [{"erro": errors[i][1]} if i in errors else res for i, res in enumerate(scored)]
+    payload = {"calibracao": calibration_version(), "n": len(results), "erros": len(errors),
+               "resultados": results}
+    return HTTPStatus.OK, _json(payload), len(items)
+
+
+# ----------------- Métricas -----------------
+class ServiceMetrics:
+    """Contadores e janela de latências (ms) por rota; só acessado pelo laço de eventos."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.started = time.time()
+        self._window = window
+        self._routes = {}
+        self.coalesced = deque(maxlen=window)    # tamanho de cada grupo de pedidos unitários
+
+    def record(self, route: str, status: int, ms: float, blends: int = 0):
+        r = self._routes.get(route)
+        if r is None:
+            r = self._routes[route] = {"pedidos": 0, "erros": 0, "blends": 0, "lat": deque(maxlen=self._window)}
+        r["pedidos"] += 1
+        r["erros"] += status >= 400
+        r["blends"] += blends
+        r["lat"].append(ms)
+
+    def snapshot(self, inflight: int = 0, pending: int = 0) -> dict:
+        uptime = max(time.time() - self.started, 1e-9)
+        routes = {}
+        for name, r in sorted(self._routes.items()):
+            lat = np.asarray(r["lat"], dtype=float)
+            p50, p90, p99 = np.percentile(lat, (50, 90, 99)) if lat.size else (0.0, 0.0, 0.0)
+            routes[name] = {"pedidos": r["pedidos"], "erros": r["erros"], "blends": r["blends"],
+                            "blends_por_s": round(r["blends"] / uptime, 1),
+                            "latencia_ms": {"n": int(lat.size), "p50": round(float(p50), 3),
+                                            "p90": round(float(p90), 3), "p99": round(float(p99), 3),
+                                            "max": round(float(lat.max()), 3) if lat.size else 0.0,
+                                            "media": round(float(lat.mean()), 3) if lat.size else 0.0}}
+        grp = np.asarray(self.coalesced, dtype=float)
+        return {"uptime_s": round(uptime, 1), "em_andamento": inflight, "na_fila": pending,
+                "agrupamento_unitario": {"grupos": int(grp.size),
+                                         "media": round(float(grp.mean()), 2) if grp.size else 0.0,
+                                         "max": int(grp.max()) if grp.size else 0},
+                "rotas": routes}
+
+
+# ----------------- Servidor -----------------
+class BlendService:
+    """Servidor HTTP/1.1 (keep-alive, Content-Length) sobre asyncio.start_server."""
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, workers: int = DEFAULT_WORKERS,
+                 max_pending: int = MAX_PENDING, max_coalesce: int = MAX_COALESCE):
+        self.host, self.port = host, port
+        self.workers = max(1, int(workers))
+        self.max_pending = max_pending
+        self.max_coalesce = max_coalesce
+        self.metrics = ServiceMetrics()
+        self._pool = None
+        self._queue = None
+        self._tasks = []
+        self._server = None
+        self._inflight = 0
+
+    async def start(self):
+        self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="blend-service")
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._single_worker()) for _ in range(self.workers)]
+        self._server = await asyncio.start_server(self._handle_conn, self.host, self.port, limit=MAX_HEADER)
+        self.port = self._server.sockets[0].getsockname()[1]     # porta real quando port=0
+        return self
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+    # --- pontuação no pool ---
+    async def _single_worker(self):
+        """Um por thread do pool: junta o que estiver na fila e pontua tudo numa chamada."""
+        loop = asyncio.get_running_loop()
+        while True:
+            group = [await self._queue.get()]
+            while len(group) < self.max_coalesce and not self._queue.empty():
+                group.append(self._queue.get_nowait())
+            self.metrics.coalesced.append(len(group))
+            try:
+                answers = await loop.run_in_executor(self._pool, handle_single_bodies, [b for b, _ in group])
+            except Exception as e:
+                answers = [_error(HTTPStatus.INTERNAL_SERVER_ERROR, f"falha ao pontuar: {e}")] * len(group)
+            for (_, fut), ans in zip(group, answers):
+                if not fut.done():
+                    fut.set_result(ans)
+
+    async def _score_single(self, body: bytes):
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((body, fut))
+        status, payload = await fut
+        return status, payload, 1 if status == HTTPStatus.OK else 0
+
+    async def _score_batch(self, body: bytes):
+        return await asyncio.get_running_loop().run_in_executor(self._pool, handle_batch_body, body)
+
+    async def _dispatch(self, method: str, path: str, body: bytes):
+        if path == "/saude":
+            if method != "GET":
+                return (*_error(HTTPStatus.METHOD_NOT_ALLOWED, "use GET."), 0)
+            return HTTPStatus.OK, _json({"status": "ok", "calibracao": calibration_version()}), 0
+        if path == "/metricas":
+            if method != "GET":
+                return (*_error(HTTPStatus.METHOD_NOT_ALLOWED, "use GET."), 0)
+            return HTTPStatus.OK, _json(self.metrics.snapshot(self._inflight, self._queue.qsize())), 0
+        if path in ("/v1/blend", "/v1/lote"):
+            if method != "POST":
+                return (*_error(HTTPStatus.METHOD_NOT_ALLOWED, "use POST com corpo JSON."), 0)
+            if self._inflight >= self.max_pending:
+                return (*_error(HTTPStatus.SERVICE_UNAVAILABLE, "serviço sobrecarregado; tente novamente."), 0)
+            self._inflight += 1
+            try:
+                return await (self._score_single(body) if path == "/v1/blend" else self._score_batch(body))
+            except Exception as e:
+                return (*_error(HTTPStatus.INTERNAL_SERVER_ERROR, f"falha ao pontuar: {e}"), 0)
+            finally:
+                self._inflight -= 1
+        return (*_error(HTTPStatus.NOT_FOUND, f"rota desconhecida: {path}"), 0)
+
+    # --- HTTP ---
+    @staticmethod
+    def _response(status: HTTPStatus, payload: bytes, keep_alive: bool) -> bytes:
+        head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                "Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        return head.encode("latin-1") + payload
+
+    async def _handle_conn(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    writer.write(self._response(*_error(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                                                        "cabeçalho grande demais."), False))
+                    break
+                t0 = time.perf_counter()
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    writer.write(self._response(*_error(HTTPStatus.BAD_REQUEST, "linha de pedido inválida."), False))
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if line:
+                        k, _, v = line.partition(":")
+                        headers[k.strip().lower()] = v.strip()
+                conn = headers.get("connection", "").lower()
+                keep_alive = conn != "close" if version == "HTTP/1.1" else conn == "keep-alive"
+                path = target.split("?", 1)[0]
+
+                if "chunked" in headers.get("transfer-encoding", "").lower():
+                    status, payload = _error(HTTPStatus.LENGTH_REQUIRED, "envie Content-Length (sem chunked).")
+                    keep_alive, blends = False, 0
+                else:
+                    try:
+                        size = int(headers.get("content-length") or 0)
+                    except ValueError:
+                        size = -1
+                    if size < 0 or size > MAX_BODY:
+                        status, payload = _error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE if size > 0 else
+                                                 HTTPStatus.BAD_REQUEST, "Content-Length inválido ou acima do limite.")
+                        keep_alive, blends = False, 0
+                    else:
+                        body = await reader.readexactly(size) if size else b""
+                        status, payload, blends = await self._dispatch(method, path, body)
+
+                writer.write(self._response(status, payload, keep_alive))
+                await writer.drain()
+                route = f"{method} {path}" if path in _ROUTES and method in ("GET", "POST") else "outras"
+                self.metrics.record(route, status, (time.perf_counter() - t0) * 1000, blends)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _serve(args):
+    service = await BlendService(args.host, args.porta, args.workers, args.max_pendentes).start()
+    print(f"Serviço de blends em http://{service.host}:{service.port} "
+          f"({service.workers} workers, calibração {calibration_version()})", file=sys.stderr)
+    try:
+        await service.serve_forever()
+    finally:
+        await service.close()
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(
+        description="Serviço HTTP/JSON local: II, ISap, PF °C, radar e notas por finalidade de blends.")
+    ap.add_argument("--host", default=DEFAULT_HOST, help=f"endereço de escuta (padrão: {DEFAULT_HOST})")
+    ap.add_argument("--porta", type=int, default=DEFAULT_PORT, help=f"porta (padrão: {DEFAULT_PORT}; 0 = livre)")
+    ap.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="threads de pontuação")
+    ap.add_argument("--max-pendentes", type=int, default=MAX_PENDING,
+                    help="pedidos de pontuação simultâneos antes de responder 503")
+    args = ap.parse_args(argv)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
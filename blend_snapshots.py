@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# blend_snapshots.py
+# Snapshots de blend compactos (sem Streamlit) e comparação de N snapshots.
+# Cada Snapshot guarda só vetores numpy curtos (FA, KPIs, notas, radar) num objeto com __slots__;
+# a leitura no estilo dict (snap["fa"], snap["kpis"]["II"], snap.get("A_vals")) continua valendo
+# para o comparador A/B. A comparação N-way empilha os snapshots numa matriz (N, V) e calcula
+# todos os deltas de uma vez.
+
+import numpy as np
+
+from blend_engine import (
+    FA_ORDER, SCORE_KEYS, RADAR_KEYS, CATALOG,
+    _normalize_percentages, _scores_finais, melt_index,
+)
+
+MAX_SNAPSHOTS = 50
+KPI_KEYS = ("II", "ISap", "PF")                 # PF sempre em °C
+COMPARE_KEYS = KPI_KEYS + tuple(SCORE_KEYS)     # colunas da matriz de comparação
+
+
+class Snapshot:
+    """Registro imutável de um blend: label, FA (F,), KPIs (3,), PF índice, notas (4,), radar (5,), Classe A opcional."""
+    __slots__ = ("label", "fa", "kpis", "pf_index", "scores", "radar", "A")
+
+    def __init__(self, label: str, fa, kpis, pf_index: float, scores, radar, A=None):
+        self.label = str(label)
+        self.fa = np.asarray(fa, dtype=np.float32)
+        self.kpis = np.asarray(kpis, dtype=np.float64)
+        self.pf_index = float(pf_index)
+        self.scores = np.asarray(scores, dtype=np.float32)
+        self.radar = np.asarray(radar, dtype=np.int16)
+        self.A = None if A is None else np.asarray(A, dtype=np.float32)
+
+    @classmethod
+    def from_profile(cls, label: str, fa_dict: dict, II: float, ISap: float, PF_celsius: float,
+                     A_vals: dict = None) -> "Snapshot":
+        """Mesma regra do comparador: notas/radar do perfil normalizado com o II informado; PF em °C."""
+        fa_n = _normalize_percentages(fa_dict)
+        PF_index = melt_index(fa_n)
+        scores, radar = _scores_finais(fa_n, PF_index, II)
+        return cls(label, [fa_n.get(k, 0.0) for k in FA_ORDER], (II, ISap, PF_celsius), PF_index,
+                   [scores[k] for k in SCORE_KEYS], [radar[k] for k in RADAR_KEYS],
+                   None if A_vals is None else [float(A_vals.get(k, 0.0)) for k in CATALOG.ing_keys])
+
+    # ---------- leitura no estilo dict (compatível com os snapshots antigos) ----------
+    def __getitem__(self, key):
+        if key == "label":
+            return self.label
+        if key == "fa":
+            return {k: float(v) for k, v in zip(FA_ORDER, self.fa)}
+        if key == "kpis":
+            return {k: float(v) for k, v in zip(KPI_KEYS, self.kpis)}
+        if key == "pf_index":
+            return self.pf_index
+        if key == "scores":
+            return {k: round(float(v), 1) for k, v in zip(SCORE_KEYS, self.scores)}
+        if key == "radar":
+            return {k: int(v) for k, v in zip(RADAR_KEYS, self.radar)}
+        if key == "A_vals":
+            return None if self.A is None else {k: float(v) for k, v in zip(CATALOG.ing_keys, self.A)}
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            value = self[key]
+        except KeyError:
+            return default
+        return default if value is None else value
+
+    def row(self) -> np.ndarray:
+        """Linha da matriz de comparação (COMPARE_KEYS)."""
+        return np.concatenate([self.kpis, self.scores.astype(np.float64)])
+
+    def __repr__(self):
+        return f"Snapshot({self.label!r}, II={self.kpis[0]:.1f}, ISap={self.kpis[1]:.1f}, PF={self.kpis[2]:.1f})"
+
+
+def compare_matrix(snaps) -> np.ndarray:
+    """Matriz (N, V) de KPIs e notas, V = len(COMPARE_KEYS)."""
+    return np.array([s.row() for s in snaps], dtype=np.float64).reshape(len(snaps), len(COMPARE_KEYS))
+
+def delta_matrix(snaps, ref: int = None) -> np.ndarray:
+    """
+    Deltas de uma vez só:
+      ref=None → tensor (N, N, V) com D[i, j] = M[i] − M[j] (todos os pares);
+      ref=r    → (N, V) com M[i] − M[r].
+    """
+    M = compare_matrix(snaps)
+    if ref is None:
+        return M[:, None, :] - M[None, :, :]
+    return M - M[ref]
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+# blend_solver.py
+# Design inverso (sem Streamlit): encontra proporções de Classe A (+ ajuste Classe C) que
+# atendem faixas-alvo de II, ISap e PF (°C), minimizando a distância a um blend de
+# referência ou o custo. Usa os perfis compilados do catálogo, as calibrações lineares
+# (II/ISap/PF) e o índice de fusão em forma analítica (gradientes exatos para o SLSQP).
+
+import time
+
+import numpy as np
+
+import blend_engine as eng
+from blend_engine import (
+    CATALOG, _kpi_basis, kpi_means_mix, mix_fa, melt_index_v,
+    ii_calibrated_v, isap_calibrated_v, pf_index_to_celsius_v,
+)
+
+TARGET_KEYS = ("II", "ISap", "PF_C")
+MODELS = ("tecnico", "literatura")
+OBJECTIVES = ("referencia", "custo")
+CAP_C_DEFAULT = 30.0   # mesma regra da aba: ajuste B/C ≤ 30% do blend
+_TOL = 1e-3
+
+
+def _technical_kpis(y, J, coef):
+    """
+    KPIs técnicos calibrados (II, ISap, PF °C) e seus gradientes em y (I,).
+    proj = y·J (7,) → v_k = 100·proj_k/proj_SUM; PF sem clamp (suave para o otimizador).
+    """
+    proj = y @ J
+    s = proj[6] if proj[6] > 1e-12 else 1e-12
+    v = 100.0 * proj[:6] / s
+    dv = 100.0 * (J[:, :6] * s - np.outer(J[:, 6], proj[:6])) / (s * s)   # (I, 6)
+    (a_ii, b_ii), (a_is, b_is), (a_pf, b_pf) = coef["II"], coef["ISap"], coef["PF"]
+    LS, MS, MONO, POLY = v[2], v[3], v[4], v[5]
+    melt = (eng._MELT_W_LS*LS + eng._MELT_W_MS*MS + eng._MELT_W_MONO*MONO
+            + eng._MELT_W_POLY*POLY + eng._MELT_CURV*LS**2)
+    dmelt = ((eng._MELT_W_LS + 2*eng._MELT_CURV*LS)*dv[:, 2] + eng._MELT_W_MS*dv[:, 3]
+             + eng._MELT_W_MONO*dv[:, 4] + eng._MELT_W_POLY*dv[:, 5])
+    vals = np.array([a_ii*v[0] + b_ii, a_is*v[1] + b_is, a_pf*melt + b_pf])
+    grads = np.column_stack([a_ii*dv[:, 0], a_is*dv[:, 1], a_pf*dmelt])   # (I, 3)
+    return vals, grads
+
+
+def _literature_kpis(y, K):
+    tot = y.sum() if y.sum() > 1e-12 else 1e-12
+    vals = y @ K / tot
+    grads = (K * tot - np.outer(np.ones(len(y)), y @ K)) / (tot * tot)
+    return vals, grads
+
+
+def evaluate_solution(A, C=None, scenario: str = "mean", model: str = "tecnico") -> dict:
+    """KPIs exatos (com clamps) do blend A (+C), no mesmo modelo usado pelo solver."""
+    A = np.asarray(A, dtype=float)
+    C = np.zeros_like(A) if C is None else np.asarray(C, dtype=float)
+    if model == "literatura":
+        II, ISap, PF = kpi_means_mix(A + C, scenario, pf_fallback=eng._pf_fallback_c())[0]
+        return {"II": float(II), "ISap": float(ISap), "PF_C": float(PF)}
+    FA = mix_fa(A=A + C, scenario=scenario)
+    return {"II": float(ii_calibrated_v(FA)[0]), "ISap": float(isap_calibrated_v(FA)[0]),
+            "PF_C": float(pf_index_to_celsius_v(melt_index_v(FA))[0])}
+
+
+def solve_blend(targets: dict, bounds: dict = None, reference=None, cost=None,
+                objective: str = "referencia", use_C: bool = False, cap_C: float = CAP_C_DEFAULT,
+                scenario: str = "mean", model: str = "tecnico", n_starts: int = 6, seed: int = 0) -> dict:
+    """
+    Resolve o design inverso.
+      targets:   {"II": (lo, hi), "ISap": (lo, hi), "PF_C": (lo, hi)}; lo/hi None = sem limite
+      bounds:    {ing_key: (lo, hi)} em % do blend para a Classe A (padrão 0–100)
+      reference: (A, C) vetores (I,) em % — objetivo "referencia" minimiza ‖x − ref‖²
+      cost:      (I,) custo por kg de cada ingrediente — objetivo "custo" minimiza custo/kg do blend
+      use_C:     inclui variáveis de Classe C (cada uma e a soma ≤ cap_C)
+    Retorna {"ok", "A", "C", "kpis", "objective", "violation", "message", "elapsed_ms"}.
+    """
+    from scipy.optimize import minimize   # dependência pesada só quando o solver roda
+
+    t0 = time.perf_counter()
+    I = CATALOG.n_ingredients
+    P = CATALOG.scenario_profiles(scenario)
+    J = P @ _kpi_basis()
+    coef = eng.calibration_coefficients()
+    K = kpi_means_mix(np.eye(I), scenario, pf_fallback=eng._pf_fallback_c())   # (I, 3)
+    kpi_fn = (lambda y: _literature_kpis(y, K)) if model == "literatura" else (lambda y: _technical_kpis(y, J, coef))
+
+    nv = 2 * I if use_C else I
+    lo = np.zeros(nv); hi = np.full(nv, 100.0)
+    for k, (b_lo, b_hi) in (bounds or {}).items():
+        i = CATALOG.ing_index.get(k)
+        if i is not None:
+            lo[i] = max(0.0, float(b_lo if b_lo is not None else 0.0))
+            hi[i] = min(100.0, float(b_hi if b_hi is not None else 100.0))
+    if use_C:
+        hi[I:] = cap_C
+    if lo.sum() > 100.0 + _TOL or hi.sum() < 100.0 - _TOL or (lo > hi).any():
+        return {"ok": False, "A": None, "C": None, "kpis": None, "objective": None, "violation": None,
+                "message": "Limites por ingrediente incompatíveis com um blend de 100%.",
+                "elapsed_ms": (time.perf_counter() - t0) * 1000}
+
+    split = lambda z: (z[:I], z[I:] if use_C else np.zeros(I))
+    y_of = lambda z: z[:I] + z[I:] if use_C else z
+    dy = np.vstack([np.eye(I), np.eye(I)]) if use_C else np.eye(I)       # dy/dz (nv, I)
+
+    # restrições de meta: lo ≤ KPI ≤ hi (uma inequação por limite informado)
+    rows = []
+    for j, key in enumerate(TARGET_KEYS):
+        t_lo, t_hi = (targets or {}).get(key, (None, None))
+        if t_lo is not None: rows.append((j, 1.0, float(t_lo)))
+        if t_hi is not None: rows.append((j, -1.0, float(t_hi)))
+
+    def g_fun(z):
+        vals, _ = kpi_fn(y_of(z))
+        return np.array([sgn * (vals[j] - ref) for j, sgn, ref in rows])
+
+    def g_jac(z):
+        _, grads = kpi_fn(y_of(z))
+        return np.array([sgn * (dy @ grads[:, j]) for j, sgn, _ in rows])
+
+    cons = [{"type": "eq", "fun": lambda z: np.array([z.sum() - 100.0]), "jac": lambda z: np.ones((1, nv))}]
+    if use_C:
+        cons.append({"type": "ineq", "fun": lambda z: np.array([cap_C - z[I:].sum()]),
+                     "jac": lambda z: np.concatenate([np.zeros(I), -np.ones(I)])[None, :]})
+    if rows:
+        cons.append({"type": "ineq", "fun": g_fun, "jac": g_jac})
+
+    # referência normalizada para 100%
+    if reference is not None:
+        refA, refC = (np.asarray(r, dtype=float) for r in reference)
+        z_ref = np.concatenate([refA, refC]) if use_C else refA + refC
+    else:
+        z_ref = np.zeros(nv)
+    z_ref = np.clip(z_ref, lo, hi)
+    z_ref = z_ref * (100.0 / z_ref.sum()) if z_ref.sum() > 0 else np.full(nv, 100.0 / nv)
+
+    cost_y = np.zeros(I) if cost is None else np.asarray(cost, dtype=float)
+    if objective == "custo":
+        w_reg = 1e-6   # desempate: entre blends de mesmo custo, o mais próximo da referência
+        f_obj = lambda z: cost_y @ y_of(z) / 100.0 + w_reg * np.sum((z - z_ref) ** 2)
+        f_jac = lambda z: dy @ cost_y / 100.0 + 2 * w_reg * (z - z_ref)
+    else:
+        f_obj = lambda z: np.sum((z - z_ref) ** 2)
+        f_jac = lambda z: 2 * (z - z_ref)
+
+    def violation(z):
+        return float(np.sum(np.minimum(g_fun(z), 0.0) ** 2)) if rows else 0.0
+
+    def violation_jac(z):
+        return 2.0 * np.minimum(g_fun(z), 0.0) @ g_jac(z) if rows else np.zeros(nv)
+
+    # multi-start: referência + pontos aleatórios do simplex dentro dos limites
+    rng = np.random.default_rng(seed)
+    starts = [z_ref]
+    for _ in range(max(0, n_starts - 1)):
+        z = lo + rng.dirichlet(np.ones(nv)) * (hi - lo)
+        starts.append(z * (100.0 / z.sum()) if z.sum() > 0 else z_ref)
+
+    best = None
+    for z0 in starts:
+        z0 = np.clip(z0, lo, hi)
+        res = minimize(f_obj, z0, jac=f_jac, bounds=list(zip(lo, hi)), constraints=cons,
+                       method="SLSQP", options={"maxiter": 200, "ftol": 1e-9})
+        z = np.clip(res.x, lo, hi)
+        viol = violation(z) + (z.sum() - 100.0) ** 2
+        if not (viol <= _TOL):
+            # fase 1: melhor compromisso (mínima violação das metas)
+            res = minimize(violation, z, jac=violation_jac, bounds=list(zip(lo, hi)), constraints=cons[:2 if use_C else 1],
+                           method="SLSQP", options={"maxiter": 200, "ftol": 1e-12})
+            z = np.clip(res.x, lo, hi)
+            viol = violation(z) + (z.sum() - 100.0) ** 2
+        cand = (viol > _TOL, viol if viol > _TOL else float(f_obj(z)), z)
+        if best is None or cand[:2] < best[:2]:
+            best = cand
+
+    infeasible, _, z = best
+    A, C = split(z * (100.0 / z.sum()))
+    kpis = evaluate_solution(A, C, scenario, model)
+    missed = []
+    for key in TARGET_KEYS:
+        t_lo, t_hi = (targets or {}).get(key, (None, None))
+        if (t_lo is not None and kpis[key] < t_lo - 0.05) or (t_hi is not None and kpis[key] > t_hi + 0.05):
+            missed.append(key)
+    ok = not missed and not infeasible
+    if ok:
+        msg = "Blend viável encontrado."
+    else:
+        msg = "Nenhum blend viável; exibindo o mais próximo das metas (fora: " + ", ".join(missed or ["metas"]) + ")."
+    return {
+        "ok": ok, "A": A, "C": C, "kpis": kpis,
+        "objective": float(cost_y @ (A + C) / 100.0) if objective == "custo" else float(np.sum((z - z_ref) ** 2)),
+        "violation": float(best[1]) if infeasible else 0.0,
+        "message": msg,
+        "elapsed_ms": (time.perf_counter() - t0) * 1000,
+    }
@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+# blend_upload.py
+# Leitura e interpretação (sem Streamlit) das planilhas do modo "Upload de planilha (real)":
+#   - formato longo (um blend por arquivo): colunas Ingrediente/Percentual ou AcidoGraxos/Percentual;
+#   - formato largo (um blend por linha): coluna de ID + uma coluna por ingrediente (rótulo/chave)
+#     ou por código FA de FA_ORDER — mesmo reconhecimento de colunas do blend_batch.
+# Tudo é agregado por coluna (groupby/matrizes), sem iterar linha a linha.
+# parse_upload guarda o resultado num LRU limitado, chaveado pelo hash do conteúdo + formato:
+# reruns do ajuste fino não releem nem reinterpretam o arquivo.
+# parse_workbook lê todas as abas de um XLSX (uma por lote/fornecedor) num pool de processos,
+# com os mesmos esquemas, e junta tudo numa única tabela pontuada.
+
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import blend_profiler as profiler
+from blend_engine import (
+    CATALOG, INGREDIENTS, SCORE_KEYS, _normalize_percentages,
+    fa_dict, ingredient_vector, mix_fa, score_fa_profiles,
+)
+from blend_batch import detect_layout, _matrix
+
+FORMATOS = ("Ingredientes (%)", "Ácidos graxos (%)")
+LONG_COLUMNS = {"Ingredientes (%)": ("Ingrediente", "Percentual"),
+                "Ácidos graxos (%)": ("AcidoGraxos", "Percentual")}
+UPLOAD_CACHE_SIZE = 16     # arquivos interpretados em memória (compartilhado entre sessões)
+WORKBOOK_MIN_PARALLEL = 8  # abaixo disso as abas são lidas no próprio processo
+
+
+def read_table(data: bytes, name: str) -> pd.DataFrame:
+    """CSV ou XLSX (primeira aba) a partir dos bytes do arquivo enviado."""
+    buf = io.BytesIO(data)
+    return pd.read_csv(buf) if name.lower().endswith(".csv") else pd.read_excel(buf)
+
+def is_long_format(df: pd.DataFrame, formato: str) -> bool:
+    return all(c in df.columns for c in LONG_COLUMNS[formato])
+
+
+# ----------------- Formato longo (um blend) -----------------
+def _grouped_percentages(df: pd.DataFrame, col_key: str, col_pct: str) -> pd.Series:
+    """Soma Percentual por chave (texto sem espaços nas pontas), na ordem de aparição."""
+    keys = df[col_key].astype(str).str.strip()
+    pct = pd.to_numeric(df[col_pct], errors="coerce").fillna(0.0)
+    return pct.groupby(keys, sort=False).sum()
+
+def parse_long(df: pd.DataFrame, formato: str) -> dict:
+    """
+    Interpreta a planilha de um blend no formato escolhido.
+    Retorna {"parsed_ing", "parsed_fa", "fa_norm", "original_total", "warnings", "error"}.
+    """
+    out = {"parsed_ing": {}, "parsed_fa": {}, "fa_norm": None, "original_total": None,
+           "warnings": [], "error": None}
+    col_key, col_pct = LONG_COLUMNS[formato]
+    if not is_long_format(df, formato):
+        out["error"] = f"Planilha deve ter colunas '{col_key}' e '{col_pct}'."
+        return out
+
+    sums = _grouped_percentages(df, col_key, col_pct)
+    if formato == "Ingredientes (%)":
+        label_to_key = {lbl: k for k, lbl in INGREDIENTS}
+        known = sums.index.map(label_to_key)
+        out["warnings"] = [f"Ingrediente não reconhecido e ignorado: '{lbl}'"
+                           for lbl in sums.index[known.isna()]]
+        ok = sums[known.notna()]
+        out["parsed_ing"] = {label_to_key[lbl]: float(v) for lbl, v in ok.items()}
+        out["original_total"] = sum(out["parsed_ing"].values())
+        # perfil FA pelo perfil 'mean' de cada ingrediente (mistura normalizada)
+        out["fa_norm"] = fa_dict(mix_fa(A=ingredient_vector(out["parsed_ing"]))[0])
+    else:
+        out["parsed_fa"] = {str(k): float(v) for k, v in sums.items()}
+        out["original_total"] = sum(out["parsed_fa"].values())
+        out["fa_norm"] = _normalize_percentages(out["parsed_fa"])
+    return out
+
+
+# ----------------- Formato largo (vários blends) -----------------
+def _wide_profiles(df: pd.DataFrame, layout: dict, scenario: str = "mean"):
+    """Perfis FA brutos (N, F) e total declarado (N,) das linhas do formato largo."""
+    n_ing, n_fa = CATALOG.n_ingredients, len(CATALOG.fa_order)
+    if layout["FA"]:
+        raw = _matrix(df, layout["FA"], n_fa)
+        return raw, raw.sum(axis=1)
+    A = _matrix(df, layout["A"], n_ing)
+    B = _matrix(df, layout["B"], n_fa) if layout["B"] else None
+    C = _matrix(df, layout["C"], n_ing) if layout["C"] else None
+    total = A.sum(axis=1) + (B.sum(axis=1) if B is not None else 0) + (C.sum(axis=1) if C is not None else 0)
+    return mix_fa(A, B, C, scenario), total
+
+def _score_table(table: pd.DataFrame, raw: np.ndarray, total: np.ndarray) -> tuple:
+    """Acrescenta Total, KPIs técnicos e notas a `table` (uma linha por perfil). Retorna (table, fa)."""
+    res = score_fa_profiles(raw)
+    table["Total (%)"] = np.round(total, 2)
+    table["II"] = res["II"]
+    table["ISap"] = res["ISap"]
+    table["PF (°C)"] = res["PF_C"]
+    for j, k in enumerate(SCORE_KEYS):
+        table[k] = res["scores"][:, j]
+    return table, res["fa"]
+
+def parse_wide(df: pd.DataFrame, scenario: str = "mean") -> dict:
+    """
+    Um blend por linha. Colunas de ingrediente (Classe A/C, com ou sem prefixo) viram perfil FA
+    pelos perfis do cenário; colunas FA são normalizadas direto. Demais colunas (ID, lote…) são mantidas.
+    Retorna {"table" (DataFrame de resultados), "fa" (N, F), "layout", "error"}.
+    """
+    try:
+        layout = detect_layout(df.columns)
+    except ValueError as e:
+        return {"table": None, "fa": None, "layout": None, "error": str(e)}
+    raw, total = _wide_profiles(df, layout, scenario)
+    table, fa = _score_table(df[layout["extra"]].reset_index(drop=True).copy(), raw, total)
+    return {"table": table, "fa": fa, "layout": layout, "error": None}
+
+def filter_table(table: pd.DataFrame, text: str = "", ranges: dict = None) -> pd.Series:
+    """Máscara de linhas: `text` em qualquer coluna não numérica e faixas {coluna: (lo, hi)}."""
+    mask = pd.Series(True, index=table.index)
+    text = (text or "").strip().casefold()
+    if text:
+        cols = [c for c in table.columns if not pd.api.types.is_numeric_dtype(table[c])]
+        hit = pd.Series(False, index=table.index)
+        for c in cols:
+            hit |= table[c].astype(str).str.casefold().str.contains(text, regex=False)
+        mask &= hit
+    for col, (lo, hi) in (ranges or {}).items():
+        mask &= table[col].between(lo, hi)
+    return mask
+
+def profile_of_row(result: dict, row: int) -> dict:
+    """Perfil FA normalizado (dict) de uma linha do resultado largo."""
+    return fa_dict(result["fa"][row])
+
+
+# ----------------- Cache por conteúdo -----------------
+_CACHE = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+_CACHE_STATS = {"hits": 0, "misses": 0}
+
+def upload_key(data: bytes, name: str, formato: str) -> tuple:
+    """Chave do cache: SHA-256 do conteúdo, extensão (define o leitor) e formato escolhido."""
+    ext = name.lower().rsplit(".", 1)[-1] if "." in name else ""
+    return hashlib.sha256(data).hexdigest(), ext, formato
+
+def _parse(data: bytes, name: str, formato: str) -> dict:
+    out = {"df": None, "wide": None, "parsed": None, "error": None}
+    try:
+        out["df"] = read_table(data, name)
+    except Exception as e:
+        out["error"] = f"Erro ao ler arquivo: {e}"
+        return out
+    df = out["df"]
+    wide = None if is_long_format(df, formato) else parse_wide(df)
+    if wide is None or wide["error"]:
+        out["parsed"] = parse_long(df, formato)
+    else:
+        out["wide"] = wide
+    return out
+
+def _fresh(res: dict) -> dict:
+    """Cópia rasa com dicts/listas do formato longo novos (o chamador pode alterá-los)."""
+    out = dict(res)
+    if res["parsed"] is not None:
+        out["parsed"] = {k: (v.copy() if isinstance(v, (dict, list)) else v) for k, v in res["parsed"].items()}
+    return out
+
+def _cached(key: tuple, compute) -> dict:
+    with _CACHE_LOCK:
+        res = _CACHE.get(key)
+        if res is not None:
+            _CACHE.move_to_end(key)
+            _CACHE_STATS["hits"] += 1
+            profiler.count("upload cache (acertos)")
+            return res
+    profiler.count("upload cache (faltas)")
+    with profiler.span("upload: leitura + parse"):
+        res = compute()
+    with _CACHE_LOCK:
+        _CACHE_STATS["misses"] += 1
+        _CACHE[key] = res
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > UPLOAD_CACHE_SIZE:
+            _CACHE.popitem(last=False)
+    return res
+
+def parse_upload(data: bytes, name: str, formato: str) -> dict:
+    """
+    Lê e interpreta o arquivo enviado (com cache LRU por conteúdo + formato).
+    Retorna {"df" (prévia), "wide" (parse_wide ou None), "parsed" (parse_long ou None), "error" (leitura)}.
+    DataFrames/arrays do resultado são compartilhados com o cache: trate-os como somente leitura.
+    """
+    return _fresh(_cached(upload_key(data, name, formato), lambda: _parse(data, name, formato)))
+
+def upload_cache_info() -> dict:
+    with _CACHE_LOCK:
+        return {**_CACHE_STATS, "currsize": len(_CACHE), "maxsize": UPLOAD_CACHE_SIZE}
+
+def clear_upload_cache():
+    with _CACHE_LOCK:
+        _CACHE.clear()
+        _CACHE_STATS.update(hits=0, misses=0)
+
+
+# ----------------- Pasta de trabalho (várias abas) -----------------
+def _read_sheet_names(data: bytes) -> dict:
+    try:
+        with pd.ExcelFile(io.BytesIO(data)) as xls:
+            return {"sheets": list(xls.sheet_names)}
+    except Exception:
+        return {"sheets": []}
+
+def workbook_sheets(data: bytes) -> list:
+    """Nomes das abas de um XLSX, na ordem da pasta de trabalho ([] se não for XLSX legível; com cache)."""
+    key = upload_key(data, "workbook.xlsx", "") + ("sheets",)
+    return list(_cached(key, lambda: _read_sheet_names(data))["sheets"])
+
+def _sheet_profiles(df: pd.DataFrame, formato: str, scenario: str) -> dict:
+    """Uma aba → perfis brutos (n, F), total declarado, colunas extras e avisos (sem pontuar)."""
+    if not is_long_format(df, formato):
+        try:
+            layout = detect_layout(df.columns)
+        except ValueError:
+            layout = None
+        if layout is not None:
+            raw, total = _wide_profiles(df, layout, scenario)
+            return {"raw": raw, "total": total, "extra": df[layout["extra"]].reset_index(drop=True),
+                    "warnings": [], "error": None}
+    parsed = parse_long(df, formato)
+    if parsed["error"]:
+        return {"error": parsed["error"] + " (nem formato largo reconhecido)"}
+    raw = np.array([[parsed["fa_norm"].get(k, 0.0) for k in CATALOG.fa_order]])
+    return {"raw": raw, "total": np.array([parsed["original_total"]]), "extra": pd.DataFrame(index=[0]),
+            "warnings": parsed["warnings"], "error": None}
+
+def _parse_sheet(xls: pd.ExcelFile, sheet, formato: str, scenario: str) -> dict:
+    """Uma aba da pasta já aberta; erro na aba vira {"error"} sem derrubar as outras."""
+    try:
+        res = _sheet_profiles(xls.parse(sheet), formato, scenario)
+    except Exception as e:
+        res = {"error": f"{type(e).__name__}: {e}"}
+    res["sheet"] = sheet
+    return res
+
+# cada processo do pool abre a pasta uma única vez (initializer) e recebe só nomes de abas.
+# Processos via forkserver/spawn, nunca fork: o servidor do Streamlit já tem várias threads
+# (Tornado, blend_jobs, outras sessões) e um fork pode herdar uma trava presa por uma delas.
+# O forkserver (um processo limpo, de uma thread) já importa este módulo — pandas incluso — e
+# os workers nascem dele por fork, sem pagar a importação a cada pasta.
+_MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+if _MP_CONTEXT.get_start_method() == "forkserver":
+    _MP_CONTEXT.set_forkserver_preload([__name__])
+_WORKER_XLS = None
+
+def _init_worker(data: bytes):
+    global _WORKER_XLS
+    _WORKER_XLS = pd.ExcelFile(io.BytesIO(data))
+
+def _worker_parse_sheet(sheet, formato: str, scenario: str) -> dict:
+    return _parse_sheet(_WORKER_XLS, sheet, formato, scenario)
+
+def _merge_sheets(results: list) -> dict:
+    """Junta as abas válidas numa tabela no formato de parse_wide (coluna 'Blend' = aba · ID)."""
+    ok = [r for r in results if not r["error"]]
+    errors = {r["sheet"]: r["error"] for r in results if r["error"]}
+    warnings = {r["sheet"]: r["warnings"] for r in ok if r["warnings"]}
+    if not ok:
+        return {"table": None, "fa": None, "layout": None, "errors": errors, "warnings": warnings,
+                "error": "Nenhuma aba pôde ser interpretada."}
+    parts = []
+    for r in ok:
+        extra = r["extra"].copy()
+        n = len(r["raw"])
+        ids = extra.iloc[:, 0].astype(str).tolist() if extra.shape[1] else [""] * n
+        label = [r["sheet"] if (n == 1 and not i) else f"{r['sheet']} · {i or j + 1}" for j, i in enumerate(ids)]
+        extra.insert(0, "Aba", r["sheet"])
+        extra.insert(0, "Blend", label)
+        parts.append(extra)
+    table = pd.concat(parts, ignore_index=True, sort=False)
+    raw = np.vstack([r["raw"] for r in ok])
+    total = np.concatenate([r["total"] for r in ok])
+    table, fa = _score_table(table, raw, total)
+    extra_cols = [c for c in table.columns if c not in ("Total (%)", "II", "ISap", "PF (°C)", *SCORE_KEYS)]
+    return {"table": table, "fa": fa, "layout": {"extra": extra_cols}, "errors": errors,
+            "warnings": warnings, "error": None}
+
+def _parse_workbook(data: bytes, formato: str, scenario: str, max_workers: int, progress) -> dict:
+    sheets = workbook_sheets(data)
+    if not sheets:
+        raise ValueError("pasta de trabalho sem abas legíveis.")
+    total = len(sheets)
+    workers = max(1, min(max_workers or os.cpu_count() or 1, total))
+    results = []
+    if total < WORKBOOK_MIN_PARALLEL or workers == 1:
+        with pd.ExcelFile(io.BytesIO(data)) as xls:
+            for sh in sheets:
+                results.append(_parse_sheet(xls, sh, formato, scenario))
+                if progress:
+                    progress(len(results), total)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_MP_CONTEXT,
+                                 initializer=_init_worker, initargs=(data,)) as pool:
+            futures = {pool.submit(_worker_parse_sheet, sh, formato, scenario): sh for sh in sheets}
+            for fut in as_completed(futures):
+                try:
+                    results.append(fut.result())
+                except Exception as e:   # processo perdido: só a aba dele vira erro
+                    results.append({"sheet": futures[fut], "error": f"{type(e).__name__}: {e}"})
+                if progress:
+                    progress(len(results), total)
+        order = {sh: i for i, sh in enumerate(sheets)}
+        results.sort(key=lambda r: order[r["sheet"]])
+    return _merge_sheets(results)
+
+def parse_workbook(data: bytes, formato: str, scenario: str = "mean", max_workers: int = None,
+                   progress=None) -> dict:
+    """
+    Todas as abas de um XLSX, cada uma no formato longo (`formato`) ou largo, numa só tabela.
+      max_workers: processos do pool (padrão: núcleos disponíveis)
+      progress:    callback(abas_lidas, total_abas); não é chamado em acerto de cache
+    Retorna {"table", "fa", "layout"} como parse_wide (coluna 'Blend' = aba · ID, depois 'Aba'),
+    mais "errors" {aba: mensagem}, "warnings" {aba: [avisos]} e "error" (leitura/nenhuma aba válida).
+    """
+    def compute():
+        try:
+            return _parse_workbook(data, formato, scenario, max_workers, progress)
+        except Exception as e:
+            return {"table": None, "fa": None, "layout": None, "errors": {}, "warnings": {},
+                    "error": f"Erro ao ler arquivo: {e}"}
+    key = upload_key(data, "workbook.xlsx", formato) + ("workbook", scenario)
+    return _cached(key, compute)
@@ -1,7 +1,45 @@
 # home.py
+import io
 import os
+from functools import lru_cache
+
 import streamlit as st
 
+# ----------------- Assets (pré-processados uma vez por processo) -----------------
+# As imagens são redimensionadas para o tamanho de exibição e recodificadas (WebP, ou PNG
+# se o Pillow não tiver WebP) no primeiro uso; os reruns seguintes servem os bytes do cache,
+# sem I/O de disco. Caminhos relativos ao módulo (independe do diretório de execução).
+_ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+LOGO_CANDIDATES = ("logo_ogtera.png.PNG", "logo_ogtera.jpg", "logo.png", "ogtera.png")
+MOCKUP_CANDIDATES = ("cosmetico.png.PNG.jpeg",)
+LOGO_MAX_WIDTH = 900     # coluna do hero (~2/5 da página wide) em telas densas
+MOCKUP_MAX_WIDTH = 400   # exibido com width=400
+
+@lru_cache(maxsize=16)
+def _image_asset(candidates: tuple, max_width: int):
+    """Bytes do primeiro arquivo existente em `candidates`, no tamanho de exibição; None se nenhum."""
+    for fname in candidates:
+        path = os.path.join(_ASSET_DIR, fname)
+        if os.path.exists(path):
+            break
+    else:
+        return None
+    try:
+        from PIL import Image, features
+    except ImportError:   # sem Pillow: serve o arquivo original
+        with open(path, "rb") as fh:
+            return fh.read()
+    with Image.open(path) as im:
+        im = im.convert("RGBA" if "A" in im.getbands() else "RGB")
+        if im.width > max_width:
+            im = im.resize((max_width, round(im.height * max_width / im.width)), Image.LANCZOS)
+        buf = io.BytesIO()
+        if features.check("webp"):
+            im.save(buf, format="WEBP", quality=85, method=4)
+        else:
+            im.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
 def render_home(st):
     # HERO em duas colunas: texto (3) + imagem/logo (2)
     col_text, col_img = st.columns([3, 2], gap="large")
@@ -36,16 +74,16 @@ def render_home(st):
 
     with col_img:
         # Logo institucional (se existir)
-        for fname in ["logo_ogtera.png.PNG", "logo_ogtera.jpg", "logo.png", "ogtera.png"]:
-            if os.path.exists(fname):
-                st.image(fname, use_container_width=True)
-                break
+        logo = _image_asset(LOGO_CANDIDATES, LOGO_MAX_WIDTH)
+        if logo:
+            st.image(logo, use_container_width=True)
 
         # Mockup cosmético
         col1, col2, col3 = st.columns([2,2,1])
         with col2:
-            if os.path.exists("cosmetico.png.PNG.jpeg"):
-                st.image("cosmetico.png.PNG.jpeg", width=400)
+            mockup = _image_asset(MOCKUP_CANDIDATES, MOCKUP_MAX_WIDTH)
+            if mockup:
+                st.image(mockup, width=MOCKUP_MAX_WIDTH)
 
     st.markdown("---")
 
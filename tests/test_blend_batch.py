@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# Regressão: um blend vazio num bloco posterior não pode mudar os tipos das colunas da saída.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import blend_batch
+from blend_engine import CATALOG, RADAR_KEYS
+
+RADAR_COLS = [f"radar_{k}" for k in RADAR_KEYS]
+
+
+def _input(tmp_path, empty_row: int = 7, n: int = 10):
+    A = np.random.default_rng(0).dirichlet(np.ones(CATALOG.n_ingredients), n) * 100
+    A[empty_row] = 0.0
+    df = pd.DataFrame(A, columns=list(CATALOG.ing_keys))
+    df.insert(0, "ID", [f"b{i}" for i in range(n)])
+    path = tmp_path / "entrada.csv"
+    df.to_csv(path, index=False)
+    return path
+
+
+def test_radar_com_linha_vazia_em_bloco_posterior_csv(tmp_path):
+    src, dst = _input(tmp_path), tmp_path / "saida.csv"
+    assert blend_batch.score_file(str(src), str(dst), chunksize=4) == 10
+    out = pd.read_csv(dst, dtype=str, keep_default_na=False)
+    for col in RADAR_COLS:
+        assert out.loc[7, col] == ""
+        assert all(v.isdigit() for i, v in enumerate(out[col]) if i != 7), out[col].tolist()
+
+
+def test_radar_com_linha_vazia_em_bloco_posterior_parquet(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    src, dst = _input(tmp_path), tmp_path / "saida.parquet"
+    assert blend_batch.score_file(str(src), str(dst), chunksize=4) == 10
+    table = pq.read_table(dst)
+    assert table.num_rows == 10
+    assert all(str(table.schema.field(c).type) == "int64" for c in RADAR_COLS)
+    assert table.column(RADAR_COLS[0]).null_count == 1